@@ -1 +1,2 @@
 from .metadata.metadata import Metadata  # noqa: 401
+from .metadata.catalog import MetadataCatalog  # noqa: 401
@@ -1,17 +1,28 @@
+import datetime
+import decimal
+import json
+import threading
 import warnings
+import zlib
 
+from collections import OrderedDict
+from functools import lru_cache
 from mojap_metadata.metadata.metadata import (
     Metadata,
     _unpack_complex_data_type,
     _metadata_complex_dtype_names,
+    _metadata_struct_dtype_names_bracket,
 )
 from mojap_metadata.converters import (
     BaseConverter,
-    _flatten_and_convert_complex_data_type,
+    BaseConverterOptions,
 )
 
 import pyarrow as pa
-from typing import Tuple, List, Any, Union, Callable
+from dataclasses import dataclass
+from pyarrow import csv as pa_csv
+from pyarrow import dataset as pa_ds
+from typing import Dict, Tuple, List, Any, Union, Callable
 
 
 _arrow_id_to_static_metatype = {
@@ -53,15 +64,186 @@ def _get_fixed_width_binary(arrow_type: pa.lib.FixedSizeBinaryType):
     return f"binary({arrow_type.byte_width})"
 
 
+def _get_dictionary_value_type(arrow_type: pa.lib.DictionaryType):
+    # Dictionary encoding is recorded in the column's dictionary property
+    return _simple_arrow_type_conversion(arrow_type.value_type)
+
+
 _arrow_id_to_callable_metatype = {
     15: _get_fixed_width_binary,
     18: _get_arrow_timestamp,
     19: _get_arrow_time,
     20: _get_arrow_time,
     23: _get_decimal128,
+    29: _get_dictionary_value_type,
 }
 
 
+def _get_dictionary_index_type(n_values: int = None) -> pa.DataType:
+    """
+    Returns the smallest (signed) index type that can index n_values.
+    Defaults to int32 (pyarrow's default) if the number of values is unknown.
+    """
+    if n_values is None:
+        return pa.int32()
+    for index_type in (pa.int8(), pa.int16(), pa.int32()):
+        if n_values <= 2 ** (index_type.bit_width - 1):
+            return index_type
+    return pa.int64()
+
+
+# generated schemas keyed by _schema_cache_key (pa.Schemas are immutable)
+_schema_cache = OrderedDict()
+_schema_cache_lock = threading.Lock()
+_schema_cache_maxsize = 1024
+
+
+def _schema_cache_key(
+    converter: BaseConverter, metadata: Metadata, drop_partitions: bool
+) -> tuple:
+    """
+    Returns the content that generate_from_meta's output depends on: each
+    column's name, type, nullable and dictionary properties and number of
+    enum values, the partitions (if dropped) and the converter's class and
+    options. A tuple is much quicker to build and hash than serialising
+    and hashing the columns.
+    """
+    columns = tuple(
+        [
+            (
+                c["name"],
+                c.get("type"),
+                c.get("nullable"),
+                c.get("dictionary"),
+                None if c.get("enum") is None else len(c["enum"]),
+            )
+            for c in metadata.columns
+        ]
+    )
+    partitions = tuple(metadata.partitions) if drop_partitions else None
+    return (type(converter), repr(converter.options), partitions, columns)
+
+
+# key of the metadata embedded in schema and field metadata
+_embedded_metadata_key = b"mojap_metadata"
+
+
+def _embedded_metadata_json(d: dict) -> str:
+    return json.dumps(d, separators=(",", ":"))
+
+
+def _encode_embedded_metadata(d: dict) -> bytes:
+    return zlib.compress(_embedded_metadata_json(d).encode())
+
+
+def _decode_embedded_metadata(
+    key_value_metadata: Union[dict, None],
+) -> Union[dict, None]:
+    if not key_value_metadata or _embedded_metadata_key not in key_value_metadata:
+        return None
+    return json.loads(zlib.decompress(key_value_metadata[_embedded_metadata_key]))
+
+
+# predicate operator to the function building its dataset expression
+_filter_operators = {
+    "=": lambda f, v: f == v,
+    "==": lambda f, v: f == v,
+    "!=": lambda f, v: f != v,
+    "<": lambda f, v: f < v,
+    ">": lambda f, v: f > v,
+    "<=": lambda f, v: f <= v,
+    ">=": lambda f, v: f >= v,
+    "in": lambda f, v: f.isin(v),
+    "not in": lambda f, v: ~f.isin(v),
+}
+
+
+def set_schema_cache_maxsize(maxsize: int) -> None:
+    """
+    Sets the number of schemas kept by ArrowConverter.generate_from_meta
+    (least recently used schemas are evicted first). 0 turns caching off.
+
+    Args:
+        maxsize (int): Number of schemas cached. Defaults to 1024.
+    """
+    global _schema_cache_maxsize
+    with _schema_cache_lock:
+        _schema_cache_maxsize = maxsize
+        while len(_schema_cache) > maxsize:
+            _schema_cache.popitem(last=False)
+
+
+def clear_schema_cache() -> None:
+    """Removes every schema cached by ArrowConverter.generate_from_meta"""
+    with _schema_cache_lock:
+        _schema_cache.clear()
+
+
+@dataclass
+class ArrowConverterOptions(BaseConverterOptions):
+    """
+    Options Class for the ArrowConverter
+
+    dictionary_encode_enums (bool, default=False):
+      Dictionary encode columns with an enum (unless the column's dictionary
+      property is False). The index type is the smallest int that can index
+      every enum value. Columns with dictionary set to True are always
+      dictionary encoded.
+
+    embed_metadata (bool, default=False):
+      Attach the metadata to the schemas generated by generate_from_meta (and
+      each column's metadata to its field) as zlib compressed json, so
+      generate_to_meta can restore it exactly (see _embedded_metadata_key).
+    """
+
+    dictionary_encode_enums: bool = False
+    embed_metadata: bool = False
+
+
+def _project_arrow_type(
+    arrow_type: pa.DataType, path: str, selected: set, ancestors: set
+) -> Union[pa.DataType, None]:
+    """
+    Returns arrow_type (the type of the field at the dotted path) pruned to
+    the selected paths (and everything nested in them) or None if nothing
+    in it is selected. ancestors holds every path above a selected path.
+    """
+    if path in selected:
+        return arrow_type
+    if path not in ancestors:
+        return None
+
+    if _is_pa_struct(arrow_type):
+        fields = []
+        for field in arrow_type:
+            t = _project_arrow_type(
+                field.type, f"{path}.{field.name}", selected, ancestors
+            )
+            if t is not None:
+                fields.append(field.with_type(t))
+        return pa.struct(fields) if fields else None
+    elif _is_pa_list(arrow_type):
+        value_field = arrow_type.value_field
+        t = _project_arrow_type(
+            value_field.type, f"{path}.element", selected, ancestors
+        )
+        if t is None:
+            return None
+        list_type = pa.list_ if arrow_type.id == 25 else pa.large_list
+        return list_type(value_field.with_type(t))
+    return None
+
+
+def _json_safe_statistic(value: Any) -> Any:
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return None
+    return value
+
+
 def _rename_data_type_to_arrow_type(data_type: str):
     if data_type == "bool":
         return "bool_"
@@ -91,34 +273,24 @@ def _is_pa_list(thing: Any):
     return isinstance(thing, (pa.lib.ListType, pa.lib.LargeListType))
 
 
-def _convert_complex_pa_to_data_type(arrow_type: pa.lib.DataType) -> Union[dict, str]:
-    """Recursive function that jumps into complex arrow types (structs and lists)
-    and returns complex types as a dict. Non complex types are returned as a str.
-    Names returned are those given to the agnostic data types in Metadata.
-
-    Args:
-        arrow_type (pa.lib.DataType): An arrow type
-
-    Returns:
-        Union[dict, str]: unpacked representation of data type as dict
-            or str.
+@lru_cache(maxsize=4096)
+def _arrow_type_to_meta_type(arrow_type: pa.lib.DataType) -> str:
+    """Converts an arrow type straight to its metadata type string
+    (recursing into structs and lists).
+    Arrow types are immutable and hashable so conversions are memoised,
+    which means repeated nested types (e.g. the same struct in many columns)
+    are only converted once.
     """
-    d = {}
-    # For struct iterate through each key value binding
-    # until each field name has its corresponding type returned
     if _is_pa_struct(arrow_type):
-        d["struct"] = {}
-        for field in arrow_type:
-            d["struct"][field.name] = _convert_complex_pa_to_data_type(field.type)
-        return d
-    # For list get the data type for the lists content and return the list
+        fields = ", ".join(
+            f"{field.name}:{_arrow_type_to_meta_type(field.type)}"
+            for field in arrow_type
+        )
+        return f"struct<{fields}>"
     elif _is_pa_list(arrow_type):
         k = "list" if arrow_type.id == 25 else "large_list"
-        d[k] = _convert_complex_pa_to_data_type(arrow_type.value_type)
-        return d
+        return f"{k}<{_arrow_type_to_meta_type(arrow_type.value_type)}>"
     else:
-        # If the data type is simple then return the simple conversion
-        # this return is what ends the recursion
         return _simple_arrow_type_conversion(arrow_type)
 
 
@@ -145,6 +317,36 @@ def _convert_complex_data_type_to_pa(
         return fields
 
 
+def _convert_basic_meta_type_to_pa(coltype: str) -> pa.DataType:
+    is_time_type = coltype.startswith("time")
+    is_decimal_type = coltype.startswith("decimal128")
+    is_binary_type = coltype.startswith("binary")
+    if is_time_type or is_decimal_type or is_binary_type:
+        attr_name, values = _extract_bracket_params(coltype)
+    else:
+        attr_name = coltype
+        values = []
+
+    # Allowing for types without underscores
+    if coltype == "bool":
+        attr_name = "bool_"
+    elif coltype == "list":
+        attr_name = "list_"
+    else:
+        pass
+
+    return getattr(pa, attr_name)(*values)
+
+
+@lru_cache(maxsize=4096)
+def _meta_type_to_arrow_type(coltype: str) -> pa.DataType:
+    """Memoised ArrowConverter.convert_col_type (for converters that do not
+    override convert_basic_col_type). Each type string is only parsed once.
+    """
+    data_type = _unpack_complex_data_type(coltype)
+    return _convert_complex_data_type_to_pa(data_type, _convert_basic_meta_type_to_pa)
+
+
 def _extract_bracket_params(meta_type: str) -> Tuple[str, List[Any]]:
     """
     Gets parameters from the string representation of the type
@@ -178,12 +380,11 @@ def _extract_bracket_params(meta_type: str) -> Tuple[str, List[Any]]:
 
 
 class ArrowConverter(BaseConverter):
-    def __init__(self):
+    def __init__(self, options: ArrowConverterOptions = None):
         """
         Converts metadata objects to an Arrow Schema.
-        Note that this converter has no options
-        (i.e. ArrowConverter().options returns
-        the BaseCoverterOptions)
+
+        options (ArrowConverterOptions, optional): See ArrowConverterOptions.
 
         Example:
         from mojap_metadata.converters.arrow_converter import (
@@ -194,7 +395,9 @@ class ArrowConverter(BaseConverter):
         metadata = Metadata.from_json("my-table-metadata.json")
         pyarrow_schema = ac.generate_from_meta(metadata) # get pyArrow Schema
         """
-        super().__init__(None)
+        if options is None:
+            options = ArrowConverterOptions()
+        super().__init__(options)
 
     def convert_col_type(self, coltype: str) -> pa.DataType:
         """Converts our metadata types to arrow data type object
@@ -205,10 +408,15 @@ class ArrowConverter(BaseConverter):
         Returns:
             pa.DataType: Arrow data type
         """
+        convert_basic_col_type = type(self).convert_basic_col_type
+        if convert_basic_col_type is not ArrowConverter.convert_basic_col_type:
+            # only the default conversion is memoised
+            data_type = _unpack_complex_data_type(coltype)
+            return _convert_complex_data_type_to_pa(
+                data_type, self.convert_basic_col_type
+            )
 
-        data_type = _unpack_complex_data_type(coltype)
-
-        return _convert_complex_data_type_to_pa(data_type, self.convert_basic_col_type)
+        return _meta_type_to_arrow_type(coltype)
 
     def convert_basic_col_type(self, coltype: str) -> pa.DataType:
         """
@@ -222,31 +430,19 @@ class ArrowConverter(BaseConverter):
         Returns:
             [pa.DataType]: The equivalent type object in pyArrow
         """
-        is_time_type = coltype.startswith("time")
-        is_decimal_type = coltype.startswith("decimal128")
-        is_binary_type = coltype.startswith("binary")
-        if is_time_type or is_decimal_type or is_binary_type:
-            attr_name, values = _extract_bracket_params(coltype)
-        else:
-            attr_name = coltype
-            values = []
-
-        # Allowing for types without underscores
-        if coltype == "bool":
-            attr_name = "bool_"
-        elif coltype == "list":
-            attr_name = "list_"
-        else:
-            pass
-
-        return getattr(pa, attr_name)(*values)
+        return _convert_basic_meta_type_to_pa(coltype)
 
     def generate_from_meta(
         self,
         metadata: Metadata,
         drop_partitions: bool = True,
     ) -> pa.Schema:
-        """Generates an arrow schema from our metadata
+        """Generates an arrow schema from our metadata. Schemas are cached
+        (keyed by the columns, partitions, drop_partitions and options) so
+        generating the same schema again is a lookup. See
+        set_schema_cache_maxsize and clear_schema_cache.
+        With options.embed_metadata the metadata's json is also part of the
+        key. It is only compressed (and each column encoded) on a cache miss.
 
         Args:
             metadata (Metadata): metadata object from the Metadata class
@@ -256,7 +452,35 @@ class ArrowConverter(BaseConverter):
         Returns:
             pa.Schema: A Schema for a pyArrow table
         """
-
+        embedded_json = None
+        if getattr(self.options, "embed_metadata", False):
+            embedded_json = _embedded_metadata_json(metadata._data)
+
+        if _schema_cache_maxsize:
+            key = _schema_cache_key(self, metadata, drop_partitions)
+            key += (embedded_json,)
+            with _schema_cache_lock:
+                schema = _schema_cache.get(key)
+                if schema is not None:
+                    _schema_cache.move_to_end(key)
+                    return schema
+
+        embedded = None
+        if embedded_json is not None:
+            embedded = zlib.compress(embedded_json.encode())
+        schema = self._generate_schema(metadata, drop_partitions, embedded)
+        if not _schema_cache_maxsize:
+            return schema
+
+        with _schema_cache_lock:
+            _schema_cache[key] = schema
+            while len(_schema_cache) > _schema_cache_maxsize:
+                _schema_cache.popitem(last=False)
+        return schema
+
+    def _generate_schema(
+        self, metadata: Metadata, drop_partitions: bool, embedded: bytes = None
+    ) -> pa.Schema:
         arrow_cols = []
         for col in metadata.columns:
             if drop_partitions and (col["name"] in metadata.partitions):
@@ -265,41 +489,498 @@ class ArrowConverter(BaseConverter):
                 arrow_cols.append(
                     pa.field(
                         col["name"],
-                        self.convert_col_type(col["type"]),
+                        self.convert_column_type(col),
                         nullable=col.get("nullable", True),
+                        metadata=(
+                            {_embedded_metadata_key: _encode_embedded_metadata(col)}
+                            if embedded
+                            else None
+                        ),
                     )
                 )
 
+        if embedded:
+            return pa.schema(arrow_cols, metadata={_embedded_metadata_key: embedded})
         return pa.schema(arrow_cols)
 
+    def convert_column_type(self, col: dict) -> pa.DataType:
+        """Converts the type of a metadata column to an arrow data type,
+        dictionary encoding it if the column's dictionary property is True (or
+        it has an enum and options.dictionary_encode_enums is True and its
+        dictionary property is not False).
+
+        Args:
+            col (dict): a metadata column
+
+        Returns:
+            pa.DataType: Arrow data type
+        """
+        arrow_type = self.convert_col_type(col["type"])
+        dictionary = col.get("dictionary")
+        if dictionary is None:
+            dictionary = (
+                getattr(self.options, "dictionary_encode_enums", False)
+                and col.get("enum") is not None
+            )
+        if dictionary and not pa.types.is_nested(arrow_type):
+            enum = col.get("enum")
+            index_type = _get_dictionary_index_type(len(enum) if enum else None)
+            arrow_type = pa.dictionary(index_type, arrow_type)
+        return arrow_type
+
+    def _get_partition_types(self, metadata: Metadata) -> dict:
+        # dictionary encoding is not used for partitions (the values come
+        # from the directory names)
+        return {
+            c["name"]: self.convert_col_type(c["type"])
+            for c in metadata.columns
+            if c["name"] in metadata.partitions
+        }
+
+    def generate_partitioning(
+        self, metadata: Metadata, flavor: str = "hive"
+    ) -> pa_ds.Partitioning:
+        """Generates a pyarrow dataset Partitioning from the metadata's
+        partitions (in order) and their types. Pass it to pyarrow.dataset.dataset
+        or write_dataset so partition directories are read and written with
+        the metadata's types without pyarrow inferring them.
+
+        Args:
+            metadata (Metadata): metadata object from the Metadata class
+            flavor (str, optional): "hive" (directories named key=value) or
+                "directory" (directories named value). Defaults to "hive".
+
+        Returns:
+            pa_ds.Partitioning: The partitioning (None if there are no
+                partitions)
+        """
+        if flavor not in ("hive", "directory"):
+            raise ValueError(f"flavor must be hive or directory not {flavor}")
+        if not metadata.partitions:
+            return None
+
+        types = self._get_partition_types(metadata)
+        schema = pa.schema([(p, types[p]) for p in metadata.partitions])
+        return pa_ds.partitioning(schema, flavor="hive" if flavor == "hive" else None)
+
+    def generate_partition_filter(
+        self, metadata: Metadata, predicates: List[Union[tuple, List[tuple]]]
+    ) -> pa_ds.Expression:
+        """Translates predicates on partition columns into a pyarrow dataset
+        filter expression, so only the matching partition directories are read.
+        Values are converted to the partition column's type (e.g. the string
+        "2021-01-01" for a date32 partition).
+
+        Args:
+            metadata (Metadata): metadata object from the Metadata class
+            predicates (List[Union[tuple, List[tuple]]]): (column, op, value)
+                tuples, where op is one of =, ==, !=, <, >, <=, >=, in or
+                not in (the value of in and not in is a list). A list of
+                tuples is combined with AND, a list of lists of tuples is an
+                OR of ANDs (like the filters of pyarrow.parquet.read_table).
+
+        Returns:
+            pa_ds.Expression: pass as the filter to a dataset's to_table,
+                to_batches or scanner (None if there are no predicates)
+
+        Raises:
+            ValueError: if a column is not a partition or an op is unknown
+        """
+        types = self._get_partition_types(metadata)
+        if predicates and all(isinstance(p, tuple) for p in predicates):
+            predicates = [predicates]
+
+        expression = None
+        for conjunction in predicates:
+            conjunction_expression = None
+            for col, op, value in conjunction:
+                if col not in types:
+                    raise ValueError(f"{col} is not a partition")
+                if op not in _filter_operators:
+                    raise ValueError(
+                        f"op must be one of {list(_filter_operators)} not {op}"
+                    )
+                if op in ("in", "not in"):
+                    value = pa.array(value).cast(types[col])
+                else:
+                    value = pa.scalar(value).cast(types[col])
+                e = _filter_operators[op](pa_ds.field(col), value)
+                conjunction_expression = (
+                    e if conjunction_expression is None else conjunction_expression & e
+                )
+            if conjunction_expression is not None:
+                expression = (
+                    conjunction_expression
+                    if expression is None
+                    else expression | conjunction_expression
+                )
+        return expression
+
+    def generate_projected_schema(
+        self, metadata: Metadata, paths: List[str], drop_partitions: bool = True
+    ) -> pa.Schema:
+        """Generates an arrow schema holding only the given columns and
+        nested fields. Structs (and lists of structs) are pruned to the
+        selected fields, so reading with the schema (e.g.
+        pyarrow.dataset.dataset(path, schema=projected_schema)) skips the
+        other fields. Columns and fields keep the metadata's order.
+        See Metadata.nested_path_index for the paths.
+
+        Args:
+            metadata (Metadata): metadata object from the Metadata class
+            paths (List[str]): dotted paths of the columns and nested fields
+                to keep e.g. ["id", "address.postcode", "items.element.sku"].
+                Selecting a struct or list keeps everything nested in it.
+            drop_partitions (bool): Drop partitions from the outputted pyarrow
+                schema. Defaults to True.
+
+        Returns:
+            pa.Schema: The projected schema
+
+        Raises:
+            ValueError: if a path is not in the metadata (or is in a
+                dropped partition)
+        """
+        schema = self.generate_from_meta(metadata, drop_partitions=drop_partitions)
+        index = metadata.nested_path_index
+        selected = set(paths)
+        unknown = [
+            p for p in paths if p not in index or p.split(".", 1)[0] not in schema.names
+        ]
+        if unknown:
+            raise ValueError(f"paths not in metadata: {unknown}")
+
+        ancestors = set()
+        for p in selected:
+            parts = p.split(".")
+            for i in range(1, len(parts)):
+                ancestors.add(".".join(parts[:i]))
+
+        fields = []
+        for field in schema:
+            t = _project_arrow_type(field.type, field.name, selected, ancestors)
+            if t is not None:
+                fields.append(field.with_type(t))
+        return pa.schema(fields)
+
+    def generate_parquet_columns(
+        self, metadata: Metadata, paths: List[str]
+    ) -> List[str]:
+        """Converts dotted paths of columns and nested fields (see
+        Metadata.nested_path_index) to the column paths used in parquet
+        files, which name list values list.element
+        (e.g. items.element.sku is items.list.element.sku). Pass them as the
+        columns of pyarrow.parquet.ParquetFile.read or iter_batches to only
+        decode the selected leaves.
+
+        Args:
+            metadata (Metadata): metadata object from the Metadata class
+            paths (List[str]): dotted paths of columns and nested fields
+
+        Returns:
+            List[str]: parquet column paths
+
+        Raises:
+            ValueError: if a path is not in the metadata
+        """
+        index = metadata.nested_path_index
+        unknown = [p for p in paths if p not in index]
+        if unknown:
+            raise ValueError(f"paths not in metadata: {unknown}")
+
+        parquet_paths = []
+        for path in paths:
+            parts = path.split(".")
+            current = parts[0]
+            parquet_path = [current]
+            for part in parts[1:]:
+                if not index[current].startswith(_metadata_struct_dtype_names_bracket):
+                    parquet_path.append("list")
+                parquet_path.append(part)
+                current = f"{current}.{part}"
+            parquet_paths.append(".".join(parquet_path))
+        return parquet_paths
+
+    def generate_csv_read_options(
+        self,
+        metadata: Metadata,
+        csv_options: Any = None,
+        null_values: List[str] = None,
+        timestamp_parsers: List[str] = None,
+        drop_partitions: bool = True,
+        block_size: int = None,
+    ) -> Tuple[pa_csv.ReadOptions, pa_csv.ParseOptions, pa_csv.ConvertOptions]:
+        """Generates pyarrow csv read, parse and convert options from our
+        metadata so csvs are read with the metadata's column types (without
+        pyarrow inferring them).
+
+        Args:
+            metadata (Metadata): metadata object from the Metadata class
+            csv_options (Any, optional): csv settings with the attributes of
+                `mojap_metadata.converters.glue_converter.CsvOptions` (sep,
+                quote_char, escape_char and skip_header) e.g. the `csv` of
+                GlueConverterOptions. If set the csv is read the way the Glue
+                table would read it: the column names are taken from the
+                metadata (in order) and the first row is only skipped if
+                skip_header is True. If None the csv must have a header row
+                and only the metadata's columns are read from it (columns
+                missing from the csv are read as nulls). As Glue reads
+                partition columns from the file paths (not the files) the
+                partitions must be dropped when csv_options is set.
+            null_values (List[str], optional): strings read as null. Defaults
+                to pyarrow's null values.
+            timestamp_parsers (List[str], optional): strptime formats tried
+                (in order) for timestamp columns. Defaults to ISO8601 followed
+                by the `datetime_format` of any timestamp columns.
+            drop_partitions (bool): Drop partitions from the columns read.
+                Defaults to True.
+            block_size (int, optional): bytes read at a time.
+                Defaults to pyarrow's default.
+
+        Returns:
+            Tuple[pa_csv.ReadOptions, pa_csv.ParseOptions, pa_csv.ConvertOptions]:
+                pass to pyarrow.csv.read_csv or pyarrow.csv.open_csv
+
+        Raises:
+            ValueError: if csv_options is set and the partitions are not dropped
+                (the column names would be out of step with the file's columns)
+        """
+        if csv_options is not None and not drop_partitions and metadata.partitions:
+            raise ValueError(
+                "csv_options read the columns by position like Glue, which does "
+                "not store partition columns in the files. Set drop_partitions "
+                f"to True (partitions: {metadata.partitions})"
+            )
+        columns = [
+            c
+            for c in metadata.columns
+            if not (drop_partitions and c["name"] in metadata.partitions)
+        ]
+        column_names = [c["name"] for c in columns]
+
+        if csv_options is None:
+            read_options = pa_csv.ReadOptions(block_size=block_size)
+            parse_options = pa_csv.ParseOptions()
+        else:
+            read_options = pa_csv.ReadOptions(
+                block_size=block_size,
+                column_names=column_names,
+                skip_rows=1 if csv_options.skip_header else 0,
+            )
+            parse_options = pa_csv.ParseOptions(
+                delimiter=csv_options.sep or ",",
+                quote_char=csv_options.quote_char or False,
+                escape_char=csv_options.escape_char or False,
+            )
+
+        if timestamp_parsers is None:
+            timestamp_parsers = [pa_csv.ISO8601]
+            for c in columns:
+                fmt = c.get("datetime_format")
+                if fmt and fmt not in timestamp_parsers:
+                    timestamp_parsers.append(fmt)
+
+        convert_options = pa_csv.ConvertOptions(
+            column_types={c["name"]: self.convert_col_type(c["type"]) for c in columns},
+            include_columns=column_names,
+            include_missing_columns=csv_options is None,
+            strings_can_be_null=True,
+            timestamp_parsers=timestamp_parsers,
+        )
+        if null_values is not None:
+            convert_options.null_values = null_values
+
+        return read_options, parse_options, convert_options
+
     def generate_to_meta(
         self, arrow_schema: pa.Schema, meta_init_dict: dict = None
     ) -> Metadata:
-        """Generates our metadata instance from an arrow schema
+        """Generates our metadata instance from an arrow schema.
+        If the schema was generated with options.embed_metadata (e.g. it was
+        read from a parquet file written with such a schema) the embedded
+        metadata is restored exactly (without converting types or validating
+        it again), as long as the schema's fields still match it.
+        Otherwise any columns embedded in field metadata that still match
+        their field are restored.
 
         Args:
             arrow_schema (pa.Schema): pa.Schema from an arrow table
+            meta_init_dict (dict, optional): other Metadata values (e.g. name).
+                These replace the embedded values. A columns key is ignored
+                (with a warning) as the columns come from the schema.
 
         Returns:
             Metadata: An agnostic metadata instance
         """
+        if meta_init_dict and "columns" in meta_init_dict:
+            warnings.warn("columns key found in meta_init_dict will be overwritten")
+
+        embedded = self._get_embedded_metadata(arrow_schema)
+        if embedded is not None:
+            if not meta_init_dict:
+                return Metadata._from_validated_dict(embedded)
+            embedded.update({k: v for k, v in meta_init_dict.items() if k != "columns"})
+            return Metadata.from_dict(embedded)
+
         if not meta_init_dict:
             meta_init_dict = {}
 
-        if "columns" in meta_init_dict:
-            warnings.warn("columns key found in meta_init_dict will be overwritten")
-
         meta_init_dict["columns"] = []
         meta_init_dict["_converted_from"] = "arrow_schema"
 
         for field in arrow_schema:
-            meta_init_dict["columns"].append(
-                {"name": field.name, "type": self.reverse_convert_col_type(field.type)}
-            )
+            col = _decode_embedded_metadata(field.metadata)
+            if col is None or not self._embedded_column_matches(col, field):
+                col = {
+                    "name": field.name,
+                    "type": self.reverse_convert_col_type(field.type),
+                }
+                if pa.types.is_dictionary(field.type):
+                    col["dictionary"] = True
+            meta_init_dict["columns"].append(col)
 
         m = Metadata.from_dict(meta_init_dict)
         return m
 
+    def _get_embedded_metadata(self, arrow_schema: pa.Schema) -> Union[dict, None]:
+        """
+        Returns the metadata embedded in the schema if its columns (or its
+        columns that are not partitions) match the schema's fields.
+        """
+        d = _decode_embedded_metadata(arrow_schema.metadata)
+        if d is None:
+            return None
+        columns = d.get("columns", [])
+        if len(columns) != len(arrow_schema):
+            partitions = d.get("partitions", [])
+            columns = [c for c in columns if c["name"] not in partitions]
+        if len(columns) != len(arrow_schema):
+            return None
+        for col, field in zip(columns, arrow_schema):
+            if not self._embedded_column_matches(col, field):
+                return None
+        return d
+
+    def _embedded_column_matches(self, col: dict, field: pa.Field) -> bool:
+        arrow_type = field.type
+        if pa.types.is_dictionary(arrow_type):
+            arrow_type = arrow_type.value_type
+        try:
+            return (
+                col.get("name") == field.name
+                and col.get("nullable", True) == field.nullable
+                and self.convert_col_type(col["type"]) == arrow_type
+            )
+        except (KeyError, AttributeError, ValueError, TypeError):
+            return False
+
+    def generate_to_meta_from_parquet_dataset(
+        self,
+        path: str,
+        meta_init_dict: dict = None,
+        max_workers: int = 16,
+        return_divergent: bool = False,
+    ) -> Union[Metadata, Tuple[Metadata, dict]]:
+        """Generates our metadata instance from a directory of parquet files
+        by reading only the footer of each file (in parallel). The schemas of
+        the files are unified into one (e.g. int32 and int64 columns become
+        int64 and columns missing from some files are made nullable).
+        Hive style directories (key=value) are added as partitions.
+        A warning is raised if any file's schema differs from the most
+        common schema in the dataset.
+
+        Args:
+            path (str): local directory or uri (e.g. s3://bucket/prefix/)
+            meta_init_dict (dict, optional): other Metadata values (e.g. name)
+            max_workers (int, optional): number of footers read at once.
+                Defaults to 16.
+            return_divergent (bool, optional): Also return the files whose schema
+                differs, as a dict of file path to a list of the differences.
+                Defaults to False.
+
+        Returns:
+            Union[Metadata, Tuple[Metadata, dict]]: An agnostic metadata instance
+                (and the divergent files if return_divergent is True)
+        """
+        from mojap_metadata.converters.arrow_converter.parquet import (
+            generate_meta_from_parquet_dataset,
+        )
+
+        return generate_meta_from_parquet_dataset(
+            self, path, meta_init_dict, max_workers, return_divergent
+        )
+
+    def generate_statistics_from_parquet_dataset(
+        self, path: str, metadata: Metadata = None, max_workers: int = 16
+    ) -> Dict[str, dict]:
+        """Reads column statistics (row_count, null_count, min, max and an
+        approximate distinct_count) from the footers of every parquet file in
+        a directory (local or S3 prefix) of parquet files, in parallel.
+        No data is read. See
+        mojap_metadata.converters.arrow_converter.parquet.read_parquet_dataset_statistics
+
+        Args:
+            path (str): local directory or uri (e.g. s3://bucket/prefix/)
+            metadata (Metadata, optional): If given, each column's statistics
+                are also set as its statistics property (with dates, times
+                and decimals as strings and binary min and max left out).
+            max_workers (int, optional): number of footers read at once.
+                Defaults to 16.
+
+        Returns:
+            Dict[str, dict]: parquet column path (e.g. id or address.postcode)
+                to its statistics
+        """
+        from mojap_metadata.converters.arrow_converter.parquet import (
+            read_parquet_dataset_statistics,
+        )
+
+        statistics = read_parquet_dataset_statistics(path, max_workers)
+        if metadata is not None:
+            for col in metadata.columns:
+                if col["name"] in statistics:
+                    col["statistics"] = {
+                        k: _json_safe_statistic(v)
+                        for k, v in statistics[col["name"]].items()
+                    }
+            metadata.validate()
+        return statistics
+
+    def generate_parquet_writer_options(
+        self, metadata: Metadata, drop_partitions: bool = True
+    ) -> Tuple[dict, Union[int, None]]:
+        """Generates pyarrow.parquet.ParquetWriter kwargs from the metadata's
+        parquet_options (on the table and on columns) so the physical layout
+        of parquet files written for the table is kept with its schema.
+
+        The table's parquet_options can have row_group_size, compression,
+        compression_level, use_dictionary, write_statistics, sorting_columns
+        (column names or dicts with name, descending and nulls_first) and
+        bloom_filter_columns. A column's parquet_options can have
+        compression, compression_level, use_dictionary, write_statistics and
+        bloom_filter (True or a dict with ndv and fpp), which override the
+        table's for that column (and every leaf nested in it).
+
+        Args:
+            metadata (Metadata): metadata object from the Metadata class
+            drop_partitions (bool): Partitions are not written to the files.
+                Defaults to True.
+
+        Returns:
+            Tuple[dict, Union[int, None]]: ParquetWriter kwargs (also accepted
+                by pyarrow.parquet.write_table) and the row_group_size (None if
+                not set) to pass to write_table
+
+        Raises:
+            ValueError: for unknown options or sorting or bloom filter
+                columns that are not in the schema
+        """
+        from mojap_metadata.converters.arrow_converter.parquet import (
+            generate_parquet_writer_options,
+        )
+
+        return generate_parquet_writer_options(self, metadata, drop_partitions)
+
     def reverse_convert_col_type(self, arrow_type: pa.lib.DataType) -> str:
         """Converts an arrow type to a metadata col type
 
@@ -309,11 +990,4 @@ class ArrowConverter(BaseConverter):
         Returns:
             str: str representation of Metadata col type
         """
-        data_type_dict = _convert_complex_pa_to_data_type(arrow_type)
-        # Types in are data_type_dict have already beenm converted
-        # to our agnostic metadata type names so can flatten with
-        # no converter (aka use this lambda fun)
-        data_type = _flatten_and_convert_complex_data_type(
-            data_type=data_type_dict, converter_fun=lambda x: x
-        )
-        return data_type
+        return _arrow_type_to_meta_type(arrow_type)
@@ -0,0 +1,233 @@
+import os
+
+from io import BytesIO
+from typing import Dict, Iterator, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from pyarrow import csv, json, fs
+
+from mojap_metadata.metadata.metadata import Metadata
+from mojap_metadata.converters.arrow_converter import ArrowConverter
+
+# Types tried (in order) when inferring the type of a batch of csv strings.
+# Mirrors the order pyarrow's csv reader tries.
+_csv_candidate_types = [
+    pa.int64(),
+    pa.float64(),
+    pa.bool_(),
+    pa.date32(),
+    pa.timestamp("s"),
+    pa.timestamp("ms"),
+    pa.timestamp("us"),
+    pa.timestamp("ns"),
+]
+
+_file_format_extensions = {
+    ".csv": "csv",
+    ".json": "json",
+    ".jsonl": "json",
+    ".ndjson": "json",
+}
+
+
+def _open_input_stream(path: str) -> pa.NativeFile:
+    """
+    Opens a local path or a uri (e.g. s3://bucket/key) with pyarrow.
+    Compressed files (e.g. .gz) are decompressed based on their extension.
+    """
+    if "://" in path:
+        filesystem, path = fs.FileSystem.from_uri(path)
+    else:
+        filesystem, path = fs.LocalFileSystem(), os.path.abspath(path)
+    return filesystem.open_input_stream(path)
+
+
+def _get_file_format(path: str) -> str:
+    stem = path.lower()
+    for ext in (".gz", ".bz2", ".zst", ".lz4"):
+        if stem.endswith(ext):
+            stem = stem[: -len(ext)]
+    _, ext = os.path.splitext(stem)
+    if ext not in _file_format_extensions:
+        raise ValueError(
+            f"Cannot infer file_format from {path}, set file_format to csv or json"
+        )
+    return _file_format_extensions[ext]
+
+
+def widen_arrow_type(current: pa.DataType, new: pa.DataType) -> pa.DataType:
+    """
+    Returns the narrowest arrow type that can hold values of both types.
+    e.g. int64 and float64 gives float64, date32 and timestamp(s) gives
+    timestamp(s). Structs are merged field by field and lists are widened by
+    their value type. Types that cannot be merged give string.
+
+    Args:
+        current (pa.DataType): type inferred so far (None if no type yet)
+        new (pa.DataType): type inferred from the next batch of data
+
+    Returns:
+        pa.DataType: the widened type
+    """
+    if current is None or current == new or pa.types.is_null(current):
+        return new
+    if pa.types.is_null(new):
+        return current
+
+    if pa.types.is_struct(current) and pa.types.is_struct(new):
+        fields = {f.name: f.type for f in current}
+        for f in new:
+            fields[f.name] = widen_arrow_type(fields.get(f.name), f.type)
+        return pa.struct(list(fields.items()))
+
+    if pa.types.is_list(current) and pa.types.is_list(new):
+        return pa.list_(widen_arrow_type(current.value_type, new.value_type))
+
+    return _widen_basic_arrow_type(current, new)
+
+
+def _widen_basic_arrow_type(current: pa.DataType, new: pa.DataType) -> pa.DataType:
+    if pa.types.is_date(current) and pa.types.is_timestamp(new):
+        return new
+    if pa.types.is_timestamp(current) and pa.types.is_date(new):
+        return current
+
+    try:
+        schema = pa.unify_schemas(
+            [pa.schema([("f", current)]), pa.schema([("f", new)])],
+            promote_options="permissive",
+        )
+        return schema.field("f").type
+    except (pa.ArrowTypeError, pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return pa.string()
+
+
+def _infer_csv_string_type(arr: pa.Array) -> pa.DataType:
+    """
+    Returns the first candidate type every (non null) value in an
+    array of csv strings can be cast to.
+    """
+    arr = pc.drop_null(arr)
+    if len(arr) == 0:
+        return pa.null()
+
+    for candidate in _csv_candidate_types:
+        try:
+            pc.cast(arr, candidate)
+            return candidate
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            continue
+    return pa.string()
+
+
+def _iter_csv_batches(
+    path: str, block_size: int, delimiter: str
+) -> Iterator[pa.RecordBatch]:
+    """
+    Streams a csv file as batches with every column read as a string.
+    """
+    read_options = csv.ReadOptions(block_size=block_size)
+    parse_options = csv.ParseOptions(delimiter=delimiter)
+
+    # Read the column names from the first block
+    with _open_input_stream(path) as f:
+        reader = csv.open_csv(f, read_options=read_options, parse_options=parse_options)
+        column_names = reader.schema.names
+
+    convert_options = csv.ConvertOptions(
+        column_types={c: pa.string() for c in column_names},
+        strings_can_be_null=True,
+    )
+    with _open_input_stream(path) as f:
+        reader = csv.open_csv(
+            f,
+            read_options=read_options,
+            parse_options=parse_options,
+            convert_options=convert_options,
+        )
+        yield from reader
+
+
+def _iter_json_batches(path: str, block_size: int) -> Iterator[pa.Table]:
+    """
+    Streams a newline delimited json file as tables of whole lines.
+    Each table's types are inferred independently.
+    """
+    remainder = b""
+    with _open_input_stream(path) as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            block = remainder + block
+            end = block.rfind(b"\n") + 1
+            if end == 0:
+                remainder = block
+                continue
+            remainder = block[end:]
+            yield json.read_json(BytesIO(block[:end]))
+
+        if remainder.strip():
+            yield json.read_json(BytesIO(remainder))
+
+
+def infer_metadata_from_sample(
+    path: str,
+    file_format: str = None,
+    sample_rows: int = 100_000,
+    block_size: int = 1 << 20,
+    delimiter: str = ",",
+    meta_init_dict: dict = None,
+    metadata_class: type = Metadata,
+) -> Metadata:
+    """
+    Infers a Metadata object (column names, types, nullability and
+    type_category) from the first `sample_rows` of a csv or newline
+    delimited json file. See Metadata.from_data_sample.
+    """
+    file_format = file_format or _get_file_format(path)
+    types: Dict[str, Union[pa.DataType, None]] = {}
+    non_null: Dict[str, int] = {}
+    n_rows = 0
+
+    if file_format == "csv":
+        batches = _iter_csv_batches(path, block_size, delimiter)
+    elif file_format == "json":
+        batches = _iter_json_batches(path, block_size)
+    else:
+        raise ValueError(f"file_format must be csv or json not {file_format}")
+
+    for batch in batches:
+        batch = batch.slice(0, sample_rows - n_rows)
+        n_rows += batch.num_rows
+        for name, arr in zip(batch.schema.names, batch.columns):
+            non_null[name] = non_null.get(name, 0) + len(arr) - arr.null_count
+            current = types.get(name)
+            if file_format == "csv":
+                if current == pa.string():
+                    continue
+                new = _infer_csv_string_type(arr)
+            else:
+                new = arr.type
+            types[name] = widen_arrow_type(current, new)
+
+        if n_rows >= sample_rows:
+            break
+
+    ac = ArrowConverter()
+    meta_init_dict = dict(meta_init_dict) if meta_init_dict else {}
+    meta_init_dict["file_format"] = meta_init_dict.get("file_format", file_format)
+    meta_init_dict["columns"] = [
+        {
+            "name": name,
+            "type": ac.reverse_convert_col_type(arrow_type),
+            "nullable": non_null[name] < n_rows,
+        }
+        for name, arrow_type in types.items()
+    ]
+
+    metadata = metadata_class.from_dict(meta_init_dict)
+    metadata.set_col_type_category_from_types()
+    return metadata
@@ -0,0 +1,266 @@
+import hashlib
+
+from typing import Callable, Dict, Iterable, Iterator, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from mojap_metadata.metadata.metadata import Metadata
+
+_masking_methods = ("hash", "null", "tokenise")
+
+# type of the masked values for each method (None keeps the column's type)
+_masked_types = {"hash": pa.string(), "null": None, "tokenise": pa.int64()}
+
+
+def _value_bytes(values: pa.Array) -> list:
+    """Returns each value of a (non null) array as bytes for hashing"""
+    if pa.types.is_fixed_size_binary(values.type):
+        return values.to_pylist()
+    if pa.types.is_large_binary(values.type) or pa.types.is_large_string(values.type):
+        return pc.cast(values, pa.large_binary()).to_pylist()
+    if not pa.types.is_binary(values.type):
+        # cast to string first so numbers, dates etc. hash as their text
+        values = pc.cast(values, pa.string())
+    return pc.cast(values, pa.binary()).to_pylist()
+
+
+class SensitiveDataMasker:
+    """
+    Masks the sensitive columns of pyarrow data. Each masked column is
+    dictionary encoded with pyarrow compute kernels and only its distinct
+    values are hashed or tokenised, then taken back out to the rows.
+    Arrow has no keyed hash kernel, so hashing and tokenising is a python
+    call per distinct value in each batch (about 1s per million distinct
+    values hashed), which is the cost for high cardinality columns. Columns
+    that are not sensitive are passed through as they are (their buffers
+    are not copied).
+
+    A column is sensitive if its sensitive property is True, or if the
+    table is sensitive and the column does not set sensitive. Fields nested
+    in struct (and list) columns are masked by listing their dotted paths
+    (see Metadata.nested_path_index) in the column's sensitive_paths e.g.
+    {"name": "address", ..., "sensitive_paths": ["address.postcode"]}.
+    Masking a struct or list masks every field nested in it.
+
+    Each column is masked with the method in its masking property, or
+    the masker's method if not set:
+    - hash: a keyed blake2b hash (hex string) of the value.
+    - null: every value is null.
+    - tokenise: an int64 token. The same value gets the same token in
+      every batch masked by the masker (tokens start at 1 for each column).
+      The masker keeps every distinct value it has tokenised in memory,
+      so set max_tokens to bound it on long streams.
+
+    Args:
+        metadata (Metadata): metadata with the sensitive flags
+        method (str, optional): hash, null or tokenise. Defaults to "hash".
+        salt (bytes, optional): secret key for the hash (up to 64 bytes).
+            Required if any column is hashed, as unkeyed hashes of low
+            cardinality values (e.g. postcodes or dates of birth) are easy to
+            reverse. Only needed for other methods.
+        max_tokens (int, optional): Most distinct values tokenised per column.
+            A ValueError is raised when a column has more. Defaults to None
+            (no limit).
+
+    Example:
+    masker = SensitiveDataMasker(metadata, salt=secret)
+    for batch in pq.ParquetFile("data.parquet").iter_batches():
+        writer.write_batch(masker.mask(batch))
+    """
+
+    def __init__(
+        self,
+        metadata: Metadata,
+        method: str = "hash",
+        salt: bytes = b"",
+        max_tokens: int = None,
+    ):
+        if method not in _masking_methods:
+            raise ValueError(f"method must be one of {_masking_methods} not {method}")
+        self.metadata = metadata
+        self.method = method
+        self.salt = salt
+        self.max_tokens = max_tokens
+        self._tokens = {}
+
+        # column name to (paths to mask, method)
+        self._masked_columns = {}
+        index = metadata.nested_path_index
+        for col in metadata.columns:
+            col_method = col.get("masking", method)
+            if col_method not in _masking_methods:
+                raise ValueError(
+                    f"masking for {col['name']} must be one of {_masking_methods} "
+                    f"not {col_method}"
+                )
+            sensitive = col.get("sensitive", metadata.sensitive)
+            if sensitive:
+                paths = {col["name"]}
+            else:
+                paths = set(col.get("sensitive_paths", []))
+            unknown = [p for p in paths if p not in index and p != col["name"]]
+            if unknown:
+                raise ValueError(f"sensitive_paths not in metadata: {unknown}")
+            if paths:
+                self._masked_columns[col["name"]] = (paths, col_method)
+
+        hashed = [k for k, v in self._masked_columns.items() if v[1] == "hash"]
+        if hashed and not salt:
+            raise ValueError(
+                f"a salt is required to hash {hashed}, as unkeyed hashes of low "
+                "cardinality values are easy to reverse"
+            )
+
+    @property
+    def masked_columns(self) -> Dict[str, list]:
+        """The columns that are masked and the paths masked in each"""
+        return {k: sorted(v[0]) for k, v in self._masked_columns.items()}
+
+    def mask(
+        self, data: Union[pa.Table, pa.RecordBatch]
+    ) -> Union[pa.Table, pa.RecordBatch]:
+        """
+        Masks a table or record batch. Columns not in the metadata are passed
+        through unchanged.
+
+        Args:
+            data (Union[pa.Table, pa.RecordBatch]): data to mask
+
+        Returns:
+            Union[pa.Table, pa.RecordBatch]: the masked data
+        """
+        arrays = []
+        fields = []
+        for field, arr in zip(data.schema, data.columns):
+            if field.name in self._masked_columns:
+                paths, method = self._masked_columns[field.name]
+                if isinstance(arr, pa.ChunkedArray):
+                    chunks = [
+                        self._mask_array(c, field.name, paths, method)
+                        for c in arr.chunks
+                    ]
+                    arr = pa.chunked_array(
+                        chunks, type=chunks[0].type if chunks else None
+                    )
+                else:
+                    arr = self._mask_array(arr, field.name, paths, method)
+                field = pa.field(field.name, arr.type, nullable=True)
+            arrays.append(arr)
+            fields.append(field)
+
+        schema = pa.schema(fields, metadata=data.schema.metadata)
+        if isinstance(data, pa.Table):
+            return pa.Table.from_arrays(arrays, schema=schema)
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def _mask_array(self, arr: pa.Array, path: str, paths: set, method: str):
+        if path in paths:
+            return self._mask_all(arr, path, method)
+        if not any(p.startswith(f"{path}.") for p in paths):
+            return arr
+        return self._map_children(
+            arr, path, lambda c, p: self._mask_array(c, p, paths, method)
+        )
+
+    def _mask_all(self, arr: pa.Array, path: str, method: str) -> pa.Array:
+        """Masks every value in the array (and everything nested in it)"""
+        if method == "null":
+            return pa.nulls(len(arr), arr.type)
+        if pa.types.is_nested(arr.type):
+            return self._map_children(
+                arr, path, lambda c, p: self._mask_all(c, p, method)
+            )
+        return self._mask_values(arr, path, method)
+
+    def _map_children(self, arr: pa.Array, path: str, fun: Callable) -> pa.Array:
+        """
+        Rebuilds a struct or list array with fun(child, child_path) applied
+        to its children (without copying the struct or list itself).
+        """
+        mask = arr.is_null() if arr.null_count else None
+        if pa.types.is_struct(arr.type):
+            children = [
+                fun(arr.field(i), f"{path}.{f.name}") for i, f in enumerate(arr.type)
+            ]
+            return pa.StructArray.from_arrays(
+                children,
+                fields=[f.with_type(c.type) for f, c in zip(arr.type, children)],
+                mask=mask,
+            )
+        if pa.types.is_list(arr.type) or pa.types.is_large_list(arr.type):
+            # only the values in the (possibly sliced) array are masked.
+            # Rebased offsets (rather than a slice of them) can have a mask
+            offsets = arr.offsets
+            start = offsets[0].as_py()
+            values = arr.values.slice(start, offsets[-1].as_py() - start)
+            offsets = pc.subtract(offsets, pa.scalar(start, offsets.type))
+            list_class = (
+                pa.ListArray if pa.types.is_list(arr.type) else pa.LargeListArray
+            )
+            return list_class.from_arrays(
+                offsets, fun(values, f"{path}.element"), mask=mask
+            )
+        raise ValueError(f"{path} has no nested fields to mask")
+
+    def _mask_values(self, arr: pa.Array, path: str, method: str) -> pa.Array:
+        """Hashes or tokenises every value in a (non nested) array"""
+        encoded = arr if pa.types.is_dictionary(arr.type) else arr.dictionary_encode()
+        distinct = encoded.dictionary
+        if method == "hash":
+            # copying a keyed hash is quicker than keying a new one
+            copy = hashlib.blake2b(key=self.salt, digest_size=16).copy
+
+            def hexdigest(v: bytes) -> str:
+                h = copy()
+                h.update(v)
+                return h.hexdigest()
+
+            masked = pa.array(
+                list(map(hexdigest, _value_bytes(distinct))), _masked_types[method]
+            )
+        else:
+            tokens = self._tokens.setdefault(path, {})
+            values = _value_bytes(distinct)
+            if self.max_tokens is not None:
+                # checked before any token is added, so the limit is kept
+                n_new = sum(v not in tokens for v in values)
+                if len(tokens) + n_new > self.max_tokens:
+                    raise ValueError(
+                        f"{path} has more than max_tokens ({self.max_tokens}) "
+                        "distinct values to tokenise"
+                    )
+            masked = pa.array(
+                [tokens.setdefault(v, len(tokens) + 1) for v in values],
+                _masked_types[method],
+            )
+        return pc.take(masked, encoded.indices)
+
+
+def mask_sensitive_data(
+    metadata: Metadata,
+    data: Union[pa.Table, pa.RecordBatch, Iterable[pa.RecordBatch]],
+    method: str = "hash",
+    salt: bytes = b"",
+    max_tokens: int = None,
+) -> Union[pa.Table, pa.RecordBatch, Iterator[pa.RecordBatch]]:
+    """
+    Masks the sensitive columns of a table, record batch or stream of record
+    batches (e.g. a pa.RecordBatchReader). See SensitiveDataMasker.
+
+    Args:
+        metadata (Metadata): metadata with the sensitive flags
+        data (Union[pa.Table, pa.RecordBatch, Iterable[pa.RecordBatch]]): data
+        method (str, optional): hash, null or tokenise. Defaults to "hash".
+        salt (bytes, optional): secret key for the hash (up to 64 bytes).
+            Required if any column is hashed.
+        max_tokens (int, optional): Most distinct values tokenised per column.
+
+    Returns:
+        Union[pa.Table, pa.RecordBatch, Iterator[pa.RecordBatch]]: the masked
+            data (an iterator of batches for a stream)
+    """
+    masker = SensitiveDataMasker(metadata, method, salt, max_tokens)
+    if isinstance(data, (pa.Table, pa.RecordBatch)):
+        return masker.mask(data)
+    return (masker.mask(batch) for batch in data)
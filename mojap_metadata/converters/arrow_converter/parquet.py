@@ -0,0 +1,592 @@
+import inspect
+import os
+import warnings
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple, Union
+from urllib.parse import unquote
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pyarrow import fs
+
+from mojap_metadata.metadata.metadata import _metadata_complex_dtype_names_bracket
+from mojap_metadata.converters.arrow_converter.inference import (
+    _infer_csv_string_type,
+    widen_arrow_type,
+)
+
+_hive_null_partition = "__HIVE_DEFAULT_PARTITION__"
+
+
+def _get_filesystem_and_path(path: str) -> Tuple[fs.FileSystem, str]:
+    if "://" in path:
+        return fs.FileSystem.from_uri(path)
+    return fs.LocalFileSystem(), os.path.abspath(path)
+
+
+def list_dataset_files(filesystem: fs.FileSystem, root: str) -> List[str]:
+    """
+    Lists the data files in a dataset directory (and its subdirectories).
+    Files and directories starting with "_" or "." (e.g. _SUCCESS) are skipped,
+    as they are by pyarrow datasets.
+    """
+    selector = fs.FileSelector(root, recursive=True)
+    paths = []
+    for info in filesystem.get_file_info(selector):
+        if info.type != fs.FileType.File:
+            continue
+        rel_parts = info.path[len(root) :].strip("/").split("/")
+        if any(p.startswith(("_", ".")) for p in rel_parts):
+            continue
+        paths.append(info.path)
+    return sorted(paths)
+
+
+def _get_hive_partitions(root: str, path: str) -> List[Tuple[str, str]]:
+    """Returns the (key, value) of each key=value directory in the path"""
+    rel_dirs = path[len(root) :].strip("/").split("/")[:-1]
+    partitions = []
+    for d in rel_dirs:
+        if "=" in d:
+            k, v = d.split("=", 1)
+            partitions.append((unquote(k), unquote(v)))
+    return partitions
+
+
+def _schema_key(schema: pa.Schema) -> tuple:
+    # Ignores schema and field metadata
+    return tuple((f.name, str(f.type), f.nullable) for f in schema)
+
+
+def _describe_divergence(reference: pa.Schema, schema: pa.Schema) -> List[str]:
+    differences = []
+    ref_fields = {f.name: f for f in reference}
+    fields = {f.name: f for f in schema}
+    for name, f in ref_fields.items():
+        if name not in fields:
+            differences.append(f"missing column {name}")
+        elif fields[name].type != f.type:
+            differences.append(f"column {name} is {fields[name].type} not {f.type}")
+        elif fields[name].nullable != f.nullable:
+            differences.append(
+                f"column {name} has nullable {fields[name].nullable} not {f.nullable}"
+            )
+    for name in fields:
+        if name not in ref_fields:
+            differences.append(f"extra column {name}")
+    if not differences and list(fields) != list(ref_fields):
+        differences.append("columns are in a different order")
+    return differences
+
+
+def _unify_fields(reference: pa.Schema, schemas: List[pa.Schema]) -> dict:
+    """
+    Returns the fields of the reference schema widened to fit every
+    schema, followed by fields only found in other schemas.
+    """
+    fields = {f.name: f for f in reference}
+    for schema in schemas:
+        for f in schema:
+            if f.name in fields:
+                current = fields[f.name]
+                new_type = widen_arrow_type(current.type, f.type)
+                nullable = current.nullable or f.nullable
+                fields[f.name] = pa.field(f.name, new_type, nullable=nullable)
+            else:
+                fields[f.name] = f.with_nullable(True)
+    # columns missing from some files are null in those files
+    for name, f in fields.items():
+        if any(name not in schema.names for schema in schemas):
+            fields[name] = f.with_nullable(True)
+    return fields
+
+
+def read_parquet_dataset_schema(
+    path: str, max_workers: int = 16
+) -> Tuple[pa.Schema, List[str], Dict[str, List[str]]]:
+    """
+    Reads the schema of every parquet file in a dataset from the file
+    footers only (no data is read) and unifies them into one schema.
+
+    Args:
+        path (str): local directory or uri (e.g. s3://bucket/prefix/) of the dataset
+        max_workers (int, optional): number of footers read at once.
+            Defaults to 16.
+
+    Returns:
+        Tuple[pa.Schema, List[str], Dict[str, List[str]]]: The unified schema
+            (with any hive partition columns at the end), the names of the
+            hive partition columns and the path and differences of every file
+            whose schema diverges from the most common schema in the dataset.
+    """
+    filesystem, root = _get_filesystem_and_path(path)
+    root = root.rstrip("/")
+    paths = list_dataset_files(filesystem, root)
+    if not paths:
+        raise FileNotFoundError(f"No data files found in {path}")
+
+    def read_schema(p):
+        return pq.read_schema(p, filesystem=filesystem)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        schemas = list(executor.map(read_schema, paths))
+
+    # The most common schema is the reference the others are checked against
+    distinct = {}
+    for schema in schemas:
+        distinct.setdefault(_schema_key(schema), schema)
+    counts = Counter(_schema_key(s) for s in schemas)
+    reference = distinct[counts.most_common(1)[0][0]]
+
+    divergent = {}
+    for p, schema in zip(paths, schemas):
+        if _schema_key(schema) != _schema_key(reference):
+            divergent[p] = _describe_divergence(reference, schema)
+
+    fields = _unify_fields(reference, list(distinct.values()))
+
+    partitions, partition_values = _get_partition_values(root, paths, divergent)
+    _check_partition_collisions(partitions, fields)
+    for name in partitions:
+        values = pa.array(partition_values[name], pa.string())
+        fields[name] = pa.field(
+            name, _infer_csv_string_type(values), nullable=values.null_count > 0
+        )
+
+    return pa.schema(list(fields.values())), partitions, divergent
+
+
+def _check_partition_collisions(partitions: Iterable[str], columns: Iterable[str]):
+    """Raises an error if a hive partition has the name of a data column"""
+    collisions = sorted(set(partitions) & set(columns))
+    if collisions:
+        raise ValueError(
+            f"hive partitions {collisions} have the same names as columns in "
+            "the data files"
+        )
+
+
+def _get_partition_values(
+    root: str, paths: List[str], divergent: Dict[str, List[str]]
+) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Returns the hive partition column names (in directory order) and
+    every value of each. Files with different partition columns to the
+    most common partition columns are added to divergent.
+    """
+    file_partitions = {p: _get_hive_partitions(root, p) for p in paths}
+    counts = Counter(tuple(k for k, _ in fp) for fp in file_partitions.values())
+    partitions = list(counts.most_common(1)[0][0])
+    partition_values = {k: [] for k in partitions}
+
+    for p, fp in file_partitions.items():
+        keys = [k for k, _ in fp]
+        if keys != partitions:
+            divergent.setdefault(p, []).append(
+                f"partitions {keys} do not match {partitions}"
+            )
+            continue
+        for k, v in fp:
+            partition_values[k].append(None if v == _hive_null_partition else v)
+    return partitions, partition_values
+
+
+def generate_meta_from_parquet_dataset(
+    converter,
+    path: str,
+    meta_init_dict: dict = None,
+    max_workers: int = 16,
+    return_divergent: bool = False,
+):
+    """See ArrowConverter.generate_to_meta_from_parquet_dataset"""
+    schema, partitions, divergent = read_parquet_dataset_schema(path, max_workers)
+
+    if divergent:
+        warnings.warn(
+            f"{len(divergent)} file(s) in {path} have a schema that differs from "
+            f"the rest of the dataset: {list(divergent)[:5]}"
+        )
+
+    meta_init_dict = dict(meta_init_dict) if meta_init_dict else {}
+    meta_init_dict["partitions"] = partitions
+    meta_init_dict.setdefault("file_format", "parquet")
+    metadata = converter.generate_to_meta(schema, meta_init_dict)
+    for col in metadata.columns:
+        col["nullable"] = schema.field(col["name"]).nullable
+    metadata.validate()
+
+    if return_divergent:
+        return metadata, divergent
+    return metadata
+
+
+# parquet_options that can be set on the table and on columns
+_table_parquet_options = (
+    "row_group_size",
+    "compression",
+    "compression_level",
+    "use_dictionary",
+    "write_statistics",
+    "sorting_columns",
+    "bloom_filter_columns",
+)
+_column_parquet_options = (
+    "compression",
+    "compression_level",
+    "use_dictionary",
+    "write_statistics",
+    "bloom_filter",
+)
+# ParquetWriter's defaults for the options that can be set per column
+_parquet_writer_defaults = {
+    "compression": "snappy",
+    "compression_level": None,
+    "use_dictionary": True,
+    "write_statistics": True,
+}
+
+
+def _check_parquet_options(options: dict, allowed: Tuple[str], where: str) -> None:
+    unknown = [k for k in options if k not in allowed]
+    if unknown:
+        raise ValueError(f"unknown parquet_options for {where}: {unknown}")
+
+
+def _count_leaves(arrow_type: pa.DataType) -> int:
+    if pa.types.is_struct(arrow_type):
+        return sum(_count_leaves(f.type) for f in arrow_type)
+    if pa.types.is_list(arrow_type) or pa.types.is_large_list(arrow_type):
+        return _count_leaves(arrow_type.value_type)
+    return 1
+
+
+def _get_leaf_columns(converter, metadata, name: str) -> List[str]:
+    """Returns the parquet column paths of every leaf of a column"""
+    index = metadata.nested_path_index
+    paths = [
+        p
+        for p, t in index.items()
+        if (p == name or p.startswith(f"{name}."))
+        and not t.startswith(_metadata_complex_dtype_names_bracket)
+    ]
+    if not paths:
+        return [name]
+    return converter.generate_parquet_columns(metadata, paths)
+
+
+def _get_column_option(
+    key: str, table_options: dict, column_options: Dict[str, dict], leaves: dict
+):
+    """
+    Returns the value of a ParquetWriter option that can be set per column:
+    the table's value if no column sets it, otherwise a list of the leaf
+    columns it is on (for use_dictionary and write_statistics) or a dict of
+    leaf column to value (for compression and compression_level).
+    """
+    table_value = table_options.get(key)
+    if not any(key in o for o in column_options.values()):
+        return table_value
+
+    default = _parquet_writer_defaults[key] if table_value is None else table_value
+    values = {}
+    for name, leaf_columns in leaves.items():
+        value = column_options.get(name, {}).get(key, default)
+        for leaf in leaf_columns:
+            values[leaf] = value
+
+    if key in ("use_dictionary", "write_statistics"):
+        return [leaf for leaf, v in values.items() if v]
+    return {leaf: v for leaf, v in values.items() if v is not None}
+
+
+def _get_sorting_columns(schema: pa.Schema, sorting: List) -> List[pq.SortingColumn]:
+    leaf_index = {}
+    i = 0
+    for field in schema:
+        if not pa.types.is_nested(field.type):
+            leaf_index[field.name] = i
+        i += _count_leaves(field.type)
+
+    sorting_columns = []
+    for s in sorting:
+        s = {"name": s} if isinstance(s, str) else s
+        if s["name"] not in leaf_index:
+            raise ValueError(
+                f"sorting column {s['name']} is not a (non nested) column in the schema"
+            )
+        sorting_columns.append(
+            pq.SortingColumn(
+                leaf_index[s["name"]],
+                descending=s.get("descending", False),
+                nulls_first=s.get("nulls_first", False),
+            )
+        )
+    return sorting_columns
+
+
+def _get_bloom_filter_options(
+    table_options: dict, column_options: Dict[str, dict], leaves: dict
+) -> dict:
+    bloom_filters = {
+        name: True for name in table_options.get("bloom_filter_columns", [])
+    }
+    for name, options in column_options.items():
+        if options.get("bloom_filter") is not None:
+            bloom_filters[name] = options["bloom_filter"]
+
+    bloom_filter_options = {}
+    for name, value in bloom_filters.items():
+        if name not in leaves:
+            raise ValueError(f"bloom filter column {name} is not in the schema")
+        if value:
+            for leaf in leaves[name]:
+                bloom_filter_options[leaf] = value
+    return bloom_filter_options
+
+
+def generate_parquet_writer_options(
+    converter, metadata, drop_partitions: bool = True
+) -> Tuple[dict, Union[int, None]]:
+    """See ArrowConverter.generate_parquet_writer_options"""
+    table_options = metadata._data.get("parquet_options") or {}
+    _check_parquet_options(table_options, _table_parquet_options, "the table")
+
+    schema = converter.generate_from_meta(metadata, drop_partitions=drop_partitions)
+    column_options = {}
+    for col in metadata.columns:
+        if col["name"] in schema.names and col.get("parquet_options"):
+            _check_parquet_options(
+                col["parquet_options"], _column_parquet_options, col["name"]
+            )
+            column_options[col["name"]] = col["parquet_options"]
+    leaves = {
+        name: _get_leaf_columns(converter, metadata, name) for name in schema.names
+    }
+
+    kwargs = {}
+    for key in _parquet_writer_defaults:
+        value = _get_column_option(key, table_options, column_options, leaves)
+        if value is not None:
+            kwargs[key] = value
+
+    if table_options.get("sorting_columns"):
+        kwargs["sorting_columns"] = _get_sorting_columns(
+            schema, table_options["sorting_columns"]
+        )
+
+    bloom_filter_options = _get_bloom_filter_options(
+        table_options, column_options, leaves
+    )
+    if bloom_filter_options:
+        if "bloom_filter_options" in inspect.signature(pq.write_table).parameters:
+            kwargs["bloom_filter_options"] = bloom_filter_options
+        else:
+            warnings.warn(
+                "bloom filters are not written as the installed pyarrow version "
+                "does not support them"
+            )
+
+    return kwargs, table_options.get("row_group_size")
+
+
+def _new_column_statistics() -> dict:
+    return {
+        "row_count": 0,
+        "null_count": 0,
+        "min": None,
+        "max": None,
+        "has_min_max": True,
+        "distinct_counts": [],
+        "repeated": False,
+    }
+
+
+def _update_min_max(stats: dict, minimum, maximum) -> None:
+    try:
+        if stats["min"] is None or minimum < stats["min"]:
+            stats["min"] = minimum
+        if stats["max"] is None or maximum > stats["max"]:
+            stats["max"] = maximum
+    except TypeError:
+        # e.g. files with incompatible types for the column
+        stats["has_min_max"] = False
+
+
+def _add_column_chunk(stats: dict, num_rows: int, chunk_stats) -> None:
+    """Adds the statistics of one column chunk (a column in a row group)"""
+    stats["row_count"] += num_rows
+    if chunk_stats is None or not chunk_stats.has_null_count:
+        stats["null_count"] = None
+        stats["has_min_max"] = False
+        stats["distinct_counts"] = None
+        return
+
+    if stats["null_count"] is not None:
+        stats["null_count"] += chunk_stats.null_count
+    if chunk_stats.has_min_max:
+        if stats["has_min_max"]:
+            _update_min_max(stats, chunk_stats.min, chunk_stats.max)
+    elif chunk_stats.num_values:
+        # has values but no min or max
+        stats["has_min_max"] = False
+
+    if stats["distinct_counts"] is not None:
+        if chunk_stats.has_distinct_count:
+            stats["distinct_counts"].append(chunk_stats.distinct_count)
+        elif chunk_stats.num_values:
+            stats["distinct_counts"] = None
+
+
+def _read_file_statistics(file_metadata: pq.FileMetaData) -> Dict[str, dict]:
+    file_stats = {}
+    for i in range(file_metadata.num_row_groups):
+        row_group = file_metadata.row_group(i)
+        for j in range(row_group.num_columns):
+            column = row_group.column(j)
+            stats = file_stats.get(column.path_in_schema)
+            if stats is None:
+                stats = file_stats[column.path_in_schema] = _new_column_statistics()
+                # leaves in lists have a value (or null) per list element
+                schema_column = file_metadata.schema.column(j)
+                stats["repeated"] = schema_column.max_repetition_level > 0
+            _add_column_chunk(stats, row_group.num_rows, column.statistics)
+    return file_stats
+
+
+def _merge_column_statistics(stats: dict, other: dict) -> None:
+    stats["row_count"] += other["row_count"]
+    stats["repeated"] = stats["repeated"] or other["repeated"]
+    if stats["null_count"] is None or other["null_count"] is None:
+        stats["null_count"] = None
+    else:
+        stats["null_count"] += other["null_count"]
+
+    if not other["has_min_max"]:
+        stats["has_min_max"] = False
+    elif stats["has_min_max"] and other["min"] is not None:
+        _update_min_max(stats, other["min"], other["max"])
+
+    if stats["distinct_counts"] is None or other["distinct_counts"] is None:
+        stats["distinct_counts"] = None
+    else:
+        stats["distinct_counts"].extend(other["distinct_counts"])
+
+
+def _finalise_column_statistics(stats: dict, total_rows: int) -> dict:
+    # the null and distinct counts of leaves in lists are per list element
+    # (so can be more than the number of rows) rather than per row
+    null_count = None if stats["repeated"] else stats["null_count"]
+    # a column missing from some files is null in those files
+    if null_count is not None:
+        null_count += total_rows - stats["row_count"]
+    minimum, maximum = (
+        (stats["min"], stats["max"]) if stats["has_min_max"] else (None, None)
+    )
+
+    distinct_count = None
+    if null_count is not None:
+        non_null = total_rows - null_count
+        if non_null == 0:
+            distinct_count = 0
+        elif minimum is not None and minimum == maximum:
+            distinct_count = 1
+        elif stats["distinct_counts"]:
+            distinct_count = min(sum(stats["distinct_counts"]), non_null)
+
+    return {
+        "row_count": total_rows,
+        "null_count": null_count,
+        "min": minimum,
+        "max": maximum,
+        "distinct_count": distinct_count,
+    }
+
+
+def _get_partition_statistics(
+    root: str, paths: List[str], row_counts: List[int]
+) -> Dict[str, dict]:
+    """Statistics of the hive partition columns (exact, from the file paths)"""
+    partitions, _ = _get_partition_values(root, paths, {})
+    values = {k: [] for k in partitions}
+    for p, num_rows in zip(paths, row_counts):
+        fp = _get_hive_partitions(root, p)
+        if [k for k, _ in fp] != partitions:
+            continue
+        for k, v in fp:
+            values[k].append((None if v == _hive_null_partition else v, num_rows))
+
+    statistics = {}
+    for k, file_values in values.items():
+        arr = pa.array([v for v, _ in file_values], pa.string())
+        typed = arr.cast(_infer_csv_string_type(arr)).to_pylist()
+        non_null = [v for v in typed if v is not None]
+        statistics[k] = {
+            "row_count": sum(n for _, n in file_values),
+            "null_count": sum(n for v, (_, n) in zip(typed, file_values) if v is None),
+            "min": min(non_null) if non_null else None,
+            "max": max(non_null) if non_null else None,
+            "distinct_count": len(set(non_null)),
+        }
+    return statistics
+
+
+def read_parquet_dataset_statistics(
+    path: str, max_workers: int = 16
+) -> Dict[str, dict]:
+    """
+    Reads column statistics from the footer of every parquet file in a
+    dataset (in parallel, no data is read) and combines them across
+    files and row groups.
+
+    Args:
+        path (str): local directory or uri (e.g. s3://bucket/prefix/) of the dataset
+        max_workers (int, optional): number of footers read at once.
+            Defaults to 16.
+
+    Returns:
+        Dict[str, dict]: parquet column path (e.g. id, address.postcode or
+            items.list.element.sku) to its row_count, null_count, min, max
+            and distinct_count. Hive partition columns are included (with
+            exact values from the file paths). Values the footers do not
+            have for every row group are None. distinct_count is approximate:
+            1 if min equals max, otherwise the sum of the row groups'
+            distinct counts (capped at the number of non null values) if
+            every row group has one. Fields nested in lists (e.g.
+            items.list.element.sku) only have a min and max, as their footer
+            counts are per list element rather than per row.
+    """
+    filesystem, root = _get_filesystem_and_path(path)
+    root = root.rstrip("/")
+    paths = list_dataset_files(filesystem, root)
+    if not paths:
+        raise FileNotFoundError(f"No data files found in {path}")
+
+    def read_statistics(p):
+        with filesystem.open_input_file(p) as f:
+            file_metadata = pq.read_metadata(f)
+        return file_metadata.num_rows, _read_file_statistics(file_metadata)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(read_statistics, paths))
+
+    combined = {}
+    for _, file_stats in results:
+        for column_path, stats in file_stats.items():
+            if column_path in combined:
+                _merge_column_statistics(combined[column_path], stats)
+            else:
+                combined[column_path] = stats
+
+    total_rows = sum(num_rows for num_rows, _ in results)
+    statistics = {
+        k: _finalise_column_statistics(v, total_rows) for k, v in combined.items()
+    }
+    partition_statistics = _get_partition_statistics(
+        root, paths, [n for n, _ in results]
+    )
+    _check_partition_collisions(partition_statistics, statistics)
+    statistics.update(partition_statistics)
+    return statistics
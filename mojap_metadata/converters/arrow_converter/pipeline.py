@@ -0,0 +1,276 @@
+from typing import Any, Iterator, List, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from pyarrow import csv
+
+from mojap_metadata.metadata.metadata import Metadata
+from mojap_metadata.converters.arrow_converter import ArrowConverter
+from mojap_metadata.converters.arrow_converter.inference import (
+    _get_file_format,
+    _iter_json_batches,
+    _open_input_stream,
+)
+from mojap_metadata.converters.arrow_converter.parquet import _get_filesystem_and_path
+
+
+def conform_batch(
+    batch: Union[pa.RecordBatch, pa.Table], schema: pa.Schema
+) -> pa.RecordBatch:
+    """
+    Conforms a record batch to a schema. Columns are reordered to match the
+    schema and columns not in the schema are dropped. Columns that already
+    have the schema's type are used as they are (no copy), others are cast
+    (safely). Nullable columns missing from the batch are added as nulls.
+
+    Args:
+        batch (Union[pa.RecordBatch, pa.Table]): data to conform. A table
+            is combined into a single batch.
+        schema (pa.Schema): schema to conform to
+
+    Returns:
+        pa.RecordBatch: batch with the given schema
+
+    Raises:
+        ValueError: if a non nullable column is missing or contains nulls
+    """
+    if isinstance(batch, pa.Table):
+        batch = batch.combine_chunks().to_batches()[0] if batch.num_rows else None
+        if batch is None:
+            return pa.RecordBatch.from_pylist([], schema=schema)
+
+    names = batch.schema.names
+    arrays = []
+    for field in schema:
+        if field.name in names:
+            arr = batch.column(field.name)
+            if arr.type != field.type:
+                arr = pc.cast(arr, field.type)
+        elif field.nullable:
+            arr = pa.nulls(batch.num_rows, field.type)
+        else:
+            raise ValueError(f"Non nullable column {field.name} is missing")
+
+        if not field.nullable and arr.null_count:
+            raise ValueError(f"Non nullable column {field.name} contains nulls")
+        arrays.append(arr)
+
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _get_input_format(path: str) -> str:
+    if path.lower().endswith((".parquet", ".parq")):
+        return "parquet"
+    return _get_file_format(path)
+
+
+def _get_path_partition_values(
+    metadata: Metadata, partitioning: ds.Partitioning, path: str
+) -> dict:
+    """
+    Returns the values of the metadata's partitions in a hive style path
+    (e.g. .../year=2020/data.csv), keyed by name. Raises a ValueError if a
+    partition is missing from the path.
+    """
+    values = ds.get_partition_keys(partitioning.parse(path))
+    missing = [p for p in metadata.partitions if p not in values]
+    if missing:
+        raise ValueError(
+            f"partition columns {missing} are not in the data or the hive style "
+            f"path (e.g. .../{missing[0]}=value/file) of {path}"
+        )
+    return values
+
+
+def _add_partition_values(
+    batch: Union[pa.RecordBatch, pa.Table],
+    metadata: Metadata,
+    partitioning: ds.Partitioning,
+    path: str,
+) -> Union[pa.RecordBatch, pa.Table]:
+    """
+    Adds the partition columns missing from the batch, with their values
+    from the hive style path of the file it was read from.
+    """
+    missing = [p for p in metadata.partitions if p not in batch.schema.names]
+    if not missing:
+        return batch
+    values = _get_path_partition_values(metadata, partitioning, path)
+    for name in missing:
+        arrow_type = partitioning.schema.field(name).type
+        batch = batch.append_column(
+            name, pa.repeat(pa.scalar(values[name], arrow_type), batch.num_rows)
+        )
+    return batch
+
+
+def _iter_batches(
+    metadata: Metadata,
+    path: str,
+    file_format: str,
+    batch_size: int,
+    block_size: int,
+    csv_options: Any,
+) -> Iterator[Union[pa.RecordBatch, pa.Table]]:
+    if file_format == "parquet":
+        filesystem, path = _get_filesystem_and_path(path)
+        with filesystem.open_input_file(path) as f:
+            yield from pq.ParquetFile(f).iter_batches(batch_size=batch_size)
+    elif file_format == "csv":
+        (
+            read_options,
+            parse_options,
+            convert_options,
+        ) = ArrowConverter().generate_csv_read_options(
+            metadata,
+            csv_options=csv_options,
+            drop_partitions=csv_options is not None,
+            block_size=block_size,
+        )
+        with _open_input_stream(path) as f:
+            yield from csv.open_csv(
+                f,
+                read_options=read_options,
+                parse_options=parse_options,
+                convert_options=convert_options,
+            )
+    elif file_format == "json":
+        yield from _iter_json_batches(path, block_size)
+    else:
+        raise ValueError(f"file_format must be csv, json or parquet not {file_format}")
+
+
+def iter_conformed_batches(
+    metadata: Metadata,
+    input_paths: Union[str, List[str]],
+    file_format: str = None,
+    batch_size: int = 65536,
+    block_size: int = 1 << 20,
+    csv_options: Any = None,
+    drop_partitions: bool = False,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Reads csv, newline delimited json or parquet files a batch at a time
+    and conforms each batch to the metadata's arrow schema (see conform_batch).
+
+    Args:
+        metadata (Metadata): metadata to conform the data to
+        input_paths (Union[str, List[str]]): local paths or uris of the files
+        file_format (str, optional): "csv", "json" or "parquet". Inferred from
+            each file's extension if not set.
+        batch_size (int, optional): rows per batch read from parquet files.
+            Defaults to 65536.
+        block_size (int, optional): bytes per batch read from csv and json
+            files. Defaults to 1MB.
+        csv_options (Any, optional): csv settings (e.g. the `csv` of
+            GlueConverterOptions). See ArrowConverter.generate_csv_read_options.
+            Defaults to None (csvs have a header row and are comma separated).
+            If set the partition columns are not read from the csvs (like
+            Glue).
+        drop_partitions (bool, optional): drop the partition columns.
+            Defaults to False. Otherwise partition columns missing from a
+            file's data are taken from its hive style path (e.g.
+            .../year=2020/data.csv).
+
+    Raises:
+        ValueError: if a partition column is in neither a file's data nor
+            its path
+
+    Yields:
+        pa.RecordBatch: batches with the metadata's arrow schema
+    """
+    if isinstance(input_paths, str):
+        input_paths = [input_paths]
+
+    ac = ArrowConverter()
+    schema = ac.generate_from_meta(metadata, drop_partitions=drop_partitions)
+    partitioning = None if drop_partitions else ac.generate_partitioning(metadata)
+    for path in input_paths:
+        batches = _iter_batches(
+            metadata,
+            path,
+            file_format or _get_input_format(path),
+            batch_size,
+            block_size,
+            csv_options,
+        )
+        for batch in batches:
+            if partitioning is not None:
+                batch = _add_partition_values(batch, metadata, partitioning, path)
+            yield conform_batch(batch, schema)
+
+
+def conform_to_parquet(
+    metadata: Metadata,
+    input_paths: Union[str, List[str]],
+    output_path: str,
+    file_format: str = None,
+    batch_size: int = 65536,
+    block_size: int = 1 << 20,
+    csv_options: Any = None,
+    existing_data_behavior: str = "overwrite_or_ignore",
+    **write_dataset_kwargs,
+) -> int:
+    """
+    Conforms csv, newline delimited json or parquet files to the metadata
+    and writes them as parquet, hive partitioned by the metadata's
+    partitions. Data is streamed a batch at a time so memory use does not
+    grow with the size of the input. See iter_conformed_batches.
+
+    Args:
+        metadata (Metadata): metadata to conform the data to
+        input_paths (Union[str, List[str]]): local paths or uris of the files
+        output_path (str): local directory or uri to write the dataset to
+        file_format (str, optional): "csv", "json" or "parquet". Inferred from
+            each file's extension if not set.
+        batch_size (int, optional): rows per batch read from parquet files.
+            Defaults to 65536.
+        block_size (int, optional): bytes per batch read from csv and json
+            files. Defaults to 1MB.
+        csv_options (Any, optional): csv settings (e.g. the `csv` of
+            GlueConverterOptions). See ArrowConverter.generate_csv_read_options.
+            Defaults to None (csvs have a header row and are comma separated).
+            Partition columns not in the data are taken from each file's
+            hive style path.
+        existing_data_behavior (str, optional): see pyarrow.dataset.write_dataset.
+            Defaults to "overwrite_or_ignore".
+        **write_dataset_kwargs: passed to pyarrow.dataset.write_dataset
+            (e.g. max_rows_per_file or basename_template)
+
+    Returns:
+        int: number of rows written
+    """
+    ac = ArrowConverter()
+    schema = ac.generate_from_meta(metadata, drop_partitions=False)
+    partitioning = ac.generate_partitioning(metadata)
+
+    rows = 0
+
+    def counted_batches():
+        nonlocal rows
+        for batch in iter_conformed_batches(
+            metadata,
+            input_paths,
+            file_format=file_format,
+            batch_size=batch_size,
+            block_size=block_size,
+            csv_options=csv_options,
+        ):
+            rows += batch.num_rows
+            yield batch
+
+    filesystem, output_path = _get_filesystem_and_path(output_path)
+    ds.write_dataset(
+        counted_batches(),
+        output_path,
+        schema=schema,
+        format="parquet",
+        partitioning=partitioning,
+        filesystem=filesystem,
+        existing_data_behavior=existing_data_behavior,
+        **write_dataset_kwargs,
+    )
+    return rows
@@ -0,0 +1,423 @@
+import datetime
+import math
+import string
+import warnings
+
+from decimal import Decimal
+from typing import Iterator, Union
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # python < 3.11
+    import sre_constants
+    import sre_parse
+
+from mojap_metadata.metadata.metadata import Metadata
+from mojap_metadata.converters.arrow_converter import ArrowConverter
+
+_alnum_chars = string.ascii_letters + string.digits
+_pattern_categories = {
+    sre_constants.CATEGORY_DIGIT: string.digits,
+    sre_constants.CATEGORY_WORD: _alnum_chars + "_",
+    sre_constants.CATEGORY_SPACE: " ",
+}
+_char_set_ops = (sre_constants.LITERAL, sre_constants.IN, sre_constants.ANY)
+_repeat_ops = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+
+# unbounded repeats in patterns (e.g. + or *) repeat at most this many more times
+_max_extra_repeats = 8
+# pattern strings outside minLength or maxLength are generated again until
+# this many attempts in a row replace none of them
+_max_length_retries = 20
+_default_string_length = (1, 12)
+_default_float_range = (0.0, 1e6)
+_default_list_length = (0, 4)
+_default_date_range = (
+    (datetime.date(2000, 1, 1) - datetime.date(1970, 1, 1)).days,
+    (datetime.date(2030, 12, 31) - datetime.date(1970, 1, 1)).days,
+)
+_ticks_per_second = {"s": 1, "ms": 1_000, "us": 1_000_000, "ns": 1_000_000_000}
+
+
+class _UnsupportedPattern(ValueError):
+    pass
+
+
+def _random_strings(rng: np.random.Generator, chars: str, lengths: np.ndarray):
+    """
+    Returns a numpy array of random strings of chars with the given lengths.
+    The strings are built as a 2d array of code points (padded with 0s,
+    which numpy strips from the end of strings) viewed as strings.
+    """
+    width = int(lengths.max()) if len(lengths) else 0
+    if width == 0:
+        return np.full(len(lengths), "")
+    codes = np.array([ord(c) for c in chars], dtype=np.uint32)
+    code_points = codes[rng.integers(0, len(codes), (len(lengths), width))]
+    code_points[np.arange(width) >= lengths[:, None]] = 0
+    return code_points.view(f"U{width}").ravel()
+
+
+def _pattern_char_set(op, av) -> str:
+    """Returns the characters a single character regex node can match"""
+    if op == sre_constants.LITERAL:
+        return chr(av)
+    if op == sre_constants.ANY:
+        return _alnum_chars
+    chars = []
+    for item_op, item_av in av:
+        if item_op == sre_constants.LITERAL:
+            chars.append(chr(item_av))
+        elif item_op == sre_constants.RANGE:
+            chars.extend(chr(c) for c in range(item_av[0], item_av[1] + 1))
+        elif item_op == sre_constants.CATEGORY and item_av in _pattern_categories:
+            chars.extend(_pattern_categories[item_av])
+        else:
+            raise _UnsupportedPattern(f"{item_op} is not supported")
+    return "".join(dict.fromkeys(chars))
+
+
+def _generate_repeat(rng: np.random.Generator, n: int, av) -> np.ndarray:
+    low, high, sub_pattern = av
+    if high == sre_constants.MAXREPEAT:
+        high = low + _max_extra_repeats
+    counts = rng.integers(low, high, n, endpoint=True)
+
+    nodes = list(sub_pattern)
+    if len(nodes) == 1 and nodes[0][0] in _char_set_ops:
+        return _random_strings(rng, _pattern_char_set(*nodes[0]), counts)
+
+    out = np.full(n, "")
+    for i in range(high):
+        piece = _generate_from_pattern(rng, n, sub_pattern)
+        out = np.char.add(out, np.where(counts > i, piece, ""))
+    return out
+
+
+def _generate_pattern_node(rng: np.random.Generator, n: int, op, av) -> np.ndarray:
+    if op in _char_set_ops:
+        return _random_strings(rng, _pattern_char_set(op, av), np.ones(n, int))
+    if op in _repeat_ops:
+        return _generate_repeat(rng, n, av)
+    if op == sre_constants.SUBPATTERN:
+        return _generate_from_pattern(rng, n, av[-1])
+    if op == sre_constants.BRANCH:
+        branches = np.stack([_generate_from_pattern(rng, n, b) for b in av[1]])
+        return branches[rng.integers(0, len(branches), n), np.arange(n)]
+    if op == sre_constants.AT:
+        return np.full(n, "")
+    raise _UnsupportedPattern(f"{op} is not supported")
+
+
+def _generate_from_pattern(rng: np.random.Generator, n: int, parsed) -> np.ndarray:
+    """Generates n strings matching a parsed regex pattern"""
+    out = np.full(n, "")
+    for op, av in parsed:
+        out = np.char.add(out, _generate_pattern_node(rng, n, op, av))
+    return out
+
+
+def _parse_pattern(col: dict):
+    """
+    Parses the column's pattern if strings matching it can be generated
+    (literals, character classes, groups, alternation and repeats).
+    Returns None (with a warning) if they cannot.
+    """
+    try:
+        parsed = sre_parse.parse(col["pattern"])
+        _generate_from_pattern(np.random.default_rng(0), 1, parsed)
+    except (_UnsupportedPattern, ValueError, OverflowError) as e:
+        warnings.warn(
+            f"Cannot generate strings matching the pattern of {col['name']} "
+            f"({e}). Random strings are generated instead."
+        )
+        return None
+    return parsed
+
+
+def _get_bounds(spec: dict, default_low, default_high):
+    low = spec.get("minimum")
+    high = spec.get("maximum")
+    low = default_low if low is None else low
+    high = default_high if high is None else high
+    if low > high:
+        raise ValueError(f"minimum of {spec.get('name')} is greater than its maximum")
+    return low, high
+
+
+def _generate_integers(rng, arrow_type: pa.DataType, n: int, spec: dict):
+    dtype = np.dtype(arrow_type.to_pandas_dtype())
+    info = np.iinfo(dtype)
+    low, high = _get_bounds(spec, info.min, info.max)
+    low, high = max(math.ceil(low), info.min), min(math.floor(high), info.max)
+    values = rng.integers(low, high, n, dtype=dtype, endpoint=True)
+    return pa.array(values, arrow_type)
+
+
+def _generate_floats(rng, arrow_type: pa.DataType, n: int, spec: dict):
+    dtype = np.dtype(arrow_type.to_pandas_dtype())
+    info = np.finfo(dtype)
+    low, high = _get_bounds(spec, *_default_float_range)
+    low, high = max(low, float(info.min)), min(high, float(info.max))
+    # interpolated (rather than low + (high - low) * u) so ranges wider
+    # than the largest float do not overflow
+    u = rng.random(n)
+    values = (low * (1 - u) + high * u).astype(dtype)
+    return pa.array(values, arrow_type)
+
+
+def _generate_decimals(rng, arrow_type: pa.DataType, n: int, spec: dict):
+    # random unscaled integers written straight into the decimal128 buffer
+    # (16 byte little endian two's complement). Unscaled values are limited
+    # to int64, so precisions above 18 get at most 18 digits by default
+    largest = min(10**arrow_type.precision - 1, np.iinfo(np.int64).max)
+    scale = 10**arrow_type.scale
+    low, high = _get_bounds(spec, -math.inf, math.inf)
+    # via Decimal so e.g. 0.29 is 29 hundredths rather than 28.999...
+    low = -largest if low == -math.inf else math.ceil(Decimal(str(low)) * scale)
+    high = largest if high == math.inf else math.floor(Decimal(str(high)) * scale)
+    if low > high:
+        raise ValueError(
+            f"minimum and maximum of {spec.get('name')} have no values with "
+            f"{arrow_type.scale} decimal places between them"
+        )
+    if low < -largest or high > largest:
+        if largest < 10**arrow_type.precision - 1:
+            raise ValueError(
+                f"Cannot generate {spec.get('name')} values beyond "
+                f"±{largest / scale:g} (the int64 range of the unscaled values)"
+            )
+        low, high = max(low, -largest), min(high, largest)
+    unscaled = rng.integers(low, high, n, dtype=np.int64, endpoint=True)
+    words = np.empty((n, 2), dtype=np.int64)
+    words[:, 0] = unscaled
+    words[:, 1] = unscaled >> 63
+    return pa.Array.from_buffers(arrow_type, n, [None, pa.py_buffer(words)])
+
+
+def _generate_pattern_strings(rng, n: int, spec: dict) -> np.ndarray:
+    """
+    Generates n strings matching the spec's parsed pattern. Strings outside
+    its minLength or maxLength are generated again (a ValueError is raised
+    if no more of them can be replaced).
+    """
+    values = _generate_from_pattern(rng, n, spec["pattern"])
+    low = spec.get("minLength")
+    high = spec.get("maxLength")
+    if low is None and high is None:
+        return values
+    low = 0 if low is None else low
+    high = math.inf if high is None else high
+    if low > high:
+        raise ValueError(
+            f"minLength of {spec.get('name')} is greater than its maxLength"
+        )
+
+    retries = 0
+    lengths = np.char.str_len(values)
+    bad = np.flatnonzero((lengths < low) | (lengths > high))
+    while len(bad):
+        if retries == _max_length_retries:
+            raise ValueError(
+                f"Cannot generate strings matching the pattern of "
+                f"{spec.get('name')} between its minLength and maxLength"
+            )
+        new = _generate_from_pattern(rng, len(bad), spec["pattern"])
+        new_lengths = np.char.str_len(new)
+        ok = (new_lengths >= low) & (new_lengths <= high)
+        if new.dtype.itemsize > values.dtype.itemsize:
+            values = values.astype(new.dtype)
+        values[bad[ok]] = new[ok]
+        retries = 0 if ok.any() else retries + 1
+        bad = bad[~ok]
+    return values
+
+
+def _generate_strings(rng, arrow_type: pa.DataType, n: int, spec: dict):
+    if spec.get("pattern") is not None:
+        values = _generate_pattern_strings(rng, n, spec)
+    else:
+        low = spec.get("minLength")
+        high = spec.get("maxLength")
+        if low is None:
+            low = min(
+                _default_string_length[0],
+                _default_string_length[1] if high is None else high,
+            )
+        if high is None:
+            high = max(_default_string_length[1], low)
+        if low > high:
+            raise ValueError(
+                f"minLength of {spec.get('name')} is greater than its maxLength"
+            )
+        lengths = rng.integers(int(low), int(high), n, endpoint=True)
+        values = _random_strings(rng, _alnum_chars, lengths)
+    return pa.array(values, pa.string()).cast(arrow_type)
+
+
+def _generate_dates(rng, arrow_type: pa.DataType, n: int, spec: dict):
+    days = rng.integers(*_default_date_range, n, dtype=np.int32, endpoint=True)
+    return pa.array(days, pa.int32()).cast(pa.date32()).cast(arrow_type)
+
+
+def _generate_timestamps(rng, arrow_type: pa.DataType, n: int, spec: dict):
+    ticks = _ticks_per_second[arrow_type.unit] * 86400
+    low, high = (d * ticks for d in _default_date_range)
+    values = rng.integers(low, high, n, dtype=np.int64)
+    return pa.array(values, pa.int64()).cast(arrow_type)
+
+
+def _generate_times(rng, arrow_type: pa.DataType, n: int, spec: dict):
+    storage = pa.int32() if pa.types.is_time32(arrow_type) else pa.int64()
+    ticks = _ticks_per_second[arrow_type.unit] * 86400
+    values = rng.integers(0, ticks, n, dtype=storage.to_pandas_dtype())
+    return pa.array(values, storage).cast(arrow_type)
+
+
+def _generate_structs(rng, arrow_type: pa.DataType, n: int, spec: dict):
+    children = [_generate_array(rng, f.type, n, {}) for f in arrow_type]
+    return pa.StructArray.from_arrays(children, fields=list(arrow_type))
+
+
+def _generate_lists(rng, arrow_type: pa.DataType, n: int, spec: dict):
+    lengths = rng.integers(*_default_list_length, n, endpoint=True)
+    offset_type = np.int32 if pa.types.is_list(arrow_type) else np.int64
+    offsets = np.zeros(n + 1, dtype=offset_type)
+    np.cumsum(lengths, out=offsets[1:])
+    values = _generate_array(rng, arrow_type.value_type, int(offsets[-1]), {})
+    list_class = pa.ListArray if pa.types.is_list(arrow_type) else pa.LargeListArray
+    return list_class.from_arrays(pa.array(offsets), values, type=arrow_type)
+
+
+def _generate_booleans(rng, arrow_type: pa.DataType, n: int, spec: dict):
+    return pa.array(rng.random(n) < 0.5, arrow_type)
+
+
+def _generate_nulls(rng, arrow_type: pa.DataType, n: int, spec: dict):
+    return pa.nulls(n, arrow_type)
+
+
+def _is_string_or_binary(arrow_type: pa.DataType) -> bool:
+    return (
+        pa.types.is_string(arrow_type)
+        or pa.types.is_large_string(arrow_type)
+        or pa.types.is_binary(arrow_type)
+        or pa.types.is_large_binary(arrow_type)
+    )
+
+
+# (type check, generator) for the types the ArrowConverter can generate
+_generators = (
+    (pa.types.is_null, _generate_nulls),
+    (pa.types.is_boolean, _generate_booleans),
+    (pa.types.is_integer, _generate_integers),
+    (pa.types.is_floating, _generate_floats),
+    (pa.types.is_decimal, _generate_decimals),
+    (_is_string_or_binary, _generate_strings),
+    (pa.types.is_date, _generate_dates),
+    (pa.types.is_timestamp, _generate_timestamps),
+    (pa.types.is_time, _generate_times),
+    (pa.types.is_struct, _generate_structs),
+    (lambda t: pa.types.is_list(t) or pa.types.is_large_list(t), _generate_lists),
+)
+
+
+def _generate_enum(rng, arrow_type: pa.DataType, n: int, spec: dict):
+    value_type = (
+        arrow_type.value_type if pa.types.is_dictionary(arrow_type) else arrow_type
+    )
+    enum = pa.array([v for v in spec["enum"] if v is not None]).cast(value_type)
+    indices = pa.array(rng.integers(0, len(enum), n, dtype=np.int32))
+    if pa.types.is_dictionary(arrow_type):
+        return pa.DictionaryArray.from_arrays(indices, enum).cast(arrow_type)
+    return pc.take(enum, indices)
+
+
+def _generate_array(
+    rng: np.random.Generator, arrow_type: pa.DataType, n: int, spec: dict
+) -> pa.Array:
+    """
+    Generates n random values of arrow_type within the column spec's enum,
+    minimum, maximum, minLength, maxLength and (parsed) pattern.
+    """
+    if spec.get("enum"):
+        return _generate_enum(rng, arrow_type, n, spec)
+    if pa.types.is_dictionary(arrow_type):
+        values = _generate_array(rng, arrow_type.value_type, n, spec)
+        return values.dictionary_encode().cast(arrow_type)
+    for is_type, generate in _generators:
+        if is_type(arrow_type):
+            return generate(rng, arrow_type, n, spec)
+    raise ValueError(f"Cannot generate synthetic data of type {arrow_type}")
+
+
+def _get_column_spec(col: dict) -> dict:
+    spec = dict(col)
+    if col.get("pattern") is not None and not col.get("enum"):
+        spec["pattern"] = _parse_pattern(col)
+    return spec
+
+
+def generate_synthetic_batches(
+    metadata: Metadata,
+    n_rows: int,
+    seed: Union[int, None] = None,
+    batch_size: int = 65536,
+    null_fraction: float = 0.1,
+    drop_partitions: bool = False,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Generates random record batches with the arrow schema of the metadata.
+    Values are generated with numpy a column at a time (there are no python
+    loops over rows) so millions of rows can be generated quickly.
+
+    Each column's values respect its type, enum, minimum and maximum (for
+    numbers), minLength and maxLength (for strings). String columns with a
+    pattern get strings matching it where the pattern only uses literals,
+    character classes (e.g. [A-Z] or \\d), groups, alternation (|) and
+    repeats (unbounded repeats such as + are capped), and strings outside
+    their minLength or maxLength are generated again. Other patterns are
+    ignored with a warning. Decimal values are limited to 18 digits (the
+    int64 range of their unscaled values), so a ValueError is raised if
+    a decimal column's minimum or maximum is beyond that or no value with
+    the column's scale is between them. Nullable columns get nulls in roughly
+    null_fraction of their rows, non nullable columns never do.
+    Fields nested in struct and list columns are random values of their type.
+
+    Args:
+        metadata (Metadata): metadata to generate data for
+        n_rows (int): total number of rows
+        seed (Union[int, None], optional): seed for the random values. The
+            same seed and batch_size give the same data. Defaults to None.
+        batch_size (int, optional): rows per batch. Defaults to 65536.
+        null_fraction (float, optional): probability a value in a nullable
+            column is null. Defaults to 0.1.
+        drop_partitions (bool, optional): leave out the partition columns.
+            Defaults to False.
+
+    Yields:
+        pa.RecordBatch: batches of up to batch_size rows
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+
+    schema = ArrowConverter().generate_from_meta(
+        metadata, drop_partitions=drop_partitions
+    )
+    specs = {col["name"]: _get_column_spec(col) for col in metadata.columns}
+    rng = np.random.default_rng(seed)
+
+    for start in range(0, n_rows, batch_size):
+        n = min(batch_size, n_rows - start)
+        arrays = []
+        for field in schema:
+            arr = _generate_array(rng, field.type, n, specs[field.name])
+            if field.nullable and null_fraction > 0:
+                mask = pa.array(rng.random(n) < null_fraction)
+                arr = pc.if_else(mask, pa.scalar(None, field.type), arr)
+            arrays.append(arr)
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
@@ -0,0 +1,272 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from mojap_metadata.metadata.metadata import Metadata
+from mojap_metadata.converters.arrow_converter import ArrowConverter
+
+
+@dataclass
+class ConformanceReport:
+    """
+    The result of checking data against a Metadata object.
+
+    num_rows (int): number of rows checked
+    violations (Dict[str, Dict[str, int]]): column name to check name
+        (nullable, enum, pattern, minimum, maximum, minLength, maxLength,
+        unique or type) to the number of rows that failed the check
+    samples (Dict[str, Dict[str, List[int]]]): column name to check name
+        to the row numbers (in the order the data was given) of the first
+        rows that failed the check
+    type_errors (Dict[str, str]): column name to a description of why the
+        data could not be cast to the column type. When a batch cannot be
+        cast every non null value in it counts as a type violation
+    missing_columns (List[str]): metadata columns that are not in the data
+    extra_columns (List[str]): data columns that are not in the metadata
+    """
+
+    num_rows: int = 0
+    violations: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    samples: Dict[str, Dict[str, List[int]]] = field(default_factory=dict)
+    type_errors: Dict[str, str] = field(default_factory=dict)
+    missing_columns: List[str] = field(default_factory=list)
+    extra_columns: List[str] = field(default_factory=list)
+
+    @property
+    def valid(self) -> bool:
+        return not self.violations and not self.missing_columns
+
+
+def _is_string_like(arrow_type: pa.DataType) -> bool:
+    return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+
+
+def _is_binary_like(arrow_type: pa.DataType) -> bool:
+    return (
+        pa.types.is_binary(arrow_type)
+        or pa.types.is_large_binary(arrow_type)
+        or pa.types.is_fixed_size_binary(arrow_type)
+    )
+
+
+def _is_numeric(arrow_type: pa.DataType) -> bool:
+    return (
+        pa.types.is_integer(arrow_type)
+        or pa.types.is_floating(arrow_type)
+        or pa.types.is_decimal(arrow_type)
+    )
+
+
+def _length(arr: pa.Array) -> Union[pa.Array, None]:
+    if _is_string_like(arr.type):
+        return pc.utf8_length(arr)
+    if _is_binary_like(arr.type):
+        return pc.binary_length(arr)
+    if pa.types.is_list(arr.type) or pa.types.is_large_list(arr.type):
+        return pc.list_value_length(arr)
+    return None
+
+
+def _bound_checks(col: dict, arr: pa.Array) -> Dict[str, pa.Array]:
+    """Returns the minimum, maximum, minLength and maxLength violation masks"""
+    checks = {}
+    bounds = [("minimum", pc.less), ("maximum", pc.greater)]
+    if _is_numeric(arr.type):
+        for check, fun in bounds:
+            if col.get(check) is not None:
+                checks[check] = fun(arr, col[check])
+
+    has_length_check = any(col.get(k) is not None for k in ("minLength", "maxLength"))
+    length = _length(arr) if has_length_check else None
+    if length is not None:
+        for check, fun in [("minLength", pc.less), ("maxLength", pc.greater)]:
+            if col.get(check) is not None:
+                checks[check] = fun(length, col[check])
+    return checks
+
+
+class ConformanceValidator:
+    """
+    Checks pyarrow data against a Metadata object using pyarrow compute
+    kernels (there are no python loops over rows).
+
+    Each column is checked against its nullable, enum, pattern, minimum,
+    maximum, minLength, maxLength and unique properties (where set) and its
+    type. Data that can be safely cast to the column's type (e.g. int32 data
+    for an int64 column) conforms to it. pattern uses RE2 syntax and (like
+    jsonschema) matches anywhere in the value unless anchored with ^ and $.
+
+    Data can be checked a batch at a time with `update` (unique is checked
+    across every batch) and the results read from `report`.
+
+    Args:
+        metadata (Metadata): metadata to check the data against
+        max_samples (int, optional): number of failing row numbers kept per
+            column and check. Defaults to 10.
+        drop_partitions (bool, optional): Do not expect partition columns in
+            the data. Defaults to True.
+
+    Example:
+    validator = ConformanceValidator(metadata)
+    for batch in pq.ParquetFile("data.parquet").iter_batches():
+        validator.update(batch)
+    validator.report.violations # {"age": {"minimum": 3}}
+    """
+
+    def __init__(
+        self, metadata: Metadata, max_samples: int = 10, drop_partitions: bool = True
+    ):
+        self.metadata = metadata
+        self.max_samples = max_samples
+        self.report = ConformanceReport()
+
+        ac = ArrowConverter()
+        self._columns = [
+            c
+            for c in metadata.columns
+            if not (drop_partitions and c["name"] in metadata.partitions)
+        ]
+        self._types = {c["name"]: ac.convert_col_type(c["type"]) for c in self._columns}
+        self._seen = {c["name"]: None for c in self._columns if c.get("unique")}
+        self._value_sets = {}
+        self._checked_columns = False
+
+    def update(self, data: Union[pa.Table, pa.RecordBatch]) -> ConformanceReport:
+        """
+        Checks a table or record batch and adds the results to the report.
+
+        Args:
+            data (Union[pa.Table, pa.RecordBatch]): data to check
+
+        Returns:
+            ConformanceReport: the report for all the data checked so far
+        """
+        batches = data.to_batches() if isinstance(data, pa.Table) else [data]
+        for batch in batches:
+            self._check_batch(batch)
+        return self.report
+
+    def _check_batch(self, batch: pa.RecordBatch) -> None:
+        names = batch.schema.names
+        if not self._checked_columns:
+            self.report.missing_columns = [
+                c["name"] for c in self._columns if c["name"] not in names
+            ]
+            self.report.extra_columns = [n for n in names if n not in self._types]
+            self._checked_columns = True
+
+        offset = self.report.num_rows
+        for col in self._columns:
+            if col["name"] in names:
+                self._check_column(col, batch.column(col["name"]), offset)
+        self.report.num_rows += batch.num_rows
+
+    def _check_column(self, col: dict, arr: pa.Array, offset: int) -> None:
+        name = col["name"]
+        expected = self._types[name]
+        if arr.type != expected:
+            try:
+                arr = pc.cast(arr, expected, safe=True)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                self.report.type_errors.setdefault(name, str(e))
+                # every (non null) value in the batch fails
+                self._add(name, "type", pc.is_valid(arr), offset)
+                return
+
+        checks = {}
+        if col.get("nullable") is False:
+            checks["nullable"] = pc.is_null(arr)
+        if col.get("enum") is not None:
+            checks["enum"] = pc.invert(pc.is_in(arr, value_set=self._value_set(col)))
+        if col.get("pattern") is not None and _is_string_like(arr.type):
+            checks["pattern"] = pc.invert(pc.match_substring_regex(arr, col["pattern"]))
+        checks.update(_bound_checks(col, arr))
+        if col.get("unique"):
+            checks["unique"] = self._duplicates(name, arr)
+
+        valid = pc.is_valid(arr)
+        for check, mask in checks.items():
+            if check != "nullable":
+                # nulls are only checked by nullable
+                mask = pc.and_(mask, valid)
+            self._add(name, check, pc.fill_null(mask, False), offset)
+
+    def _value_set(self, col: dict) -> pa.Array:
+        name = col["name"]
+        if name not in self._value_sets:
+            values = pa.array(col["enum"])
+            try:
+                values = values.cast(self._types[name])
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                pass
+            self._value_sets[name] = values
+        return self._value_sets[name]
+
+    def _duplicates(self, name: str, arr: pa.Array) -> pa.Array:
+        """
+        Returns a mask of the values that have already been seen, in this
+        array or in a previous batch (the first occurrence is not a duplicate).
+        """
+        row = pa.array(range(len(arr)), pa.int64())
+        first_rows = (
+            pa.table({"v": arr, "i": row})
+            .group_by("v", use_threads=False)
+            .aggregate([("i", "min")])
+            .column("i_min")
+        )
+        duplicates = pc.invert(pc.is_in(row, value_set=first_rows))
+
+        seen = self._seen[name]
+        if seen is not None:
+            duplicates = pc.or_(duplicates, pc.is_in(arr, value_set=seen))
+            self._seen[name] = pc.unique(pa.concat_arrays([seen, pc.unique(arr)]))
+        else:
+            self._seen[name] = pc.unique(arr)
+        return duplicates
+
+    def _add(self, name: str, check: str, mask: pa.Array, offset: int) -> None:
+        count = pc.sum(mask).as_py() or 0
+        if not count:
+            return
+
+        col_violations = self.report.violations.setdefault(name, {})
+        col_violations[check] = col_violations.get(check, 0) + count
+
+        col_samples = self.report.samples.setdefault(name, {})
+        samples = col_samples.setdefault(check, [])
+        n = self.max_samples - len(samples)
+        if n > 0:
+            indices = pc.indices_nonzero(mask).slice(0, n)
+            samples.extend(i + offset for i in indices.to_pylist())
+
+
+def check_conformance(
+    metadata: Metadata,
+    data: Union[pa.Table, pa.RecordBatch, Iterable[pa.RecordBatch]],
+    max_samples: int = 10,
+    drop_partitions: bool = True,
+) -> ConformanceReport:
+    """
+    Checks a table, record batch or stream of record batches (e.g. a
+    pa.RecordBatchReader) against a Metadata object.
+    See ConformanceValidator.
+
+    Args:
+        metadata (Metadata): metadata to check the data against
+        data (Union[pa.Table, pa.RecordBatch, Iterable[pa.RecordBatch]]): data
+        max_samples (int, optional): number of failing row numbers kept per
+            column and check. Defaults to 10.
+        drop_partitions (bool, optional): Do not expect partition columns in
+            the data. Defaults to True.
+
+    Returns:
+        ConformanceReport: number of rows failing each check for each column
+    """
+    validator = ConformanceValidator(metadata, max_samples, drop_partitions)
+    if isinstance(data, (pa.Table, pa.RecordBatch)):
+        data = [data]
+    for batch in data:
+        validator.update(batch)
+    return validator.report
@@ -8,6 +8,7 @@ import ast
 
 import importlib.resources as pkg_resources
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 
 from mojap_metadata.converters import (
@@ -20,7 +21,7 @@ from mojap_metadata.metadata.metadata import (
     _metadata_complex_dtype_names,
 )
 from mojap_metadata.converters.glue_converter import specs
-from typing import Tuple, List, Union
+from typing import Iterable, Tuple, List, Union
 
 
 # Format generictype: (glue_type, is_fully_supported)
@@ -496,12 +497,7 @@ class GlueTable(BaseConverter):
         # do the same with table_location
         table_location = table_location if table_location else metadata.table_location
 
-        glue_client = boto3.client(
-            "glue",
-            region_name=os.getenv(
-                "AWS_REGION", os.getenv("AWS_DEFAULT_REGION", "eu-west-1")
-            ),
-        )
+        glue_client = _get_glue_client()
         metadata = Metadata.from_infer(metadata)
         boto_dict = self.gc.generate_from_meta(
             metadata,
@@ -538,6 +534,131 @@ class GlueTable(BaseConverter):
                 database_name, f"msck repair table {database_name}.{metadata.name}"
             )
 
+    def generate_from_meta_many(
+        self,
+        metadatas: Iterable[Union[Metadata, str, dict]],
+        database_name: str = None,
+        run_msck_repair: bool = False,
+        max_workers: int = 16,
+        glue_client=None,
+        athena_client=None,
+    ) -> List[str]:
+        """
+        Creates or updates many glue tables from metadata. Like
+        generate_from_meta, but each database is created (if it doesn't
+        exist) once, and existing tables are updated in place with
+        update_table (rather than deleted and created again) so they are never
+        missing. New tables are created with create_table. Tables are created
+        or updated (and msck repaired) concurrently over one shared glue
+        client and one shared athena client. Every table is attempted even if
+        some fail, and the tables that failed are listed in the error raised
+        at the end (a failed update leaves the existing table as it was).
+
+        Args:
+            metadatas: Metadata objects, string paths, or dictionary metadata.
+            database_name (optional): name of the glue database every table is
+            created in. Defaults to the database_name of each metadata.
+            run_msck_repair (optional): run msck repair table on the created
+            tables, should be set to True for tables with partitions.
+            max_workers (optional): maximum number of concurrent requests.
+            Defaults to 16.
+            glue_client (optional): boto3 glue client to use. Defaults to a new
+            client.
+            athena_client (optional): boto3 athena client to use. Defaults to a
+            new client (created on the calling thread).
+
+        Raises:
+            ValueError if the same table is given more than once, or any table
+            could not be created or updated (or msck repaired). The error
+            lists every table that failed.
+
+        Returns:
+            List[str]: the "database.table" names of the tables created or
+            updated
+        """
+        glue_client = glue_client if glue_client else _get_glue_client()
+        # clients are created here as creating them on the worker threads
+        # (from boto3's default session) is not thread safe
+        athena_client = athena_client if athena_client else _get_athena_client()
+        tables = {}
+        for metadata in metadatas:
+            metadata = Metadata.from_infer(metadata)
+            db = database_name if database_name else metadata.database_name
+            if (db, metadata.name) in tables:
+                raise ValueError(f"table {db}.{metadata.name} is given more than once")
+            boto_dict = self.gc.generate_from_meta(
+                metadata, database_name=db, table_location=metadata.table_location
+            )
+            tables[(db, metadata.name)] = (boto_dict, metadata)
+        databases = sorted({db for db, _ in tables})
+
+        existing = set()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(
+                executor.map(
+                    lambda db: _start_query_execution_and_wait(
+                        db,
+                        f"CREATE DATABASE IF NOT EXISTS {db};",
+                        athena_client=athena_client,
+                    ),
+                    databases,
+                )
+            )
+            for db in databases:
+                existing.update(
+                    (db, name) for name in _get_table_names(glue_client, db)
+                )
+
+            errors = dict(
+                executor.map(
+                    lambda t: (
+                        t,
+                        _get_error(
+                            glue_client.update_table
+                            if t in existing
+                            else glue_client.create_table,
+                            **tables[t][0],
+                        ),
+                    ),
+                    tables,
+                )
+            )
+            if run_msck_repair:
+                created = [t for t, e in errors.items() if e is None]
+                errors.update(
+                    executor.map(
+                        lambda t: (
+                            t,
+                            _get_error(
+                                _start_query_execution_and_wait,
+                                t[0],
+                                f"msck repair table {t[0]}.{t[1]}",
+                                athena_client=athena_client,
+                            ),
+                        ),
+                        created,
+                    )
+                )
+
+        failed = [
+            f"{db}.{name}: {e!r}" for (db, name), e in errors.items() if e is not None
+        ]
+        if failed:
+            raise ValueError(
+                f"{len(failed)} of {len(tables)} tables failed:\n" + "\n".join(failed)
+            )
+
+        partitioned = [
+            f"{db}.{name}" for (db, name), (_, m) in tables.items() if m.partitions
+        ]
+        if not run_msck_repair and partitioned and not self.options.ignore_warnings:
+            warnings.warn(
+                f"metadata for {partitioned} has partitions and run_msck_repair is "
+                "set to false. To supress these warnings set this converters "
+                "options.ignore_warnings = True"
+            )
+        return [f"{db}.{name}" for db, name in tables]
+
     def generate_to_meta(
         self,
         database: str,
@@ -802,8 +923,47 @@ def _convert_opts_into_dict(spec_opts: SpecOptions):
     return out_dict
 
 
-def _start_query_execution_and_wait(db: str, sql: str):
-    ath = boto3.client("athena")
+def _get_glue_client():
+    return boto3.client(
+        "glue",
+        region_name=os.getenv(
+            "AWS_REGION", os.getenv("AWS_DEFAULT_REGION", "eu-west-1")
+        ),
+    )
+
+
+def _get_athena_client():
+    return boto3.session.Session().client(
+        "athena",
+        region_name=os.getenv(
+            "AWS_REGION", os.getenv("AWS_DEFAULT_REGION", "eu-west-1")
+        ),
+    )
+
+
+def _get_error(fun, *args, **kwargs) -> Union[Exception, None]:
+    """Calls fun and returns the exception it raised (or None)"""
+    try:
+        fun(*args, **kwargs)
+    except Exception as e:
+        return e
+    return None
+
+
+def _get_table_names(glue_client, database_name: str) -> List[str]:
+    """
+    Returns the names of the tables in the database (listed a page of
+    tables at a time rather than a get_table per table)
+    """
+    paginator = glue_client.get_paginator("get_tables")
+    names = []
+    for page in paginator.paginate(DatabaseName=database_name):
+        names.extend(t["Name"] for t in page["TableList"])
+    return names
+
+
+def _start_query_execution_and_wait(db: str, sql: str, athena_client=None):
+    ath = athena_client if athena_client else boto3.client("athena")
     QueryExecutionContext = {"Database": db}
     WorkGroup = "primary"
     res = ath.start_query_execution(
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+from collections import OrderedDict
+from typing import Callable, Tuple, Union
+
+import boto3
+
+
+_default_cache = None
+
+
+def _split_s3_path(s3_path: str) -> Tuple[str, str]:
+    bucket, key = s3_path.replace("s3://", "", 1).split("/", 1)
+    return bucket, key
+
+
+class MetadataCache:
+    """
+    Two tier cache of parsed and validated metadata files. Used by
+    Metadata.from_json, from_yaml and from_infer once enabled with
+    `enable_metadata_cache`.
+
+    The first tier is an in-process LRU, the second (optional) tier is a
+    sqlite database in `cache_dir` so entries survive between processes.
+    Entries are stored as json (which, unlike pickle or marshal, is safe to
+    load from a shared cache_dir), so files with values json cannot store
+    (e.g. dates or datetimes loaded from yaml) are not cached. The cache
+    (and its hits and misses counters) can be used from many threads.
+
+    Local files are matched on path, size and modification time. If the size
+    or modification time has changed the file's content hash is checked
+    before it is parsed again. S3 objects are matched on path and ETag.
+
+    Args:
+        cache_dir (str, optional): Folder for the on disk cache. If None
+            only the in-process cache is used.
+        maxsize (int, optional): Number of entries kept in the in-process
+            cache. Defaults to 1024.
+    """
+
+    def __init__(self, cache_dir: str = None, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._s3_client = None
+        self._db = None
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._db = sqlite3.connect(
+                os.path.join(cache_dir, "metadata_cache_json.sqlite"),
+                check_same_thread=False,
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS metadata_cache ("
+                "kind TEXT, path TEXT, size INTEGER, mtime_ns INTEGER, "
+                "fingerprint TEXT, data TEXT, PRIMARY KEY (kind, path))"
+            )
+            self._db.commit()
+
+    def load(
+        self,
+        cls: type,
+        filename: str,
+        encoding: str,
+        parse: Callable,
+        read_s3: Callable,
+    ) -> object:
+        """
+        Returns a Metadata object (of type `cls`) for the file, from the cache
+        if the file has not changed since it was cached.
+
+        Args:
+            cls (type): Metadata class to create
+            filename (str): local or s3 path to the metadata file
+            encoding (str): encoding of the file
+            parse (Callable): takes the file text and returns a dict
+            read_s3 (Callable): takes an s3 path and encoding and returns a dict
+        """
+        kind = f"{cls.__module__}.{cls.__qualname__}:{parse.__name__}:{encoding}"
+
+        if filename.startswith("s3://"):
+            path = filename
+            bucket, key = _split_s3_path(filename)
+            etag = self._get_s3_client().head_object(Bucket=bucket, Key=key)["ETag"]
+            size, mtime_ns, fingerprint = -1, -1, etag
+            data = self._get(kind, path, size, mtime_ns, fingerprint)
+            if data is None:
+                data = cls.from_dict(read_s3(filename, encoding)).to_dict()
+                self._put(kind, path, size, mtime_ns, fingerprint, data)
+        else:
+            path = os.path.abspath(filename)
+            st = os.stat(path)
+            size, mtime_ns = st.st_size, st.st_mtime_ns
+            data = self._get(kind, path, size, mtime_ns)
+            if data is None:
+                with open(path, "rb") as f:
+                    content = f.read()
+                fingerprint = hashlib.sha256(content).hexdigest()
+                data = self._get(kind, path, size, mtime_ns, fingerprint)
+                if data is None:
+                    obj = parse(content.decode(encoding))
+                    data = cls.from_dict(obj).to_dict()
+                self._put(kind, path, size, mtime_ns, fingerprint, data)
+
+        return cls._from_validated_dict(data)
+
+    def _get(
+        self,
+        kind: str,
+        path: str,
+        size: int,
+        mtime_ns: int,
+        fingerprint: str = None,
+    ) -> Union[dict, None]:
+        """
+        Returns the cached data for a file or None. If fingerprint is None
+        the entry must match size and mtime_ns, otherwise it must match the
+        fingerprint.
+        """
+        with self._lock:
+            entry = self._lru.get((kind, path))
+            if entry is not None:
+                self._lru.move_to_end((kind, path))
+            elif self._db is not None:
+                entry = self._db.execute(
+                    "SELECT size, mtime_ns, fingerprint, data FROM metadata_cache "
+                    "WHERE kind = ? AND path = ?",
+                    (kind, path),
+                ).fetchone()
+
+        if entry is not None:
+            e_size, e_mtime_ns, e_fingerprint, text = entry
+            if fingerprint is None:
+                hit = e_size == size and e_mtime_ns == mtime_ns
+            else:
+                hit = e_fingerprint == fingerprint
+            if hit:
+                with self._lock:
+                    self.hits += 1
+                    if (kind, path) not in self._lru:
+                        self._add_to_lru((kind, path), entry)
+                return json.loads(text)
+
+        if fingerprint is not None:
+            with self._lock:
+                self.misses += 1
+        return None
+
+    def _put(
+        self,
+        kind: str,
+        path: str,
+        size: int,
+        mtime_ns: int,
+        fingerprint: str,
+        data: dict,
+    ) -> None:
+        try:
+            text = json.dumps(data, separators=(",", ":"))
+        except (TypeError, ValueError):
+            # e.g. dates loaded from yaml. These files are not cached
+            return
+        if json.loads(text) != data:
+            # e.g. yaml keys that are not strings
+            return
+        entry = (size, mtime_ns, fingerprint, text)
+        with self._lock:
+            self._add_to_lru((kind, path), entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO metadata_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    (kind, path) + entry,
+                )
+                self._db.commit()
+
+    def _add_to_lru(self, key: tuple, entry: tuple) -> None:
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def _get_s3_client(self):
+        if self._s3_client is None:
+            self._s3_client = boto3.client("s3")
+        return self._s3_client
+
+    def clear(self) -> None:
+        """Removes every entry from both tiers of the cache"""
+        with self._lock:
+            self._lru.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM metadata_cache")
+                self._db.commit()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def enable_metadata_cache(cache_dir: str = None, maxsize: int = 1024) -> MetadataCache:
+    """
+    Turns on caching for Metadata.from_json, from_yaml and from_infer.
+    See MetadataCache.
+
+    Args:
+        cache_dir (str, optional): Folder for the on disk cache. If None
+            only the in-process cache is used.
+        maxsize (int, optional): Number of entries kept in the in-process
+            cache. Defaults to 1024.
+
+    Returns:
+        MetadataCache: the cache now in use
+    """
+    global _default_cache
+    disable_metadata_cache()
+    _default_cache = MetadataCache(cache_dir=cache_dir, maxsize=maxsize)
+    return _default_cache
+
+
+def disable_metadata_cache() -> None:
+    """Turns off caching for Metadata.from_json, from_yaml and from_infer"""
+    global _default_cache
+    if _default_cache is not None:
+        _default_cache.close()
+    _default_cache = None
+
+
+def get_metadata_cache() -> Union[MetadataCache, None]:
+    """Returns the cache in use or None if caching is off"""
+    return _default_cache
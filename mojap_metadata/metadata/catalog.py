@@ -0,0 +1,357 @@
+import json
+import mmap
+import struct
+import warnings
+
+from collections import defaultdict
+from collections.abc import Mapping
+from typing import Iterable, Iterator, List, Set, Tuple
+
+from mojap_metadata.metadata.metadata import Metadata, _get_type_category
+from mojap_metadata.metadata.profiling import catalog_memory_report
+
+# Bundle layout: magic, header length (little endian uint64), json header
+# {"version": 1, "tables": {key: [offset, length]}} then the json documents.
+# Offsets are relative to the end of the header.
+_bundle_magic = b"MOJAPMB1"
+_bundle_header_len = struct.Struct("<Q")
+
+_column_indexes = ("name", "type_category", "sensitive", "alias", "foreign_key_table")
+_table_indexes = ("name", "database_name", "sensitive")
+
+
+def _get_table_key(metadata: Metadata) -> str:
+    if metadata.database_name:
+        return f"{metadata.database_name}.{metadata.name}"
+    return metadata.name
+
+
+class MetadataCatalog(Mapping):
+    """
+    A container for many Metadata objects with indexes over the tables
+    and their columns so they can be queried without scanning every column.
+
+    Tables are keyed by "<database_name>.<name>" (or just "<name>" if the
+    metadata has no database_name).
+
+    Tables are indexed when they are added. If a Metadata object is changed
+    after it is added to the catalog call `add` again to reindex it.
+
+    Example:
+    catalog = MetadataCatalog([meta1, meta2])
+    catalog.find_columns(name="nomis_id", sensitive=True)
+    catalog.find_tables(foreign_key_table="offenders")
+    """
+
+    def __init__(self, metadata_objects: Iterable[Metadata] = None):
+        self._tables = {}
+        self._table_index = {k: defaultdict(set) for k in _table_indexes}
+        self._column_index = {k: defaultdict(set) for k in _column_indexes}
+        # (index, value, reference) for every entry made for each table
+        self._index_entries = {}
+        self._table_columns = {}
+        # tables in a bundle that have not been decoded yet
+        self._pending = {}
+        self._bundle = None
+        self._bundle_data_start = 0
+        self._bundle_validate = False
+
+        for metadata in metadata_objects or []:
+            self.add(metadata)
+
+    def add(self, metadata: Metadata) -> str:
+        """
+        Adds (or replaces) a table in the catalog and indexes it.
+
+        Args:
+            metadata (Metadata): metadata for the table
+
+        Returns:
+            str: the key of the table in the catalog
+        """
+        key = _get_table_key(metadata)
+        if key in self:
+            self.remove(key)
+
+        self._tables[key] = metadata
+        self._index_table(key, metadata)
+        return key
+
+    def remove(self, key: str) -> Metadata:
+        """Removes a table from the catalog and its indexes"""
+        if key in self._pending:
+            return self._decode(*self._pending.pop(key))
+        if key not in self._tables:
+            raise KeyError(f"Table: {key} not in catalog")
+
+        for index, value, ref in self._index_entries.pop(key):
+            index[value].discard(ref)
+            if not index[value]:
+                del index[value]
+
+        del self._table_columns[key]
+        return self._tables.pop(key)
+
+    def _index_table(self, key: str, metadata: Metadata) -> None:
+        entries = [
+            (self._table_index["name"], metadata.name, key),
+            (self._table_index["database_name"], metadata.database_name, key),
+            (self._table_index["sensitive"], bool(metadata.sensitive), key),
+        ]
+
+        for col in metadata.columns:
+            ref = (key, col["name"])
+            entries.extend(
+                [
+                    (self._column_index["name"], col["name"], ref),
+                    (self._column_index["type_category"], _get_type_category(col), ref),
+                    (self._column_index["sensitive"], bool(col.get("sensitive")), ref),
+                ]
+            )
+            if col.get("alias"):
+                entries.append((self._column_index["alias"], col["alias"], ref))
+            for fk in col.get("foreign_key", []):
+                entries.append(
+                    (self._column_index["foreign_key_table"], fk.get("table"), ref)
+                )
+
+        for index, value, ref in entries:
+            index[value].add(ref)
+        self._index_entries[key] = entries
+        self._table_columns[key] = {c["name"]: c for c in metadata.columns}
+
+    def save_bundle(self, path: str) -> None:
+        """
+        Writes every table in the catalog to a single bundle file that can be
+        read lazily with MetadataCatalog.from_bundle. The file starts with an
+        index of where each table is in the file so tables can be read
+        without decoding the others.
+
+        Args:
+            path (str): file path to write the bundle to
+        """
+        docs = []
+        offsets = {}
+        offset = 0
+        for key in self:
+            doc = json.dumps(self[key].to_dict(), separators=(",", ":")).encode()
+            offsets[key] = [offset, len(doc)]
+            offset += len(doc)
+            docs.append(doc)
+
+        header = json.dumps({"version": 1, "tables": offsets}).encode()
+        with open(path, "wb") as f:
+            f.write(_bundle_magic)
+            f.write(_bundle_header_len.pack(len(header)))
+            f.write(header)
+            for doc in docs:
+                f.write(doc)
+
+    @classmethod
+    def from_bundle(cls, path: str, validate: bool = False) -> object:
+        """
+        Opens a bundle file written by save_bundle. The file is memory mapped
+        and each table is only decoded the first time it is accessed. Queries
+        (find_columns and find_tables) decode every table in the bundle.
+
+        Args:
+            path (str): file path of the bundle
+            validate (bool, optional): Validate each table when it is decoded.
+                Defaults to False as tables are validated before they are
+                written to a bundle.
+
+        Returns:
+            MetadataCatalog: catalog backed by the bundle
+        """
+        catalog = cls()
+        with open(path, "rb") as f:
+            bundle = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if bundle[: len(_bundle_magic)] != _bundle_magic:
+            bundle.close()
+            raise ValueError(f"{path} is not a metadata bundle")
+
+        start = len(_bundle_magic)
+        (header_len,) = _bundle_header_len.unpack_from(bundle, start)
+        start += _bundle_header_len.size
+        header = json.loads(bundle[start : start + header_len])
+
+        catalog._bundle = bundle
+        catalog._bundle_data_start = start + header_len
+        catalog._bundle_validate = validate
+        catalog._pending = {k: tuple(v) for k, v in header["tables"].items()}
+        return catalog
+
+    def _decode(self, offset: int, length: int) -> Metadata:
+        start = self._bundle_data_start + offset
+        d = json.loads(self._bundle[start : start + length])
+        if self._bundle_validate:
+            return Metadata.from_dict(d)
+        return Metadata._from_validated_dict(d)
+
+    def _load(self, key: str) -> Metadata:
+        """Decodes a table from the bundle and indexes it"""
+        metadata = self._decode(*self._pending.pop(key))
+        self._tables[key] = metadata
+        self._index_table(key, metadata)
+        if not self._pending:
+            self.close()
+        return metadata
+
+    def _load_all(self) -> None:
+        for key in list(self._pending):
+            self._load(key)
+
+    def close(self, load_remaining: bool = False) -> None:
+        """
+        Closes the bundle file (if the catalog was read from one).
+        Tables that have not been accessed yet are dropped from the catalog
+        (with a warning) unless load_remaining is True.
+
+        Args:
+            load_remaining (bool, optional): decode the tables that have not
+                been accessed yet before closing the bundle, so they stay in
+                the catalog. Defaults to False.
+        """
+        if load_remaining:
+            self._load_all()
+        elif self._pending:
+            warnings.warn(
+                f"{len(self._pending)} tables in the bundle that have not been "
+                "accessed are dropped from the catalog. Use "
+                "close(load_remaining=True) to keep them."
+            )
+        self._pending = {}
+        if self._bundle is not None:
+            self._bundle.close()
+            self._bundle = None
+
+    @staticmethod
+    def _lookup(index: dict, filters: dict, default: Set) -> Set:
+        """
+        Returns the set of references matching every filter that is not None.
+        """
+        matches = None
+        for name, value in filters.items():
+            if value is None:
+                continue
+            found = index[name].get(value, set())
+            matches = set(found) if matches is None else matches & found
+            if not matches:
+                return set()
+
+        return default if matches is None else matches
+
+    def find_columns(
+        self,
+        name: str = None,
+        type_category: str = None,
+        sensitive: bool = None,
+        alias: str = None,
+        foreign_key_table: str = None,
+    ) -> List[Tuple[str, dict]]:
+        """
+        Returns every column that matches all of the given filters.
+        Filters left as None are ignored.
+
+        Args:
+            name (str, optional): column name
+            type_category (str, optional): column type_category (worked out
+                from the column type if not set on the column)
+            sensitive (bool, optional): column sensitive flag
+            alias (str, optional): column alias
+            foreign_key_table (str, optional): name of a table the column has
+                a foreign key to
+
+        Returns:
+            List[Tuple[str, dict]]: (table key, column) for each match, sorted
+                by table key then column name
+        """
+        filters = {
+            "name": name,
+            "type_category": type_category,
+            "sensitive": sensitive,
+            "alias": alias,
+            "foreign_key_table": foreign_key_table,
+        }
+        self._load_all()
+        if all(v is None for v in filters.values()):
+            refs = {(k, c["name"]) for k, m in self._tables.items() for c in m.columns}
+        else:
+            refs = self._lookup(self._column_index, filters, set())
+
+        return [(k, self._table_columns[k][c]) for k, c in sorted(refs)]
+
+    def find_tables(
+        self,
+        name: str = None,
+        database_name: str = None,
+        sensitive: bool = None,
+        column_name: str = None,
+        column_sensitive: bool = None,
+        type_category: str = None,
+        alias: str = None,
+        foreign_key_table: str = None,
+    ) -> List[Metadata]:
+        """
+        Returns every table that matches all of the given filters.
+        Filters left as None are ignored. The column filters (column_name,
+        column_sensitive, type_category, alias and foreign_key_table) match
+        tables with at least one column matching all of them. See find_columns.
+
+        Args:
+            name (str, optional): table name
+            database_name (str, optional): table database_name
+            sensitive (bool, optional): table sensitive flag
+            column_name (str, optional): column name
+            column_sensitive (bool, optional): column sensitive flag
+            type_category (str, optional): column type_category
+            alias (str, optional): column alias
+            foreign_key_table (str, optional): name of a table a column has
+                a foreign key to
+
+        Returns:
+            List[Metadata]: matching tables sorted by table key
+        """
+        self._load_all()
+        keys = self._lookup(
+            self._table_index,
+            {"name": name, "database_name": database_name, "sensitive": sensitive},
+            set(self._tables),
+        )
+        column_filters = {
+            "name": column_name,
+            "sensitive": column_sensitive,
+            "type_category": type_category,
+            "alias": alias,
+            "foreign_key_table": foreign_key_table,
+        }
+        if any(v is not None for v in column_filters.values()):
+            keys &= {
+                k for k, _ in self._lookup(self._column_index, column_filters, set())
+            }
+
+        return [self._tables[k] for k in sorted(keys)]
+
+    def memory_report(self) -> dict:
+        """
+        Breaks down the retained size (in bytes) of the tables in the catalog.
+        Tables in a bundle that have not been decoded yet are not included.
+        See mojap_metadata.metadata.profiling.catalog_memory_report
+        """
+        return catalog_memory_report(self._tables.values())
+
+    def __getitem__(self, key: str) -> Metadata:
+        if key in self._pending:
+            return self._load(key)
+        return self._tables[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._tables or key in self._pending
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._tables)
+        yield from list(self._pending)
+
+    def __len__(self) -> int:
+        return len(self._tables) + len(self._pending)
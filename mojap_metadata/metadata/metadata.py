@@ -1,19 +1,18 @@
 import json
-import jsonschema
 import re
 import warnings
 import yaml
 
-from importlib.resources import files
 from copy import deepcopy
 from dataengineeringutils3.s3 import read_json_from_s3, read_yaml_from_s3
-from mojap_metadata.metadata import specs
-from typing import Union, List, Callable, Iterator
+from mojap_metadata.metadata.cache import get_metadata_cache
+from mojap_metadata.metadata.profiling import metadata_memory_report
+from mojap_metadata.metadata.schema_registry import schema_registry
+from typing import Dict, Union, List, Callable, Iterator
 from collections.abc import MutableMapping
 
 
-_text = files(specs).joinpath("table_schema.json").read_text()
-_table_schema = json.loads(_text)
+_table_schema = schema_registry.get_schema()
 _schema_url = "https://moj-analytical-services.github.io/metadata_schema/mojap_metadata/v1.5.0.json"  # noqa
 
 _metadata_struct_dtype_names = ("struct",)
@@ -31,6 +30,8 @@ _metadata_complex_dtype_names_bracket = (
     _metadata_struct_dtype_names_bracket + _metadata_list_dtype_names_bracket
 )
 
+_type_category_patterns = None
+
 
 def _get_type_category_pattern_dict_from_schema():
     out = {}
@@ -50,6 +51,30 @@ def _get_type_category_pattern_dict_from_schema():
     return out
 
 
+def _get_type_category(col: dict) -> Union[str, None]:
+    """
+    Returns the type_category of a column, working it out
+    from the type if type_category is not set.
+    """
+    global _type_category_patterns
+
+    if col.get("type_category"):
+        return col["type_category"]
+
+    if _type_category_patterns is None:
+        _type_category_patterns = {
+            k: re.compile(v)
+            for k, v in _get_type_category_pattern_dict_from_schema().items()
+        }
+
+    col_type = col.get("type")
+    if col_type:
+        for type_cat, pattern in _type_category_patterns.items():
+            if pattern.match(col_type):
+                return type_cat
+    return None
+
+
 def _parse_and_split(text: str, char: str) -> List[str]:
     """
     Splits a string into a list by splitting on
@@ -81,6 +106,20 @@ def _parse_and_split(text: str, char: str) -> List[str]:
     yield text[start + 1 :].strip()
 
 
+def _get_default_key_values() -> dict:
+    """The values Metadata.from_dict sets for keys missing from a dict"""
+    return {
+        "$schema": _schema_url,
+        "name": "",
+        "description": "",
+        "file_format": "",
+        "sensitive": False,
+        "columns": [],
+        "primary_key": [],
+        "partitions": [],
+    }
+
+
 def _get_first_level(text: str) -> str:
     """Returns everything in first set of <>"""
     bracket_counter = 0
@@ -148,15 +187,49 @@ def _unpack_complex_data_type(data_type: str) -> Union[str, dict]:
         return data_type
 
 
+def _pack_complex_data_type(data_type: Union[str, dict]) -> str:
+    """Inverse of _unpack_complex_data_type"""
+    if isinstance(data_type, str):
+        return data_type
+    k, v = next(iter(data_type.items()))
+    if k in _metadata_struct_dtype_names:
+        fields = ", ".join(f"{n}:{_pack_complex_data_type(t)}" for n, t in v.items())
+        return f"{k}<{fields}>"
+    return f"{k}<{_pack_complex_data_type(v)}>"
+
+
+def _index_nested_paths(
+    path: str, data_type: Union[str, dict], index: Dict[str, str]
+) -> None:
+    """
+    Adds the type of every field nested in data_type (an unpacked data type)
+    to index, keyed by its dotted path from path. List values are named
+    element (e.g. items.element.sku).
+    """
+    if isinstance(data_type, str):
+        return
+    k, v = next(iter(data_type.items()))
+    if k in _metadata_struct_dtype_names:
+        children = v.items()
+    else:
+        children = [("element", v)]
+    for name, child in children:
+        child_path = f"{path}.{name}"
+        index[child_path] = _pack_complex_data_type(child)
+        _index_nested_paths(child_path, child, index)
+
+
 class MetadataProperty:
     def __set_name__(self, owner, name) -> None:
         self.name = name
 
     def __get__(self, obj, type=None) -> object:
-        return obj.__dict__["_data"].get(self.name)
+        if obj is None:
+            return self
+        return obj._data.get(self.name)
 
     def __set__(self, obj, value) -> None:
-        obj.__dict__["_data"][self.name] = value
+        obj._data[self.name] = value
         obj.validate()
 
 
@@ -175,17 +248,34 @@ class Metadata(MutableMapping):
         m.validate()
         return m
 
+    @classmethod
+    def _from_validated_dict(cls, d: dict) -> object:
+        """
+        generates Metadata object from a dictionary that has already been
+        validated (e.g. the output of to_dict). The dictionary is not copied
+        or validated again.
+        """
+        m = cls()
+        m._data = d
+        return m
+
     @classmethod
     def from_json(
         cls, filename: str, encoding: str = "utf-8", *args, **kwargs
     ) -> object:
         """
         generates Metadata object from a string path to a json metadata formatted file
+        Uses the metadata cache if enabled (see
+        mojap_metadata.metadata.cache.enable_metadata_cache)
         args:
             filename: path to the metadata json file
         returns:
             Metadata object
         """
+        cache = get_metadata_cache()
+        if cache is not None and not args and not kwargs:
+            return cache.load(cls, filename, encoding, json.loads, read_json_from_s3)
+
         if filename.startswith("s3://"):
             obj = read_json_from_s3(filename, encoding, *args, **kwargs)
         else:
@@ -200,11 +290,19 @@ class Metadata(MutableMapping):
     ) -> object:
         """
         generates Metadata object from a string path to a yaml metadata formatted file
+        Uses the metadata cache if enabled (see
+        mojap_metadata.metadata.cache.enable_metadata_cache)
         args:
             filename: path to the metadata yaml file
         returns:
             Metadata object
         """
+        cache = get_metadata_cache()
+        if cache is not None and not args and not kwargs:
+            return cache.load(
+                cls, filename, encoding, yaml.safe_load, read_yaml_from_s3
+            )
+
         if filename.startswith("s3://"):
             obj = read_yaml_from_s3(filename, encoding, *args, **kwargs)
         else:
@@ -236,6 +334,48 @@ class Metadata(MutableMapping):
         else:
             raise TypeError(f"input type not recognised: {type(inp)}")
 
+    @classmethod
+    def from_data_sample(
+        cls,
+        path: str,
+        file_format: str = None,
+        sample_rows: int = 100_000,
+        block_size: int = 1 << 20,
+        delimiter: str = ",",
+        meta_init_dict: dict = None,
+    ) -> object:
+        """
+        generates Metadata object by inferring the columns (name, type, nullable
+        and type_category) from a sample of a csv or newline delimited json file.
+        The sample is streamed in blocks with pyarrow, widening column types
+        (e.g. int64 to float64) as blocks are read so memory use does not grow
+        with the sample size. Nested structs and lists are inferred from json.
+        Requires pyarrow.
+        args:
+            path: local path or uri (e.g. s3://bucket/key) of the data file
+            file_format: "csv" or "json". Inferred from the file extension
+                if not set
+            sample_rows: number of rows to infer the columns from
+            block_size: number of bytes read at a time
+            delimiter: csv field delimiter
+            meta_init_dict: other Metadata values (e.g. name)
+        returns:
+            Metadata object
+        """
+        from mojap_metadata.converters.arrow_converter.inference import (
+            infer_metadata_from_sample,
+        )
+
+        return infer_metadata_from_sample(
+            path,
+            file_format=file_format,
+            sample_rows=sample_rows,
+            block_size=block_size,
+            delimiter=delimiter,
+            meta_init_dict=meta_init_dict,
+            metadata_class=cls,
+        )
+
     @classmethod
     def merge(
         cls,
@@ -320,8 +460,6 @@ class Metadata(MutableMapping):
         force_partition_order: str = None,
     ) -> None:
 
-        self._schema = deepcopy(_table_schema)
-
         self._data = {
             "$schema": _schema_url,
             "name": name,
@@ -345,6 +483,7 @@ class Metadata(MutableMapping):
             "struct": "struct<null>",
         }
 
+        self._nested_path_index = None
         self.validate()
         self.force_partition_order = force_partition_order
 
@@ -388,6 +527,16 @@ class Metadata(MutableMapping):
         else:
             pass
 
+    @property
+    def _schema(self) -> dict:
+        """
+        The json schema this object is validated against. Shared between all
+        Metadata objects declaring the same `$schema` version.
+        """
+        return schema_registry.get_schema(
+            schema_registry.resolve_version(self._data.get("$schema"))
+        )
+
     @property
     def columns(self):
         return self._data["columns"]
@@ -412,6 +561,33 @@ class Metadata(MutableMapping):
     def column_names(self):
         return [c["name"] for c in self.columns]
 
+    @property
+    def nested_path_index(self) -> Dict[str, str]:
+        """
+        Maps the dotted path of every column and every field nested in a
+        struct or list column to its type e.g. `address.postcode` or
+        `items.element.sku` (list values are named element). Built the
+        first time it is used and rebuilt when a column's name or type
+        changes (including in place edits). The struct<null> placeholder
+        type (see set_col_types_from_type_category) has no nested fields.
+        Do not modify it.
+        """
+        key = tuple([(c["name"], c.get("type")) for c in self.columns])
+        cached = self._nested_path_index
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        index = {}
+        for name, data_type in key:
+            if data_type:
+                index[name] = data_type
+                if data_type != "struct<null>":
+                    _index_nested_paths(
+                        name, _unpack_complex_data_type(data_type), index
+                    )
+        self._nested_path_index = (key, index)
+        return index
+
     def get_column(self, name: str):
         """
         Returns a column thats name matched input.
@@ -425,6 +601,7 @@ class Metadata(MutableMapping):
         return c
 
     def remove_column(self, name: str):
+        self._nested_path_index = None
         if name in self.column_names:
             del self.columns[self.column_names.index(name)]
             if name in self.partitions:
@@ -464,22 +641,13 @@ class Metadata(MutableMapping):
         _data = deepcopy(data)
         self._data = _data
 
-        defaults = {
-            "$schema": _schema_url,
-            "name": "",
-            "description": "",
-            "file_format": "",
-            "sensitive": False,
-            "columns": [],
-            "primary_key": [],
-            "partitions": [],
-        }
-
+        defaults = _get_default_key_values()
         for k, v in defaults.items():
             self._data[k] = _data.get(k, v)
 
     def validate(self):
-        jsonschema.validate(instance=self._data, schema=self._schema)
+        self._nested_path_index = None
+        schema_registry.validate(self._data)
         self._validate_list_attribute(attribute="primary_key", columns=self.primary_key)
         self._validate_list_attribute(attribute="partitions", columns=self.partitions)
         # Ensure unique column names
@@ -499,9 +667,104 @@ class Metadata(MutableMapping):
         if len(columns) != len(set(columns)):
             raise ValueError(f"'All elements of '{attribute}' must be unique")
 
+    def upgrade_schema_version(self, version: str = None) -> None:
+        """
+        Upgrades this metadata (in place) to a newer version of the metadata
+        schema. See mojap_metadata.metadata.schema_registry.SchemaRegistry.upgrade
+
+        Args:
+            version (str, optional): The version to upgrade to e.g. "v1.5.0".
+                Defaults to the latest registered version.
+        """
+        schema_registry.upgrade(self._data, version)
+        self.validate()
+
+    def compile_record_validator(
+        self, allow_extra_columns: bool = True
+    ) -> Callable[[dict], List[str]]:
+        """
+        Generates a function specialised to this metadata that validates a
+        single record (a dict of column name to value) and returns a list of
+        errors (empty if the record is valid). Each column's type, nullable,
+        enum, pattern, minimum, maximum, minLength and maxLength are written
+        into the function (with precompiled patterns and frozenset enums) so
+        the metadata is not looked up for each record. Only the first error
+        for each column is returned. Missing keys are treated as null.
+        Strings in timestamp columns must be in iso format.
+        Changes to the metadata after the validator is compiled are not
+        picked up.
+
+        Args:
+            allow_extra_columns (bool, optional): Allow keys that are not
+                columns in the metadata. Defaults to True.
+
+        Returns:
+            Callable[[dict], List[str]]: the validator. Its source is
+                available as its `source` attribute.
+        """
+        from mojap_metadata.metadata.record_validator import (
+            compile_record_validator,
+        )
+
+        return compile_record_validator(self, allow_extra_columns)
+
+    def generate_synthetic(
+        self,
+        n_rows: int,
+        seed: Union[int, None] = None,
+        batch_size: int = 65536,
+        null_fraction: float = 0.1,
+        drop_partitions: bool = False,
+    ) -> Iterator:
+        """
+        Generates random data with the arrow schema of this metadata that
+        respects each column's type, nullable, enum, minimum, maximum,
+        minLength, maxLength and (where possible) pattern. Requires pyarrow
+        and numpy (both installed by the arrow extra). See
+        mojap_metadata.converters.arrow_converter.synthetic.generate_synthetic_batches
+
+        Args:
+            n_rows (int): total number of rows
+            seed (Union[int, None], optional): seed for the random values. The
+                same seed and batch_size give the same data. Defaults to None.
+            batch_size (int, optional): rows per batch. Defaults to 65536.
+            null_fraction (float, optional): probability a value in a nullable
+                column is null. Defaults to 0.1.
+            drop_partitions (bool, optional): leave out the partition columns.
+                Defaults to False.
+
+        Returns:
+            Iterator[pa.RecordBatch]: batches of up to batch_size rows
+        """
+        from mojap_metadata.converters.arrow_converter.synthetic import (
+            generate_synthetic_batches,
+        )
+
+        return generate_synthetic_batches(
+            self,
+            n_rows,
+            seed=seed,
+            batch_size=batch_size,
+            null_fraction=null_fraction,
+            drop_partitions=drop_partitions,
+        )
+
     def to_dict(self) -> dict:
         return deepcopy(self._data)
 
+    def memory_report(self) -> dict:
+        """
+        Breaks down the retained size (in bytes) of this object into
+        schema, columns, column_types, column_descriptions, other and total.
+        column_types and column_descriptions are also counted in columns.
+        See mojap_metadata.metadata.profiling.catalog_memory_report for
+        the equivalent over many Metadata objects.
+
+        Returns:
+            dict: size in bytes of each part of the object
+        """
+        return metadata_memory_report(self)
+
     def to_json(self, filepath: str, mode: str = "w", **kwargs) -> None:
         with open(filepath, mode) as f:
             json.dump(self.to_dict(), f, **kwargs)
@@ -512,6 +775,7 @@ class Metadata(MutableMapping):
 
     def column_names_to_lower(self, inplace: bool = False) -> Union[object, None]:
         if inplace:
+            self._nested_path_index = None
             for c in self.columns:
                 c["name"] = c["name"].lower()
             return self
@@ -523,6 +787,7 @@ class Metadata(MutableMapping):
 
     def column_names_to_upper(self, inplace: bool = False) -> Union[object, None]:
         if inplace:
+            self._nested_path_index = None
             for c in self.columns:
                 c["name"] = c["name"].upper()
             return self
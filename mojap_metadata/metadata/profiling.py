@@ -0,0 +1,179 @@
+import sys
+import tracemalloc
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator, List, Set
+
+
+def _deep_sizeof(obj: Any, seen: Set[int] = None) -> int:
+    """
+    Returns the retained size in bytes of an object and everything
+    it references (dicts, lists, tuples, sets and object __dict__s).
+    Objects whose id is already in `seen` are not counted again so the
+    same set can be passed across calls to avoid double counting
+    shared objects.
+    """
+    if seen is None:
+        seen = set()
+
+    size = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif hasattr(o, "__dict__") and not isinstance(o, type):
+            stack.append(o.__dict__)
+
+    return size
+
+
+def metadata_memory_report(metadata: Any, seen: Set[int] = None) -> dict:
+    """
+    Breaks down the retained size (in bytes) of a Metadata object.
+
+    Args:
+        metadata (Metadata): The Metadata object to report on.
+        seen (Set[int], optional): ids of objects already counted. Used to
+            avoid double counting objects shared between Metadata objects.
+
+    Returns:
+        dict: with the keys
+            schema: size of the json schema held by the object
+            columns: size of the columns list (includes column_types and
+                column_descriptions)
+            column_types: size of the column type strings
+            column_descriptions: size of the column description strings
+            other: size of everything else in the object
+            total: retained size of the object
+    """
+    if seen is None:
+        seen = set()
+
+    # Type strings and descriptions are measured with their own seen sets
+    # as they are also counted as part of columns below
+    type_seen = set(seen)
+    desc_seen = set(seen)
+    column_types = 0
+    column_descriptions = 0
+    for col in metadata._data.get("columns", []):
+        if "type" in col:
+            column_types += _deep_sizeof(col["type"], type_seen)
+        if "description" in col:
+            column_descriptions += _deep_sizeof(col["description"], desc_seen)
+
+    schema = _deep_sizeof(getattr(metadata, "_schema", None), seen)
+    columns = _deep_sizeof(metadata._data.get("columns"), seen)
+    other = _deep_sizeof(metadata, seen)
+
+    return {
+        "schema": schema,
+        "columns": columns,
+        "column_types": column_types,
+        "column_descriptions": column_descriptions,
+        "other": other,
+        "total": schema + columns + other,
+    }
+
+
+def catalog_memory_report(metadata_objects: Iterable[Any]) -> dict:
+    """
+    Aggregates metadata_memory_report over many Metadata objects. Objects
+    shared between Metadata objects are only counted once.
+
+    Args:
+        metadata_objects (Iterable[Metadata]): Metadata objects to report on.
+
+    Returns:
+        dict: the same keys as metadata_memory_report summed over all
+            objects, plus `tables` (the number of Metadata objects).
+    """
+    seen = set()
+    report = {
+        "tables": 0,
+        "schema": 0,
+        "columns": 0,
+        "column_types": 0,
+        "column_descriptions": 0,
+        "other": 0,
+        "total": 0,
+    }
+    for metadata in metadata_objects:
+        report["tables"] += 1
+        for k, v in metadata_memory_report(metadata, seen).items():
+            report[k] += v
+
+    return report
+
+
+@dataclass
+class AllocationProfile:
+    """
+    Result of a profile_allocations block.
+
+    current (int): bytes still allocated at the end of the block
+    peak (int): peak bytes allocated during the block
+    top (List[str]): the largest allocation sites in the block
+    """
+
+    current: int = 0
+    peak: int = 0
+    top: List[str] = field(default_factory=list)
+
+
+@contextmanager
+def profile_allocations(
+    top_n: int = 10, key_type: str = "lineno"
+) -> Iterator[AllocationProfile]:
+    """
+    Context manager that traces memory allocations made inside the block
+    using tracemalloc. Intended for profiling converter runs, e.g.
+
+    with profile_allocations() as prof:
+        ArrowConverter().generate_from_meta(metadata)
+    print(prof.peak, prof.top)
+
+    Args:
+        top_n (int, optional): Number of allocation sites to keep. Defaults to 10.
+        key_type (str, optional): How to group allocation sites. Passed to
+            tracemalloc.Snapshot.statistics. Defaults to "lineno".
+
+    If tracemalloc is already tracing (e.g. a session started by the caller)
+    it is left running and its peak is not reset. The block's peak is then
+    only known if the block raises the session's peak; if it does not,
+    peak is the bytes still allocated at the end of the block (a lower bound).
+
+    Yields:
+        AllocationProfile: filled in when the block exits
+    """
+    profile = AllocationProfile()
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+
+    before = tracemalloc.take_snapshot()
+    start_current, start_peak = tracemalloc.get_traced_memory()
+    try:
+        yield profile
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        if not already_tracing:
+            tracemalloc.stop()
+
+        profile.current = current - start_current
+        if already_tracing and peak <= start_peak:
+            profile.peak = max(profile.current, 0)
+        else:
+            profile.peak = peak - start_current
+        stats = after.compare_to(before, key_type)
+        profile.top = [str(s) for s in stats[:top_n]]
@@ -0,0 +1,192 @@
+import datetime
+import decimal
+import re
+
+from typing import Callable, List
+
+from mojap_metadata.metadata.metadata import _get_type_category
+
+_int_ranges = {
+    f"{prefix}int{bits}": (
+        (0, 2**bits - 1) if prefix else (-(2 ** (bits - 1)), 2 ** (bits - 1) - 1)
+    )
+    for prefix in ("", "u")
+    for bits in (8, 16, 32, 64)
+}
+
+# python types a value must be an instance of for each type_category
+_type_category_python_types = {
+    "integer": (int,),
+    "float": (int, float, decimal.Decimal),
+    "string": (str,),
+    "timestamp": (datetime.date, datetime.time, str),
+    "binary": (bytes, bytearray),
+    "boolean": (bool,),
+    "list": (list, tuple),
+    "struct": (dict,),
+}
+
+
+# parsers for timestamp category values given as iso format strings
+# (timestamp is first as time is also a prefix of it)
+_iso_parsers = [
+    ("timestamp", datetime.datetime.fromisoformat, "iso format timestamp"),
+    ("date", datetime.date.fromisoformat, "iso format date"),
+    ("time", datetime.time.fromisoformat, "iso format time"),
+]
+
+
+def _iso_checker(parse: Callable) -> Callable[[str], bool]:
+    def is_iso(v: str) -> bool:
+        try:
+            parse(v)
+        except ValueError:
+            return False
+        return True
+
+    return is_iso
+
+
+def _get_iso_parser(col: dict) -> tuple:
+    """Returns the parser and its description for a timestamp column"""
+    col_type = col.get("type") or "timestamp"
+    for prefix, parse, description in _iso_parsers:
+        if col_type.startswith(prefix):
+            return parse, description
+    return _iso_parsers[0][1:]
+
+
+# (property, condition, error message, type_categories it applies to)
+_bound_checks = [
+    ("minimum", "v < {}", "less than minimum", ("integer", "float")),
+    ("maximum", "v > {}", "greater than maximum", ("integer", "float")),
+    (
+        "minLength",
+        "len(v) < {}",
+        "shorter than minLength",
+        ("string", "binary", "list"),
+    ),
+    ("maxLength", "len(v) > {}", "longer than maxLength", ("string", "binary", "list")),
+]
+
+
+def _bound_source(i: int, col: dict, type_category: str, namespace: dict) -> List[str]:
+    lines = []
+    for prop, condition, message, type_categories in _bound_checks:
+        if col.get(prop) is None or type_category not in type_categories:
+            continue
+        namespace[f"_{prop}_{i}"] = col[prop]
+        lines += [
+            f"    elif {condition.format(f'_{prop}_{i}')}:",
+            f"        errors.append(_name_{i} + ': ' + repr(v) + ' {message}')",
+        ]
+    return lines
+
+
+def _column_source(i: int, col: dict, namespace: dict) -> List[str]:
+    """
+    Returns the lines of the generated validator that check one column
+    (the value is in `v`). Constants are added to namespace rather than
+    written into the source.
+    """
+    name = col["name"]
+    namespace[f"_name_{i}"] = name
+    type_category = _get_type_category(col)
+    lines = [f"    v = get(_name_{i})", "    if v is None:"]
+
+    if col.get("nullable") is False:
+        lines.append(f"        errors.append(_name_{i} + ': is null')")
+    else:
+        lines.append("        pass")
+
+    if type_category == "null":
+        lines += [
+            "    else:",
+            f"        errors.append(_name_{i} + ': must be null')",
+        ]
+        return lines
+
+    if type_category in _type_category_python_types:
+        namespace[f"_types_{i}"] = _type_category_python_types[type_category]
+        namespace[f"_type_name_{i}"] = col.get("type", type_category)
+        bool_check = (
+            "type(v) is bool or " if type_category in ("integer", "float") else ""
+        )
+        lines += [
+            f"    elif {bool_check}not isinstance(v, _types_{i}):",
+            f"        errors.append(_name_{i} + ': expected ' + _type_name_{i}"
+            " + ' not ' + type(v).__name__)",
+        ]
+
+    if type_category == "timestamp":
+        parse, description = _get_iso_parser(col)
+        namespace[f"_is_iso_{i}"] = _iso_checker(parse)
+        lines += [
+            f"    elif type(v) is str and not _is_iso_{i}(v):",
+            f"        errors.append(_name_{i} + ': ' + repr(v) + ' is not an "
+            f"{description}')",
+        ]
+
+    if col.get("type") in _int_ranges:
+        lo, hi = _int_ranges[col["type"]]
+        lines += [
+            f"    elif not ({lo} <= v <= {hi}):",
+            f"        errors.append(_name_{i} + ': out of range for ' "
+            f"+ _type_name_{i})",
+        ]
+
+    if col.get("enum") is not None:
+        try:
+            namespace[f"_enum_{i}"] = frozenset(col["enum"])
+        except TypeError:
+            # lists or dicts in the enum can only be found in a list
+            namespace[f"_enum_{i}"] = list(col["enum"])
+        lines += [
+            f"    elif v not in _enum_{i}:",
+            f"        errors.append(_name_{i} + ': ' + repr(v) + ' not in enum')",
+        ]
+
+    if col.get("pattern") is not None and type_category == "string":
+        namespace[f"_pattern_{i}"] = re.compile(col["pattern"]).search
+        lines += [
+            f"    elif _pattern_{i}(v) is None:",
+            f"        errors.append(_name_{i} + ': ' + repr(v) + ' does not match "
+            "pattern')",
+        ]
+
+    lines.extend(_bound_source(i, col, type_category, namespace))
+    return lines
+
+
+def compile_record_validator(
+    metadata, allow_extra_columns: bool = True
+) -> Callable[[dict], List[str]]:
+    """
+    Generates a function that validates a single record (a dict of column
+    name to value) against the metadata. See Metadata.compile_record_validator.
+    """
+    namespace = {}
+    lines = ["def validate_record(record):", "    errors = []", "    get = record.get"]
+
+    for i, col in enumerate(metadata.columns):
+        lines.extend(_column_source(i, col, namespace))
+
+    if not allow_extra_columns:
+        namespace["_column_names"] = frozenset(metadata.column_names)
+        lines += [
+            "    extra = record.keys() - _column_names",
+            "    if extra:",
+            "        errors.append('columns not in metadata: ' + repr(sorted(extra)))",
+        ]
+
+    lines.append("    return errors")
+    source = "\n".join(lines) + "\n"
+
+    code = compile(source, f"<record validator for {metadata.name}>", "exec")
+    # the source refers to metadata values (names, types, enums, bounds
+    # etc.) only by namespace variables named by column index. Otherwise it
+    # holds fixed strings and int range constants, never a metadata string
+    exec(code, namespace)  # nosec B102
+    validate_record = namespace["validate_record"]
+    validate_record.source = source
+    return validate_record
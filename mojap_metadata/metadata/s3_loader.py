@@ -0,0 +1,134 @@
+import json
+import threading
+import yaml
+
+import boto3
+
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from typing import Dict, List, Tuple, Union
+
+from mojap_metadata.metadata.cache import _split_s3_path
+from mojap_metadata.metadata.metadata import Metadata
+
+
+_metadata_suffixes = (".json", ".yaml", ".yml")
+
+
+class S3MetadataLoader:
+    """
+    Loads many metadata files from S3 concurrently.
+
+    All requests share one boto3 client and run in a bounded thread pool.
+    The ETag and validated metadata of every file loaded are kept so
+    loading the same file again makes a conditional GET and only downloads,
+    parses and validates the file if it has changed.
+
+    Args:
+        s3_client (optional): boto3 S3 client to use. Defaults to a new client.
+        max_workers (int, optional): Maximum number of concurrent requests.
+            Defaults to 16.
+        metadata_class (type, optional): Metadata class to create. Defaults to
+            Metadata.
+        encoding (str, optional): Encoding of the metadata files.
+            Defaults to "utf-8".
+
+    Example:
+    loader = S3MetadataLoader()
+    metas = loader.load_many("s3://bucket/metadata/") # {s3 path: Metadata}
+    """
+
+    def __init__(
+        self,
+        s3_client=None,
+        max_workers: int = 16,
+        metadata_class: type = Metadata,
+        encoding: str = "utf-8",
+    ):
+        self.s3_client = s3_client if s3_client else boto3.client("s3")
+        self.max_workers = max_workers
+        self.metadata_class = metadata_class
+        self.encoding = encoding
+        self.downloads = 0
+        self._etag_cache = {}
+        self._lock = threading.Lock()
+
+    def list_paths(
+        self, prefix: str, suffixes: Tuple[str] = _metadata_suffixes
+    ) -> List[str]:
+        """
+        Lists the metadata files under an S3 prefix.
+
+        Args:
+            prefix (str): s3 path e.g. "s3://bucket/metadata/"
+            suffixes (Tuple[str], optional): only keys ending with one of
+                these are returned. Defaults to json and yaml suffixes.
+
+        Returns:
+            List[str]: s3 paths of the metadata files
+        """
+        bucket, key_prefix = _split_s3_path(prefix)
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        paths = []
+        for page in paginator.paginate(Bucket=bucket, Prefix=key_prefix):
+            for obj in page.get("Contents", []):
+                if obj["Key"].lower().endswith(suffixes):
+                    paths.append(f"s3://{bucket}/{obj['Key']}")
+        return paths
+
+    def load(self, s3_path: str) -> Metadata:
+        """
+        Loads a single metadata file from S3 (json or yaml).
+
+        Args:
+            s3_path (str): s3 path to the metadata file
+
+        Returns:
+            Metadata: the loaded metadata
+        """
+        bucket, key = _split_s3_path(s3_path)
+        cached = self._etag_cache.get(s3_path)
+        kwargs = {"Bucket": bucket, "Key": key}
+        if cached:
+            kwargs["IfNoneMatch"] = cached[0]
+
+        try:
+            resp = self.s3_client.get_object(**kwargs)
+        except ClientError as e:
+            if cached and e.response["Error"]["Code"] in ("304", "NotModified"):
+                return self.metadata_class._from_validated_dict(deepcopy(cached[1]))
+            raise
+
+        text = resp["Body"].read().decode(self.encoding)
+        if s3_path.lower().endswith(".json"):
+            obj = json.loads(text)
+        else:
+            obj = yaml.safe_load(text)
+
+        meta = self.metadata_class.from_dict(obj)
+        with self._lock:
+            self.downloads += 1
+            self._etag_cache[s3_path] = (resp["ETag"], meta.to_dict())
+        return meta
+
+    def load_many(self, paths: Union[str, List[str]]) -> Dict[str, Metadata]:
+        """
+        Loads many metadata files from S3 concurrently.
+
+        Args:
+            paths (Union[str, List[str]]): Either a list of s3 paths or an
+                s3 prefix. If a prefix is given every json and yaml file
+                under it is loaded.
+
+        Returns:
+            Dict[str, Metadata]: s3 path to Metadata, in the order of `paths`
+                (or the listing order for a prefix)
+        """
+        if isinstance(paths, str):
+            paths = self.list_paths(paths)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            metas = list(executor.map(self.load, paths))
+
+        return dict(zip(paths, metas))
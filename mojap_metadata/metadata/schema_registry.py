@@ -0,0 +1,210 @@
+import json
+import re
+import threading
+
+import jsonschema
+
+from importlib.resources import files
+from typing import Callable, Iterator, List, Tuple, Union
+from mojap_metadata.metadata import specs
+
+
+_schema_url_template = (
+    "https://moj-analytical-services.github.io/metadata_schema/mojap_metadata/"
+    "{version}.json"
+)
+_schema_version_regex = re.compile(r"(v\d+\.\d+\.\d+)\.json$")
+
+# Schema versions shipped in mojap_metadata/metadata/specs
+_bundled_schema_versions = {
+    "v1.5.0": "table_schema.json",
+}
+
+
+def _version_to_tuple(version: str) -> Tuple[int, ...]:
+    return tuple(int(v) for v in version.lstrip("v").split("."))
+
+
+def get_schema_version_from_url(url: str) -> Union[str, None]:
+    """
+    Returns the version (e.g. "v1.5.0") from a `$schema` url or None
+    if the url does not end with a version.
+    """
+    if not isinstance(url, str):
+        return None
+    m = _schema_version_regex.search(url)
+    return m.group(1) if m else None
+
+
+class _SchemaVersion:
+    def __init__(
+        self,
+        version: str,
+        schema: dict = None,
+        spec_filename: str = None,
+        upgrade: Callable = None,
+    ):
+        self.version = version
+        self.url = _schema_url_template.format(version=version)
+        self.spec_filename = spec_filename
+        self.upgrade = upgrade
+        self._schema = schema
+        self._validator = None
+
+
+class SchemaRegistry:
+    """
+    Holds the versions of the metadata json schema that documents can be
+    validated against. Schemas are only read (from the specs folder) and
+    compiled into a jsonschema validator the first time a version is used
+    and both are cached for every later call.
+
+    Documents are matched to a schema version by the version at the end of
+    their `$schema` url. Documents with no `$schema` or a version that is
+    not registered are validated against the latest registered version.
+    """
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    @property
+    def versions(self) -> List[str]:
+        """Registered versions, oldest first"""
+        return sorted(self._versions, key=_version_to_tuple)
+
+    @property
+    def latest_version(self) -> str:
+        return self.versions[-1]
+
+    def register(
+        self,
+        version: str,
+        schema: dict = None,
+        spec_filename: str = None,
+        upgrade: Callable = None,
+    ) -> None:
+        """
+        Adds a schema version to the registry.
+
+        Args:
+            version (str): The schema version e.g. "v1.5.0"
+            schema (dict, optional): The json schema. Either this or
+                spec_filename must be given.
+            spec_filename (str, optional): Name of a file in the specs folder
+                that is read the first time the schema is needed.
+            upgrade (Callable, optional): Function that takes a metadata dict
+                of the previous version and alters it in place so it is valid
+                for this version. Only needed if this version is not a
+                superset of the previous one.
+        """
+        if schema is None and spec_filename is None:
+            raise ValueError("Either schema or spec_filename must be given")
+        if not _schema_version_regex.search(f"{version}.json"):
+            raise ValueError(f"version must be of the form vX.Y.Z. Given {version}")
+
+        with self._lock:
+            self._versions[version] = _SchemaVersion(
+                version, schema=schema, spec_filename=spec_filename, upgrade=upgrade
+            )
+
+    def resolve_version(self, url: str = None) -> str:
+        """
+        Returns the registered version used to validate a document
+        with the given `$schema` url.
+        """
+        version = get_schema_version_from_url(url)
+        return version if version in self._versions else self.latest_version
+
+    def get_url(self, version: str = None) -> str:
+        return self._get_entry(version).url
+
+    def get_schema(self, version: str = None) -> dict:
+        """Returns the json schema for a version (defaults to the latest)"""
+        entry = self._get_entry(version)
+        if entry._schema is None:
+            with self._lock:
+                if entry._schema is None:
+                    text = files(specs).joinpath(entry.spec_filename).read_text()
+                    entry._schema = json.loads(text)
+        return entry._schema
+
+    def get_validator(self, version: str = None):
+        """
+        Returns a compiled jsonschema validator for a version
+        (defaults to the latest). The schema itself is only checked
+        the first time the validator is built.
+        """
+        entry = self._get_entry(version)
+        if entry._validator is None:
+            schema = self.get_schema(version)
+            with self._lock:
+                if entry._validator is None:
+                    validator_class = jsonschema.validators.validator_for(schema)
+                    validator_class.check_schema(schema)
+                    entry._validator = validator_class(schema)
+        return entry._validator
+
+    def iter_errors(self, data: dict) -> Iterator[jsonschema.ValidationError]:
+        """
+        Yields every schema error in a metadata dict, using the schema
+        version declared by its `$schema` url.
+        """
+        validator = self.get_validator(self.resolve_version(data.get("$schema")))
+        yield from validator.iter_errors(data)
+
+    def validate(self, data: dict) -> None:
+        """
+        Validates a metadata dict against the schema version declared by
+        its `$schema` url. Raises the same error as jsonschema.validate.
+        """
+        error = jsonschema.exceptions.best_match(self.iter_errors(data))
+        if error is not None:
+            raise error
+
+    def upgrade(self, data: dict, version: str = None) -> dict:
+        """
+        Upgrades a metadata dict in place to a newer schema version
+        (defaults to the latest). Runs the upgrade function of each
+        registered version between the document's version and the target
+        version then sets `$schema` to the target version url.
+
+        Args:
+            data (dict): metadata dict to upgrade
+            version (str, optional): version to upgrade to
+
+        Returns:
+            dict: the same (upgraded) dict
+        """
+        target = self._get_entry(version)
+        current = get_schema_version_from_url(data.get("$schema"))
+        current_tuple = _version_to_tuple(current) if current else (-1,)
+        target_tuple = _version_to_tuple(target.version)
+
+        if current_tuple > target_tuple:
+            raise ValueError(
+                f"Cannot upgrade from {current} to older version {target.version}"
+            )
+
+        for v in self.versions:
+            if current_tuple < _version_to_tuple(v) <= target_tuple:
+                upgrade = self._versions[v].upgrade
+                if upgrade is not None:
+                    upgrade(data)
+
+        data["$schema"] = target.url
+        return data
+
+    def _get_entry(self, version: str = None) -> _SchemaVersion:
+        version = version if version else self.latest_version
+        if version not in self._versions:
+            raise ValueError(
+                f"Schema version {version} is not registered. "
+                f"Registered versions: {self.versions}"
+            )
+        return self._versions[version]
+
+
+schema_registry = SchemaRegistry()
+for _version, _spec_filename in _bundled_schema_versions.items():
+    schema_registry.register(_version, spec_filename=_spec_filename)
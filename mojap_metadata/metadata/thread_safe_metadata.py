@@ -0,0 +1,144 @@
+import threading
+
+from contextlib import contextmanager
+from copy import deepcopy
+from typing import Callable, Union
+
+from mojap_metadata.metadata.metadata import Metadata, MetadataProperty
+
+
+def _copy_data(data: dict) -> dict:
+    """
+    Copies the parts of the metadata dict that Metadata methods
+    alter in place (the columns, each column dict and the list properties).
+    """
+    new_data = dict(data)
+    new_data["columns"] = [dict(c) for c in data.get("columns", [])]
+    for k in ("partitions", "primary_key"):
+        if isinstance(data.get(k), list):
+            new_data[k] = list(data[k])
+    return new_data
+
+
+class ThreadSafeMetadata(Metadata):
+    """
+    A Metadata object that can be shared between threads.
+
+    Every change (e.g. update_column, remove_column or setting columns,
+    partitions or any other property) is made to a copy of the metadata
+    while holding a write lock. Once the change is complete and validated
+    the copy replaces the metadata in a single assignment. Readers never
+    take a lock: they see the metadata either before or after a change,
+    never part way through one. If a change fails validation the metadata
+    is left as it was before the change.
+
+    Note that the columns (and column dicts) returned to readers must be
+    treated as read only, use the Metadata methods to make changes.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.__dict__["_write_lock"] = threading.RLock()
+        self.__dict__["_local"] = threading.local()
+        self.__dict__["_committed"] = {}
+        super().__init__(*args, **kwargs)
+
+    @property
+    def _data(self) -> dict:
+        working = getattr(self._local, "working", None)
+        return working if working is not None else self.__dict__["_committed"]
+
+    @_data.setter
+    def _data(self, data: dict) -> None:
+        if getattr(self._local, "working", None) is not None:
+            self._local.working = data
+        else:
+            self.__dict__["_committed"] = data
+
+    @contextmanager
+    def _write(self):
+        """
+        Runs the block on a working copy of the metadata that only the
+        current thread can see. The copy replaces the metadata when the
+        outermost block exits without error.
+        """
+        if getattr(self._local, "working", None) is not None:
+            yield
+            return
+
+        with self._write_lock:
+            self._local.working = _copy_data(self.__dict__["_committed"])
+            try:
+                yield
+                self.__dict__["_committed"] = self._local.working
+            finally:
+                self._local.working = None
+
+    def __setattr__(self, name: str, value) -> None:
+        attr = getattr(type(self), name, None)
+        if name != "_data" and isinstance(attr, (MetadataProperty, property)):
+            with self._write():
+                super().__setattr__(name, value)
+        else:
+            super().__setattr__(name, value)
+
+    def __deepcopy__(self, memo: dict) -> object:
+        new = self.__class__.__new__(self.__class__)
+        memo[id(self)] = new
+        new.__dict__["_write_lock"] = threading.RLock()
+        new.__dict__["_local"] = threading.local()
+        for k, v in self.__dict__.items():
+            if k not in ("_write_lock", "_local"):
+                new.__dict__[k] = deepcopy(v, memo)
+        return new
+
+    def __getstate__(self) -> dict:
+        return {
+            k: v
+            for k, v in self.__dict__.items()
+            if k not in ("_write_lock", "_local")
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.__dict__["_write_lock"] = threading.RLock()
+        self.__dict__["_local"] = threading.local()
+
+    def remove_column(self, name: str):
+        with self._write():
+            super().remove_column(name)
+
+    def update_column(self, column: dict, append: bool = True):
+        with self._write():
+            super().update_column(column, append)
+
+    def reorder_cols_based_on_partition_order(self):
+        with self._write():
+            super().reorder_cols_based_on_partition_order()
+
+    def _init_data_with_default_key_values(self, data: dict):
+        with self._write():
+            super()._init_data_with_default_key_values(data)
+
+    def upgrade_schema_version(self, version: str = None) -> None:
+        with self._write():
+            super().upgrade_schema_version(version)
+
+    def column_names_to_lower(self, inplace: bool = False) -> Union[object, None]:
+        if inplace:
+            with self._write():
+                return super().column_names_to_lower(inplace)
+        return super().column_names_to_lower(inplace)
+
+    def column_names_to_upper(self, inplace: bool = False) -> Union[object, None]:
+        if inplace:
+            with self._write():
+                return super().column_names_to_upper(inplace)
+        return super().column_names_to_upper(inplace)
+
+    def set_col_type_category_from_types(self):
+        with self._write():
+            super().set_col_type_category_from_types()
+
+    def set_col_types_from_type_category(self, type_category_lookup: Callable = None):
+        with self._write():
+            super().set_col_types_from_type_category(type_category_lookup)
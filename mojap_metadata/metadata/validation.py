@@ -0,0 +1,192 @@
+import json
+import os
+import yaml
+
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Tuple, Union
+
+from dataengineeringutils3.s3 import read_json_from_s3, read_yaml_from_s3
+from mojap_metadata.metadata.metadata import Metadata, _get_default_key_values
+from mojap_metadata.metadata.schema_registry import schema_registry
+
+_metadata_suffixes = (".json", ".yaml", ".yml")
+
+
+@dataclass
+class DocumentValidationResult:
+    """
+    The validation result for a single metadata document.
+
+    name (str): path of the document (or its key if it was not read from a file)
+    errors (List[str]): every error found in the document
+    """
+
+    name: str
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def valid(self) -> bool:
+        return not self.errors
+
+
+@dataclass
+class ValidationReport:
+    """
+    The validation results for many metadata documents.
+
+    results (List[DocumentValidationResult]): a result for every document
+    """
+
+    results: List[DocumentValidationResult] = field(default_factory=list)
+
+    @property
+    def valid(self) -> bool:
+        return all(r.valid for r in self.results)
+
+    @property
+    def invalid(self) -> List[DocumentValidationResult]:
+        return [r for r in self.results if not r.valid]
+
+    def to_dict(self) -> dict:
+        return {
+            "valid": self.valid,
+            "documents": len(self.results),
+            "invalid_documents": len(self.invalid),
+            "errors": {r.name: r.errors for r in self.invalid},
+        }
+
+
+def _iter_list_attribute_errors(data: dict) -> Iterator[str]:
+    """
+    Yields the errors Metadata._validate_list_attribute would raise
+    for primary_key, partitions and the column names.
+    """
+    columns = data.get("columns")
+    if not isinstance(columns, list):
+        return
+    column_names = [c.get("name") for c in columns if isinstance(c, dict)]
+
+    for attribute, values in [
+        ("primary_key", data.get("primary_key", [])),
+        ("partitions", data.get("partitions", [])),
+        ("column name", column_names),
+    ]:
+        if not isinstance(values, list):
+            yield f"'{attribute}' must be of type 'list'"
+            continue
+        if not all(isinstance(v, str) for v in values):
+            yield f"'{attribute}' must be a list of strings"
+            continue
+        missing = [v for v in values if v not in column_names]
+        if missing:
+            yield f"All elements of '{attribute}' must be in columns: {missing}"
+        if len(values) != len(set(values)):
+            yield f"All elements of '{attribute}' must be unique"
+
+
+def iter_metadata_errors(data: dict) -> Iterator[str]:
+    """
+    Yields every error in a metadata dictionary (rather than stopping at
+    the first like Metadata.validate). Schema errors are checked against the
+    schema version declared in the `$schema` of the dictionary. Keys that
+    Metadata.from_dict fills with defaults (e.g. name) may be left out.
+
+    Args:
+        data (dict): metadata dictionary
+
+    Yields:
+        str: error messages prefixed with the path to the error in the dict
+    """
+    if not isinstance(data, dict):
+        yield f"metadata must be a dictionary not {type(data).__name__}"
+        return
+
+    data = {**_get_default_key_values(), **data}
+    for error in schema_registry.iter_errors(data):
+        path = "/".join(str(p) for p in error.absolute_path)
+        yield f"{path}: {error.message}" if path else error.message
+
+    yield from _iter_list_attribute_errors(data)
+
+
+def _read_document(path: str) -> dict:
+    if path.lower().endswith(".json"):
+        if path.startswith("s3://"):
+            return read_json_from_s3(path)
+        with open(path, "r") as f:
+            return json.load(f)
+    else:
+        if path.startswith("s3://"):
+            return read_yaml_from_s3(path)
+        with open(path, "r") as f:
+            return yaml.safe_load(f)
+
+
+def _validate_document(item: Tuple[str, Union[str, dict]]) -> DocumentValidationResult:
+    name, doc = item
+    result = DocumentValidationResult(name)
+    try:
+        data = _read_document(doc) if isinstance(doc, str) else doc
+    except Exception as e:
+        result.errors.append(f"could not read document: {e}")
+        return result
+
+    result.errors.extend(iter_metadata_errors(data))
+    return result
+
+
+def _list_documents(directory: str) -> List[str]:
+    paths = []
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.lower().endswith(_metadata_suffixes):
+                paths.append(os.path.join(root, filename))
+    return sorted(paths)
+
+
+def validate_many(
+    documents: Union[str, Iterable[str], Mapping],
+    max_workers: int = None,
+    use_processes: bool = True,
+) -> ValidationReport:
+    """
+    Validates many metadata documents in parallel and collects every error
+    in every document.
+
+    Args:
+        documents (Union[str, Iterable[str], Mapping]): One of
+            - a directory, every json and yaml file in it (and its
+              subdirectories) is validated
+            - a list of json or yaml file paths (local or s3)
+            - a mapping of name to metadata dict or Metadata object
+              (e.g. a MetadataCatalog)
+        max_workers (int, optional): Number of workers. Defaults to the
+            number of CPUs.
+        use_processes (bool, optional): Validate in separate processes.
+            Set to False to use threads. Defaults to True.
+
+    Returns:
+        ValidationReport: results for every document in the order given
+            (sorted by path for a directory)
+    """
+    if isinstance(documents, str):
+        items = [(p, p) for p in _list_documents(documents)]
+    elif isinstance(documents, Mapping):
+        items = [
+            (k, v.to_dict() if isinstance(v, Metadata) else v)
+            for k, v in documents.items()
+        ]
+    else:
+        items = [(p, p) for p in documents]
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    chunksize = max(1, len(items) // ((max_workers or os.cpu_count() or 1) * 4))
+    with executor_class(max_workers=max_workers) as executor:
+        if use_processes:
+            results = list(executor.map(_validate_document, items, chunksize=chunksize))
+        else:
+            results = list(executor.map(_validate_document, items))
+
+    return ValidationReport(results)
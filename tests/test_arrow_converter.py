@@ -5,6 +5,7 @@ from tests.helper import assert_meta_col_conversion, valid_types
 from mojap_metadata import Metadata
 from mojap_metadata.converters.arrow_converter import (
     ArrowConverter,
+    ArrowConverterOptions,
     _extract_bracket_params,
 )
 import pyarrow as pa
@@ -255,3 +256,378 @@ def test_generate_to_meta():
 )
 def test_extract_bracket_params(meta_type, response):
     assert response == _extract_bracket_params(meta_type)
+
+
+def test_generate_csv_read_options():
+    from io import BytesIO
+    from pyarrow import csv
+
+    meta = Metadata.from_dict(
+        {
+            "name": "test",
+            "partitions": ["year"],
+            "columns": [
+                {"name": "id", "type": "int64"},
+                {
+                    "name": "created",
+                    "type": "timestamp(s)",
+                    "datetime_format": "%d/%m/%Y %H:%M",
+                },
+                {"name": "code", "type": "string"},
+                {"name": "year", "type": "int32"},
+            ],
+        }
+    )
+    ac = ArrowConverter()
+
+    read_options, parse_options, convert_options = ac.generate_csv_read_options(meta)
+    assert convert_options.column_types == {
+        "id": pa.int64(),
+        "created": pa.timestamp("s"),
+        "code": pa.string(),
+    }
+    assert convert_options.include_columns == ["id", "created", "code"]
+    data = b"code,extra,id,created\nAB,x,01,01/02/2020 10:00\n,y,2,2020-01-01\n"
+    table = csv.read_csv(BytesIO(data), read_options, parse_options, convert_options)
+    assert table.schema == ac.generate_from_meta(meta)
+    assert table.column("code").to_pylist() == ["AB", None]
+
+
+def test_generate_csv_read_options_glue_csv_options():
+    from io import BytesIO
+    from pyarrow import csv
+    from mojap_metadata.converters.glue_converter import CsvOptions
+
+    meta = Metadata.from_dict(
+        {
+            "name": "test",
+            "columns": [
+                {"name": "id", "type": "int64"},
+                {"name": "v", "type": "string"},
+            ],
+        }
+    )
+    ac = ArrowConverter()
+
+    options = ac.generate_csv_read_options(meta, CsvOptions(sep="|", skip_header=True))
+    data = b'ignored|header\n1|a\\|b\n2|"c"\n'
+    table = csv.read_csv(BytesIO(data), *options)
+    assert table.to_pylist() == [{"id": 1, "v": "a|b"}, {"id": 2, "v": "c"}]
+
+    options = ac.generate_csv_read_options(
+        meta, CsvOptions(quote_char=None, escape_char=None), null_values=["NA"]
+    )
+    table = csv.read_csv(BytesIO(b'1,NA\n2,"x"\n'), *options)
+    assert table.to_pylist() == [{"id": 1, "v": None}, {"id": 2, "v": '"x"'}]
+
+    meta.partitions = ["v"]
+    options = ac.generate_csv_read_options(meta, CsvOptions())
+    assert options[2].include_columns == ["id"]
+    with pytest.raises(ValueError, match="Set drop_partitions to True"):
+        ac.generate_csv_read_options(meta, CsvOptions(), drop_partitions=False)
+
+
+@pytest.mark.parametrize(
+    "enum_length,index_type",
+    [(2, pa.int8()), (128, pa.int8()), (129, pa.int16()), (40000, pa.int32())],
+)
+def test_dictionary_encode_enums(enum_length, index_type):
+    meta = Metadata(
+        columns=[
+            {
+                "name": "a",
+                "type": "string",
+                "enum": [str(i) for i in range(enum_length)],
+            },
+            {"name": "b", "type": "int64", "enum": [1, 2], "dictionary": False},
+            {"name": "c", "type": "string"},
+        ]
+    )
+    ac = ArrowConverter(ArrowConverterOptions(dictionary_encode_enums=True))
+    schema = ac.generate_from_meta(meta)
+    assert schema.field("a").type == pa.dictionary(index_type, pa.string())
+    assert schema.field("b").type == pa.int64()
+    assert schema.field("c").type == pa.string()
+
+    # enums are not dictionary encoded by default
+    assert ArrowConverter().generate_from_meta(meta).field("a").type == pa.string()
+
+
+def test_dictionary_round_trip():
+    meta = Metadata(
+        columns=[
+            {"name": "a", "type": "string", "dictionary": True},
+            {"name": "b", "type": "date32", "dictionary": True},
+            {"name": "c", "type": "list<string>", "dictionary": True},
+            {"name": "d", "type": "int64"},
+        ]
+    )
+    ac = ArrowConverter()
+    schema = ac.generate_from_meta(meta)
+    assert schema.field("a").type == pa.dictionary(pa.int32(), pa.string())
+    assert schema.field("b").type == pa.dictionary(pa.int32(), pa.date32())
+    # nested types are not dictionary encoded
+    assert schema.field("c").type == pa.list_(pa.string())
+
+    assert ac.reverse_convert_col_type(schema.field("a").type) == "string"
+    meta2 = ac.generate_to_meta(schema)
+    assert [c.get("dictionary") for c in meta2.columns] == [True, True, None, None]
+    assert ac.generate_from_meta(meta2) == schema
+
+
+def test_convert_col_type_is_memoised():
+    arrow_type = pa.struct(
+        [
+            ("a", pa.list_(pa.struct([("x", pa.timestamp("ms")), ("y", pa.utf8())]))),
+            ("b", pa.large_list(pa.decimal128(10, 2))),
+        ]
+    )
+    ac = ArrowConverter()
+    meta_type = ac.reverse_convert_col_type(arrow_type)
+    assert meta_type == (
+        "struct<a:list<struct<x:timestamp(ms), y:string>>, "
+        "b:large_list<decimal128(10, 2)>>"
+    )
+    assert ac.convert_col_type(meta_type) == arrow_type
+    # the same (immutable) type object is returned for the same type string
+    assert ac.convert_col_type(meta_type) is ac.convert_col_type(meta_type)
+
+
+def test_convert_col_type_uses_overridden_basic_conversion():
+    class LargeStringArrowConverter(ArrowConverter):
+        def convert_basic_col_type(self, coltype):
+            if coltype == "string":
+                return pa.large_string()
+            return super().convert_basic_col_type(coltype)
+
+    ac = LargeStringArrowConverter()
+    assert ac.convert_col_type("list<string>") == pa.list_(pa.large_string())
+    assert ArrowConverter().convert_col_type("list<string>") == pa.list_(pa.string())
+
+
+def test_generate_from_meta_is_cached():
+    from mojap_metadata.converters import arrow_converter
+
+    arrow_converter.clear_schema_cache()
+    meta = Metadata(
+        columns=[
+            {"name": "a", "type": "int64", "description": "a"},
+            {"name": "b", "type": "string", "enum": ["x", "y"]},
+            {"name": "p", "type": "string"},
+        ],
+        partitions=["p"],
+    )
+    ac = ArrowConverter()
+    schema = ac.generate_from_meta(meta)
+    assert ac.generate_from_meta(meta) is schema
+    assert ArrowConverter().generate_from_meta(meta) is schema
+
+    # properties that do not change the schema are not part of the key
+    meta.columns[0]["description"] = "changed"
+    assert ac.generate_from_meta(meta) is schema
+
+    assert ac.generate_from_meta(meta, drop_partitions=False).names == ["a", "b", "p"]
+    dict_ac = ArrowConverter(ArrowConverterOptions(dictionary_encode_enums=True))
+    assert pa.types.is_dictionary(dict_ac.generate_from_meta(meta).field("b").type)
+
+    meta.columns[0]["nullable"] = False
+    meta.columns[0]["type"] = "int32"
+    schema2 = ac.generate_from_meta(meta)
+    assert schema2.field("a") == pa.field("a", pa.int32(), nullable=False)
+
+    try:
+        arrow_converter.set_schema_cache_maxsize(1)
+        assert len(arrow_converter._schema_cache) == 1
+        arrow_converter.set_schema_cache_maxsize(0)
+        assert not arrow_converter._schema_cache
+        assert ac.generate_from_meta(meta) == schema2
+        assert ac.generate_from_meta(meta) is not schema2
+    finally:
+        arrow_converter.set_schema_cache_maxsize(1024)
+
+
+def test_embed_metadata_round_trip(tmp_path):
+    import pyarrow.parquet as pq
+
+    meta = Metadata(
+        name="test",
+        description="a table",
+        columns=[
+            {"name": "a", "type": "int64", "description": "an int", "minimum": 0},
+            {"name": "b", "type": "string", "enum": ["x", "y"], "dictionary": True},
+            {"name": "c", "type": "struct<x:list<timestamp(ms)>>", "nullable": False},
+            {"name": "p", "type": "string"},
+        ],
+        partitions=["p"],
+    )
+    ac = ArrowConverter(ArrowConverterOptions(embed_metadata=True))
+    schema = ac.generate_from_meta(meta)
+    assert schema.names == ["a", "b", "c"]
+    assert ArrowConverter().generate_from_meta(meta).metadata is None
+    assert ac.generate_to_meta(schema).to_dict() == meta.to_dict()
+
+    # parquet files carry the metadata
+    path = str(tmp_path / "data.parquet")
+    pq.write_table(schema.empty_table(), path)
+    restored = ArrowConverter().generate_to_meta(pq.read_schema(path))
+    assert restored.to_dict() == meta.to_dict()
+
+    meta2 = ac.generate_to_meta(schema, {"name": "renamed"})
+    assert meta2.name == "renamed"
+    assert meta2.columns == meta.columns
+    with pytest.warns(UserWarning, match="columns key found"):
+        meta2 = ac.generate_to_meta(schema, {"columns": [], "name": "renamed"})
+    assert meta2.columns == meta.columns
+
+    # columns are restored from field metadata without the schema's metadata
+    meta3 = ac.generate_to_meta(schema.remove_metadata())
+    assert meta3.columns == meta.columns[:3]
+    assert meta3.name == ""
+
+    # embedded metadata that no longer matches the fields is ignored
+    changed = schema.set(0, pa.field("a", pa.float64()))
+    meta4 = ac.generate_to_meta(changed)
+    assert meta4.columns[0] == {"name": "a", "type": "float64"}
+    assert meta4.columns[1:] == meta.columns[1:3]
+
+
+def test_embed_metadata_is_encoded_on_cache_misses(monkeypatch):
+    from mojap_metadata.converters import arrow_converter
+
+    arrow_converter.clear_schema_cache()
+    meta = Metadata(columns=[{"name": "a", "type": "int64", "description": "x"}])
+    ac = ArrowConverter(ArrowConverterOptions(embed_metadata=True))
+    schema = ac.generate_from_meta(meta)
+
+    calls = []
+    compress = arrow_converter.zlib.compress
+    monkeypatch.setattr(
+        arrow_converter.zlib, "compress", lambda b: calls.append(b) or compress(b)
+    )
+    assert ac.generate_from_meta(meta) is schema
+    assert not calls
+
+    # descriptions are not in the schema but are in the embedded metadata
+    meta.columns[0]["description"] = "y"
+    changed = ac.generate_from_meta(meta)
+    assert calls
+    assert ac.generate_to_meta(changed).columns[0]["description"] == "y"
+
+
+def test_generate_partitioning_and_filter(tmp_path):
+    import datetime
+    import pyarrow.dataset as ds
+
+    meta = Metadata(
+        columns=[
+            {"name": "v", "type": "int64"},
+            {"name": "d", "type": "date32"},
+            {"name": "r", "type": "string"},
+        ],
+        partitions=["d", "r"],
+    )
+    ac = ArrowConverter()
+    assert ac.generate_partitioning(Metadata(columns=meta.columns)) is None
+    with pytest.raises(ValueError):
+        ac.generate_partitioning(meta, flavor="filename")
+
+    partitioning = ac.generate_partitioning(meta)
+    assert partitioning.schema == pa.schema([("d", pa.date32()), ("r", pa.string())])
+    table = pa.table(
+        {
+            "v": [1, 2, 3, 4],
+            "d": pa.array([datetime.date(2021, 1, i) for i in (1, 2, 2, 3)]),
+            "r": ["a", "b", "a", "b"],
+        }
+    )
+    ds.write_dataset(table, tmp_path, format="parquet", partitioning=partitioning)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "d=2021-01-01",
+        "d=2021-01-02",
+        "d=2021-01-03",
+    ]
+
+    dataset = ds.dataset(
+        tmp_path,
+        format="parquet",
+        partitioning=partitioning,
+        schema=ac.generate_from_meta(meta, drop_partitions=False),
+    )
+    f = ac.generate_partition_filter(meta, [("d", ">=", "2021-01-02"), ("r", "=", "a")])
+    assert len(list(dataset.get_fragments(filter=f))) == 1
+    assert dataset.to_table(filter=f).column("v").to_pylist() == [3]
+
+    f = ac.generate_partition_filter(
+        meta, [[("d", "=", datetime.date(2021, 1, 1))], [("r", "not in", ["a"])]]
+    )
+    assert sorted(dataset.to_table(filter=f).column("v").to_pylist()) == [1, 2, 4]
+    assert ac.generate_partition_filter(meta, []) is None
+
+    directory = ac.generate_partitioning(meta, flavor="directory")
+    assert directory.schema == partitioning.schema
+    with pytest.raises(ValueError, match="not a partition"):
+        ac.generate_partition_filter(meta, [("v", "=", 1)])
+    with pytest.raises(ValueError, match="op must be one of"):
+        ac.generate_partition_filter(meta, [("r", "like", "a")])
+
+
+def test_generate_projected_schema(tmp_path):
+    import pyarrow.parquet as pq
+
+    meta = Metadata(
+        columns=[
+            {"name": "id", "type": "int64", "nullable": False},
+            {
+                "name": "address",
+                "type": "struct<postcode:string, loc:struct<x:float64, y:float64>>",
+            },
+            {"name": "items", "type": "list<struct<sku:string, qty:int32>>"},
+            {"name": "p", "type": "string"},
+        ],
+        partitions=["p"],
+    )
+    ac = ArrowConverter()
+    schema = ac.generate_projected_schema(
+        meta, ["items.element.sku", "address.loc", "id"]
+    )
+    assert schema == pa.schema(
+        [
+            pa.field("id", pa.int64(), nullable=False),
+            (
+                "address",
+                pa.struct(
+                    [("loc", pa.struct([("x", pa.float64()), ("y", pa.float64())]))]
+                ),
+            ),
+            ("items", pa.list_(pa.struct([("sku", pa.string())]))),
+        ]
+    )
+    assert ac.generate_projected_schema(meta, ["items"]).field("items").type == (
+        ac.convert_col_type(meta.get_column("items")["type"])
+    )
+    with pytest.raises(ValueError, match="paths not in metadata"):
+        ac.generate_projected_schema(meta, ["address.street"])
+    with pytest.raises(ValueError, match="paths not in metadata"):
+        ac.generate_projected_schema(meta, ["p"])
+    assert ac.generate_projected_schema(meta, ["p"], drop_partitions=False).names == [
+        "p"
+    ]
+
+    paths = ["address.postcode", "items.element.sku"]
+    columns = ac.generate_parquet_columns(meta, paths)
+    assert columns == ["address.postcode", "items.list.element.sku"]
+
+    table = pa.table(
+        {
+            "id": pa.array([1], pa.int64()),
+            "address": [{"postcode": "A", "loc": {"x": 1.0, "y": 2.0}}],
+            "items": [[{"sku": "s", "qty": 1}]],
+        }
+    )
+    path = str(tmp_path / "data.parquet")
+    pq.write_table(table, path)
+    projected = pq.ParquetFile(path).read(columns=columns)
+    assert projected.to_pylist() == [
+        {"address": {"postcode": "A"}, "items": [{"sku": "s"}]}
+    ]
+    assert projected.schema.equals(ac.generate_projected_schema(meta, paths))
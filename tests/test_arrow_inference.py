@@ -0,0 +1,99 @@
+import gzip
+import json
+
+import pyarrow as pa
+import pytest
+
+from mojap_metadata import Metadata
+from mojap_metadata.converters.arrow_converter.inference import widen_arrow_type
+
+
+@pytest.mark.parametrize(
+    "current,new,expected",
+    [
+        (None, pa.int64(), pa.int64()),
+        (pa.null(), pa.int64(), pa.int64()),
+        (pa.int64(), pa.null(), pa.int64()),
+        (pa.int64(), pa.float64(), pa.float64()),
+        (pa.date32(), pa.timestamp("s"), pa.timestamp("s")),
+        (pa.timestamp("s"), pa.timestamp("ms"), pa.timestamp("ms")),
+        (pa.int64(), pa.bool_(), pa.string()),
+        (pa.int64(), pa.string(), pa.string()),
+        (
+            pa.struct([("a", pa.int64())]),
+            pa.struct([("a", pa.float64()), ("b", pa.string())]),
+            pa.struct([("a", pa.float64()), ("b", pa.string())]),
+        ),
+        (pa.list_(pa.int64()), pa.list_(pa.float64()), pa.list_(pa.float64())),
+    ],
+)
+def test_widen_arrow_type(current, new, expected):
+    assert widen_arrow_type(current, new) == expected
+
+
+def test_from_data_sample_csv(tmp_path):
+    lines = ["id,score,flag,day,label,empty"]
+    lines += [f"{i},{i},true,2021-01-01,x{i}," for i in range(50)]
+    # Types widen in later blocks
+    lines += ["50,1.5,false,2021-01-01 10:00:00,,"]
+    path = tmp_path / "data.csv"
+    path.write_text("\n".join(lines) + "\n")
+
+    meta = Metadata.from_data_sample(
+        str(path), block_size=256, meta_init_dict={"name": "data"}
+    )
+    cols = {c["name"]: c for c in meta.columns}
+
+    assert meta.name == "data"
+    assert meta.file_format == "csv"
+    assert meta.column_names == ["id", "score", "flag", "day", "label", "empty"]
+    assert cols["id"]["type"] == "int64"
+    assert cols["id"]["type_category"] == "integer"
+    assert cols["id"]["nullable"] is False
+    assert cols["score"]["type"] == "float64"
+    assert cols["flag"]["type"] == "bool"
+    assert cols["day"]["type"] == "timestamp(s)"
+    assert cols["label"]["type"] == "string"
+    assert cols["label"]["nullable"] is True
+    assert cols["empty"]["type"] == "null"
+
+
+def test_from_data_sample_csv_sample_rows(tmp_path):
+    lines = ["a"] + [str(i) for i in range(100)] + ["not an int"]
+    path = tmp_path / "data.csv"
+    path.write_text("\n".join(lines) + "\n")
+
+    meta = Metadata.from_data_sample(str(path), sample_rows=100)
+    assert meta.get_column("a")["type"] == "int64"
+    meta = Metadata.from_data_sample(str(path), sample_rows=101)
+    assert meta.get_column("a")["type"] == "string"
+
+
+def test_from_data_sample_json(tmp_path):
+    rows = [
+        {"id": i, "address": {"postcode": "AB1"}, "tags": [1, 2]} for i in range(30)
+    ]
+    rows += [
+        {"id": 30, "address": {"postcode": "AB1", "number": 2}, "tags": [1.5]},
+        {"id": 31, "extra": "x"},
+    ]
+    path = tmp_path / "data.jsonl.gz"
+    with gzip.open(path, "wt") as f:
+        f.write("\n".join(json.dumps(r) for r in rows))
+
+    meta = Metadata.from_data_sample(str(path), block_size=512)
+    cols = {c["name"]: c for c in meta.columns}
+
+    assert meta.file_format == "json"
+    assert cols["id"]["type"] == "int64"
+    assert cols["id"]["nullable"] is False
+    assert cols["address"]["type"] == "struct<postcode:string, number:int64>"
+    assert cols["address"]["type_category"] == "struct"
+    assert cols["address"]["nullable"] is True
+    assert cols["tags"]["type"] == "list<float64>"
+    assert cols["extra"]["nullable"] is True
+
+
+def test_from_data_sample_bad_format(tmp_path):
+    with pytest.raises(ValueError):
+        Metadata.from_data_sample(str(tmp_path / "data.parquet"))
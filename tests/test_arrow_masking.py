@@ -0,0 +1,204 @@
+import hashlib
+
+import pyarrow as pa
+import pytest
+
+from mojap_metadata import Metadata
+from mojap_metadata.converters.arrow_converter.masking import (
+    SensitiveDataMasker,
+    mask_sensitive_data,
+)
+
+
+@pytest.fixture
+def meta():
+    return Metadata.from_dict(
+        {
+            "name": "test",
+            "columns": [
+                {"name": "id", "type": "int64"},
+                {"name": "name", "type": "string", "sensitive": True},
+                {
+                    "name": "address",
+                    "type": "struct<postcode:string, town:string>",
+                    "sensitive_paths": ["address.postcode"],
+                },
+                {
+                    "name": "items",
+                    "type": "list<struct<sku:string, qty:int64>>",
+                    "sensitive_paths": ["items.element.sku"],
+                    "masking": "tokenise",
+                },
+                {"name": "dob", "type": "date32", "sensitive": True, "masking": "null"},
+            ],
+        }
+    )
+
+
+@pytest.fixture
+def table():
+    return pa.table(
+        {
+            "id": [1, 2, 3, 4],
+            "name": ["a", "b", "a", None],
+            "address": [
+                {"postcode": "P1", "town": "T"},
+                None,
+                {"postcode": "P2", "town": "U"},
+                {"postcode": "P1", "town": "V"},
+            ],
+            "items": [
+                [{"sku": "x", "qty": 1}],
+                [],
+                None,
+                [{"sku": "y", "qty": 2}, {"sku": "x", "qty": 3}],
+            ],
+            "dob": pa.array([1, 2, 3, 4], pa.date32()),
+        }
+    )
+
+
+def _hash(value, salt=b""):
+    return hashlib.blake2b(value.encode(), key=salt, digest_size=16).hexdigest()
+
+
+def test_masked_columns(meta):
+    masker = SensitiveDataMasker(meta, salt=b"secret")
+    assert masker.masked_columns == {
+        "name": ["name"],
+        "address": ["address.postcode"],
+        "items": ["items.element.sku"],
+        "dob": ["dob"],
+    }
+
+
+def test_mask(meta, table):
+    out = SensitiveDataMasker(meta, salt=b"secret").mask(table)
+
+    assert out.column("id").to_pylist() == [1, 2, 3, 4]
+    assert out.column("name").to_pylist() == [
+        _hash("a", b"secret"),
+        _hash("b", b"secret"),
+        _hash("a", b"secret"),
+        None,
+    ]
+    assert out.column("address").to_pylist() == [
+        {"postcode": _hash("P1", b"secret"), "town": "T"},
+        None,
+        {"postcode": _hash("P2", b"secret"), "town": "U"},
+        {"postcode": _hash("P1", b"secret"), "town": "V"},
+    ]
+    assert out.column("items").to_pylist() == [
+        [{"sku": 1, "qty": 1}],
+        [],
+        None,
+        [{"sku": 2, "qty": 2}, {"sku": 1, "qty": 3}],
+    ]
+    assert out.column("dob").null_count == 4
+    assert out.schema.field("dob").type == pa.date32()
+
+
+def test_mask_leaves_other_columns(meta, table):
+    batch = table.to_batches()[0]
+    out = SensitiveDataMasker(meta, salt=b"secret").mask(batch)
+    assert isinstance(out, pa.RecordBatch)
+    assert out.column("id").buffers()[1].address == (
+        batch.column("id").buffers()[1].address
+    )
+    town = out.column("address").field("town")
+    assert town.buffers()[2].address == (
+        batch.column("address").field("town").buffers()[2].address
+    )
+
+
+def test_mask_stream_tokens_are_stable(meta, table):
+    batch = table.to_batches()[0]
+    batches = [batch.slice(3, 1), batch.slice(0, 3)]
+    out = list(mask_sensitive_data(meta, iter(batches), method="tokenise"))
+
+    assert out[0].column("name").to_pylist() == [None]
+    assert out[0].column("items").to_pylist() == [
+        [{"sku": 1, "qty": 2}, {"sku": 2, "qty": 3}]
+    ]
+    assert out[1].column("name").to_pylist() == [1, 2, 1]
+    assert out[1].column("items").to_pylist() == [[{"sku": 2, "qty": 1}], [], None]
+
+
+def test_mask_max_tokens(table):
+    meta = Metadata(columns=[{"name": "name", "type": "string", "sensitive": True}])
+    masker = SensitiveDataMasker(meta, method="tokenise", max_tokens=2)
+    assert masker.mask(table.select(["name"])).column("name").to_pylist() == [
+        1,
+        2,
+        1,
+        None,
+    ]
+    with pytest.raises(ValueError, match="more than max_tokens"):
+        masker.mask(pa.table({"name": ["a", "c"]}))
+    # the limit is checked before new tokens are added
+    assert len(masker._tokens["name"]) == 2
+
+
+def test_mask_hashes_values_as_text():
+    meta = Metadata(
+        columns=[
+            {"name": "n", "type": "int64", "sensitive": True},
+            {"name": "s", "type": "large_string", "sensitive": True},
+            {"name": "b", "type": "binary", "sensitive": True},
+        ]
+    )
+    data = pa.table(
+        {
+            "n": [10, 20],
+            "s": pa.array(["x", "y"], pa.large_string()),
+            "b": [b"x", b"y"],
+        }
+    )
+    out = mask_sensitive_data(meta, data, salt=b"secret")
+    assert out.column("n").to_pylist() == [
+        _hash("10", b"secret"),
+        _hash("20", b"secret"),
+    ]
+    assert out.column("s").to_pylist() == [
+        _hash("x", b"secret"),
+        _hash("y", b"secret"),
+    ]
+    assert out.column("b").to_pylist() == out.column("s").to_pylist()
+
+
+def test_mask_sensitive_table(table):
+    meta = Metadata.from_dict(
+        {
+            "name": "test",
+            "sensitive": True,
+            "columns": [
+                {"name": "id", "type": "int64", "sensitive": False},
+                {"name": "name", "type": "string"},
+                {"name": "address", "type": "struct<postcode:string, town:string>"},
+            ],
+        }
+    )
+    out = mask_sensitive_data(
+        meta, table.select(["id", "name", "address"]), salt=b"secret"
+    )
+    assert out.column("id").to_pylist() == [1, 2, 3, 4]
+    assert out.column("name").to_pylist()[1] == _hash("b", b"secret")
+    assert out.column("address").to_pylist()[2] == {
+        "postcode": _hash("P2", b"secret"),
+        "town": _hash("U", b"secret"),
+    }
+
+
+def test_mask_errors(meta):
+    with pytest.raises(ValueError, match="method must be one of"):
+        SensitiveDataMasker(meta, method="drop")
+    with pytest.raises(ValueError, match=r"a salt is required to hash \['name'"):
+        SensitiveDataMasker(meta)
+    # salts are only needed for hashing
+    SensitiveDataMasker(meta, method="tokenise")
+
+    meta.update_column(
+        {"name": "address", "type": "string", "sensitive_paths": ["address.zip"]}
+    )
+    with pytest.raises(ValueError, match="sensitive_paths not in metadata"):
+        SensitiveDataMasker(meta)
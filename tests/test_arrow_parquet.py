@@ -0,0 +1,291 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from mojap_metadata.converters.arrow_converter import ArrowConverter
+
+
+def _write(path, table):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, path)
+
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    table = pa.table({"id": pa.array([1, 2], pa.int64()), "name": pa.array(["a", "b"])})
+    for year in [2020, 2021]:
+        for month in [1, 2]:
+            _write(
+                tmp_path / f"year={year}" / f"month={month}" / "part-0.parquet", table
+            )
+    (tmp_path / "_SUCCESS").write_text("")
+    (tmp_path / "year=2020" / ".hidden").write_text("")
+    return tmp_path
+
+
+def test_generate_to_meta_from_parquet_dataset(dataset_dir):
+    ac = ArrowConverter()
+    meta = ac.generate_to_meta_from_parquet_dataset(
+        str(dataset_dir), meta_init_dict={"name": "test"}
+    )
+    assert meta.name == "test"
+    assert meta.file_format == "parquet"
+    assert meta.partitions == ["year", "month"]
+    assert meta.column_names == ["id", "name", "year", "month"]
+    assert meta.get_column("id")["type"] == "int64"
+    assert meta.get_column("year")["type"] == "int64"
+    assert meta.get_column("month")["nullable"] is False
+
+
+def test_parquet_dataset_divergent_files(dataset_dir):
+    drifted = pa.table(
+        {
+            "id": pa.array([1], pa.float64()),
+            "name": pa.array(["a"]),
+            "extra": pa.array([True]),
+        }
+    )
+    drifted_path = dataset_dir / "year=2022" / "month=1" / "part-0.parquet"
+    _write(drifted_path, drifted)
+    no_partitions_path = dataset_dir / "part-0.parquet"
+    _write(no_partitions_path, drifted.drop(["extra"]))
+
+    ac = ArrowConverter()
+    with pytest.warns(UserWarning, match="2 file"):
+        meta, divergent = ac.generate_to_meta_from_parquet_dataset(
+            str(dataset_dir), return_divergent=True
+        )
+
+    assert meta.column_names == ["id", "name", "extra", "year", "month"]
+    assert meta.get_column("id")["type"] == "float64"
+    assert meta.get_column("extra")["nullable"] is True
+
+    assert divergent[str(drifted_path)] == [
+        "column id is double not int64",
+        "extra column extra",
+    ]
+    assert divergent[str(no_partitions_path)] == [
+        "column id is double not int64",
+        "partitions [] do not match ['year', 'month']",
+    ]
+
+
+def test_parquet_dataset_partition_column_collision(tmp_path):
+    table = pa.table({"id": [1, 2], "year": [2019, 2020]})
+    _write(tmp_path / "year=2020" / "part-0.parquet", table)
+
+    ac = ArrowConverter()
+    with pytest.raises(ValueError, match=r"partitions \['year'\] have the same"):
+        ac.generate_to_meta_from_parquet_dataset(str(tmp_path))
+    with pytest.raises(ValueError, match=r"partitions \['year'\] have the same"):
+        ac.generate_statistics_from_parquet_dataset(str(tmp_path))
+
+
+def test_parquet_dataset_no_files(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ArrowConverter().generate_to_meta_from_parquet_dataset(str(tmp_path))
+
+
+def test_generate_parquet_writer_options(tmp_path):
+    from mojap_metadata import Metadata
+
+    meta = Metadata.from_dict(
+        {
+            "name": "test",
+            "columns": [
+                {"name": "p", "type": "string"},
+                {"name": "id", "type": "int64"},
+                {
+                    "name": "address",
+                    "type": "struct<postcode:string, town:string>",
+                    "parquet_options": {"compression": "gzip", "use_dictionary": False},
+                },
+                {
+                    "name": "code",
+                    "type": "string",
+                    "parquet_options": {
+                        "compression_level": 9,
+                        "bloom_filter": {"ndv": 100, "fpp": 0.05},
+                    },
+                },
+            ],
+            "partitions": ["p"],
+            "parquet_options": {
+                "row_group_size": 2,
+                "compression": "zstd",
+                "write_statistics": False,
+                "sorting_columns": ["code", {"name": "id", "descending": True}],
+                "bloom_filter_columns": ["id"],
+            },
+        }
+    )
+    ac = ArrowConverter()
+    kwargs, row_group_size = ac.generate_parquet_writer_options(meta)
+    assert row_group_size == 2
+    assert kwargs == {
+        "compression": {
+            "id": "zstd",
+            "address.postcode": "gzip",
+            "address.town": "gzip",
+            "code": "zstd",
+        },
+        "compression_level": {"code": 9},
+        "use_dictionary": ["id", "code"],
+        "write_statistics": False,
+        "sorting_columns": [
+            pq.SortingColumn(3),
+            pq.SortingColumn(0, descending=True),
+        ],
+        "bloom_filter_options": {"id": True, "code": {"ndv": 100, "fpp": 0.05}},
+    }
+
+    schema = ac.generate_from_meta(meta)
+    table = pa.table(
+        {
+            "id": [2, 1, 1],
+            "address": [{"postcode": "A", "town": "B"}] * 3,
+            "code": ["a", "b", "b"],
+        },
+        schema=schema,
+    )
+    path = tmp_path / "data.parquet"
+    with pq.ParquetWriter(path, schema, **kwargs) as writer:
+        writer.write_table(table, row_group_size=row_group_size)
+
+    metadata = pq.ParquetFile(path).metadata
+    assert metadata.num_row_groups == 2
+    row_group = metadata.row_group(0)
+    assert row_group.sorting_columns == tuple(kwargs["sorting_columns"])
+    columns = [row_group.column(i) for i in range(row_group.num_columns)]
+    assert [c.compression for c in columns] == ["ZSTD", "GZIP", "GZIP", "ZSTD"]
+    assert not any(c.is_stats_set for c in columns)
+    assert "RLE_DICTIONARY" not in columns[1].encodings
+
+
+def test_generate_parquet_writer_options_defaults_and_errors():
+    from mojap_metadata import Metadata
+
+    ac = ArrowConverter()
+    meta = Metadata(columns=[{"name": "a", "type": "int64"}])
+    assert ac.generate_parquet_writer_options(meta) == ({}, None)
+
+    meta.columns[0]["parquet_options"] = {"write_statistics": False}
+    assert ac.generate_parquet_writer_options(meta)[0] == {"write_statistics": []}
+
+    meta.columns[0]["parquet_options"] = {"codec": "gzip"}
+    with pytest.raises(ValueError, match="unknown parquet_options for a"):
+        ac.generate_parquet_writer_options(meta)
+
+    meta = Metadata(
+        columns=[{"name": "a", "type": "struct<b:int64>"}],
+    )
+    meta._data["parquet_options"] = {"sorting_columns": ["a"]}
+    with pytest.raises(ValueError, match="sorting column a"):
+        ac.generate_parquet_writer_options(meta)
+
+
+def test_generate_statistics_from_parquet_dataset(tmp_path):
+    import datetime
+    from mojap_metadata import Metadata
+
+    t1 = pa.table(
+        {
+            "id": pa.array([1, 2, 3], pa.int64()),
+            "name": pa.array(["b", None, "a"]),
+            "day": pa.array([datetime.date(2021, 1, 2)] * 3),
+            "address": [{"postcode": "A"}, {"postcode": "B"}, None],
+        }
+    )
+    t2 = pa.table({"id": pa.array([10, None], pa.int64()), "name": ["c", "c"]})
+    _write(tmp_path / "region=north" / "part-0.parquet", t1)
+    (tmp_path / "region=south").mkdir()
+    pq.write_table(t2, tmp_path / "region=south" / "part-0.parquet", row_group_size=1)
+    _write(tmp_path / "region=__HIVE_DEFAULT_PARTITION__" / "part-0.parquet", t2)
+
+    ac = ArrowConverter()
+    meta = Metadata(
+        columns=[
+            {"name": "id", "type": "int64"},
+            {"name": "name", "type": "string"},
+            {"name": "day", "type": "date32"},
+            {"name": "address", "type": "struct<postcode:string>"},
+            {"name": "region", "type": "string"},
+        ],
+        partitions=["region"],
+    )
+    stats = ac.generate_statistics_from_parquet_dataset(str(tmp_path), meta)
+    assert stats["id"] == {
+        "row_count": 7,
+        "null_count": 2,
+        "min": 1,
+        "max": 10,
+        "distinct_count": None,
+    }
+    assert stats["name"]["min"] == "a"
+    assert stats["name"]["max"] == "c"
+    assert stats["name"]["null_count"] == 1
+    # day is missing from two files so is null in them
+    assert stats["day"] == {
+        "row_count": 7,
+        "null_count": 4,
+        "min": datetime.date(2021, 1, 2),
+        "max": datetime.date(2021, 1, 2),
+        "distinct_count": 1,
+    }
+    assert stats["address.postcode"]["max"] == "B"
+    assert stats["region"] == {
+        "row_count": 7,
+        "null_count": 2,
+        "min": "north",
+        "max": "south",
+        "distinct_count": 2,
+    }
+
+    assert meta.get_column("day")["statistics"]["min"] == "2021-01-02"
+    assert meta.get_column("id")["statistics"] == stats["id"]
+    assert "statistics" not in meta.get_column("address")
+
+
+def test_read_parquet_dataset_statistics_list_leaves(tmp_path):
+    from mojap_metadata.converters.arrow_converter.parquet import (
+        read_parquet_dataset_statistics,
+    )
+
+    table = pa.table(
+        {
+            "id": pa.array([1, 2, 3], pa.int64()),
+            "values": pa.array([[1, None, None], [None, None, 5], None]),
+        }
+    )
+    pq.write_table(table, tmp_path / "a.parquet")
+    stats = read_parquet_dataset_statistics(str(tmp_path))
+    # the footer has 5 null list elements (and 1 null list) in 3 rows
+    assert stats["values.list.element"] == {
+        "row_count": 3,
+        "null_count": None,
+        "min": 1,
+        "max": 5,
+        "distinct_count": None,
+    }
+    assert stats["id"]["null_count"] == 0
+
+
+def test_read_parquet_dataset_statistics_without_statistics(tmp_path):
+    from mojap_metadata.converters.arrow_converter.parquet import (
+        read_parquet_dataset_statistics,
+    )
+
+    table = pa.table({"id": pa.array([1, 2], pa.int64())})
+    pq.write_table(table, tmp_path / "a.parquet", write_statistics=False)
+    stats = read_parquet_dataset_statistics(str(tmp_path))
+    assert stats == {
+        "id": {
+            "row_count": 2,
+            "null_count": None,
+            "min": None,
+            "max": None,
+            "distinct_count": None,
+        }
+    }
+    with pytest.raises(FileNotFoundError):
+        read_parquet_dataset_statistics(str(tmp_path / "missing"))
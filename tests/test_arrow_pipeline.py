@@ -0,0 +1,145 @@
+import json
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+
+from mojap_metadata import Metadata
+from mojap_metadata.converters.arrow_converter.pipeline import (
+    conform_batch,
+    conform_to_parquet,
+    iter_conformed_batches,
+)
+
+
+@pytest.fixture
+def meta():
+    return Metadata.from_dict(
+        {
+            "name": "test",
+            "partitions": ["year"],
+            "columns": [
+                {"name": "id", "type": "int64", "nullable": False},
+                {"name": "name", "type": "string"},
+                {"name": "score", "type": "float64"},
+                {"name": "year", "type": "int32"},
+            ],
+        }
+    )
+
+
+def test_conform_batch():
+    schema = pa.schema(
+        [
+            pa.field("id", pa.int64(), nullable=False),
+            pa.field("score", pa.float64()),
+            pa.field("missing", pa.string()),
+        ]
+    )
+    ids = pa.array([1, 2], pa.int64())
+    batch = pa.record_batch(
+        {"extra": ["a", "b"], "score": pa.array([1, 2], pa.int32()), "id": ids}
+    )
+    conformed = conform_batch(batch, schema)
+
+    assert conformed.schema == schema
+    assert conformed.column("score").type == pa.float64()
+    assert conformed.column("missing").null_count == 2
+    # columns with matching types are not copied
+    assert conformed.column("id").buffers()[1].address == ids.buffers()[1].address
+
+    with pytest.raises(ValueError, match="contains nulls"):
+        conform_batch(pa.record_batch({"id": [1, None]}), schema)
+    with pytest.raises(ValueError, match="missing"):
+        conform_batch(pa.record_batch({"score": [1.0]}), schema)
+
+
+def test_conform_to_parquet_from_csv(tmp_path, meta):
+    lines = ["score,id,year,extra"] + [
+        f"{i}.5,{i},{2020 + i % 2},x" for i in range(100)
+    ]
+    path = tmp_path / "data.csv"
+    path.write_text("\n".join(lines) + "\n")
+
+    out = tmp_path / "out"
+    rows = conform_to_parquet(meta, str(path), str(out), block_size=512)
+    assert rows == 100
+
+    assert sorted(p.name for p in out.iterdir()) == ["year=2020", "year=2021"]
+    table = pq.read_table(out / "year=2020")
+    assert table.schema.names == ["id", "name", "score"]
+    assert table.schema.field("id").type == pa.int64()
+    assert table.num_rows == 50
+
+    dataset = ds.dataset(str(out), partitioning="hive")
+    assert dataset.count_rows() == 100
+
+
+def test_iter_conformed_batches_csv_options(tmp_path, meta):
+    from mojap_metadata.converters.glue_converter import CsvOptions
+
+    # glue style csvs have no header and no partition columns, which are
+    # taken from their hive style path
+    path = tmp_path / "year=2021" / "data.csv"
+    path.parent.mkdir()
+    path.write_text("1|a|0.5\n2|b|1.5\n")
+
+    (batch,) = iter_conformed_batches(meta, str(path), csv_options=CsvOptions(sep="|"))
+    assert batch.to_pylist() == [
+        {"id": 1, "name": "a", "score": 0.5, "year": 2021},
+        {"id": 2, "name": "b", "score": 1.5, "year": 2021},
+    ]
+
+    other = tmp_path / "data.csv"
+    other.write_text("3|c|2.5\n")
+    with pytest.raises(ValueError, match=r"partition columns \['year'\] are not"):
+        list(iter_conformed_batches(meta, str(other), csv_options=CsvOptions(sep="|")))
+    (batch,) = iter_conformed_batches(
+        meta, str(other), csv_options=CsvOptions(sep="|"), drop_partitions=True
+    )
+    assert batch.schema.names == ["id", "name", "score"]
+
+
+def test_conform_to_parquet_glue_csvs(tmp_path):
+    from mojap_metadata.converters.glue_converter import GlueConverterOptions
+
+    meta = Metadata(
+        columns=[{"name": "v", "type": "int64"}, {"name": "p", "type": "string"}],
+        partitions=["p"],
+    )
+    paths = []
+    for p in ["a", "b"]:
+        path = tmp_path / "in" / f"p={p}" / "data.csv"
+        path.parent.mkdir(parents=True)
+        path.write_text("1\n2\n")
+        paths.append(str(path))
+
+    out = tmp_path / "out"
+    rows = conform_to_parquet(
+        meta, paths, str(out), csv_options=GlueConverterOptions().csv
+    )
+    assert rows == 4
+    assert sorted(p.name for p in out.iterdir()) == ["p=a", "p=b"]
+    assert pq.read_table(out / "p=a").column("v").to_pylist() == [1, 2]
+
+
+def test_conform_from_json_and_parquet(tmp_path, meta):
+    json_path = tmp_path / "data.jsonl"
+    json_path.write_text(
+        "\n".join(json.dumps({"id": i, "year": 2021, "name": "a"}) for i in range(10))
+    )
+    parquet_path = tmp_path / "data.parquet"
+    pq.write_table(
+        pa.table({"year": pa.array([2020], pa.int64()), "id": [11], "score": [1.0]}),
+        parquet_path,
+    )
+
+    batches = list(iter_conformed_batches(meta, [str(json_path), str(parquet_path)]))
+    table = pa.Table.from_batches(batches)
+    assert table.schema.names == ["id", "name", "score", "year"]
+    assert table.schema.field("year").type == pa.int32()
+    assert table.column("id").to_pylist() == list(range(10)) + [11]
+
+    batches = list(iter_conformed_batches(meta, str(json_path), drop_partitions=True))
+    assert batches[0].schema.names == ["id", "name", "score"]
@@ -0,0 +1,158 @@
+import re
+
+import pyarrow as pa
+import pytest
+
+from mojap_metadata import Metadata
+from mojap_metadata.converters.arrow_converter import ArrowConverter
+from mojap_metadata.converters.arrow_converter.validation import check_conformance
+
+
+@pytest.fixture
+def meta():
+    return Metadata.from_dict(
+        {
+            "name": "test",
+            "partitions": ["year"],
+            "columns": [
+                {
+                    "name": "id",
+                    "type": "int64",
+                    "nullable": False,
+                    "minimum": 1,
+                    "maximum": 1000,
+                },
+                {"name": "small", "type": "int8"},
+                {"name": "score", "type": "float32", "minimum": -5, "maximum": 5},
+                {
+                    "name": "amount",
+                    "type": "decimal128(10,2)",
+                    "minimum": -100,
+                    "maximum": 100.5,
+                },
+                {
+                    "name": "code",
+                    "type": "string",
+                    "pattern": r"^[A-Z]{2}\d{4}(-[a-c]+)?$",
+                },
+                {"name": "animal", "type": "string", "pattern": "^(cat|dog)s?$"},
+                {
+                    "name": "word",
+                    "type": "string",
+                    "pattern": "^[a-z]+$",
+                    "minLength": 2,
+                    "maxLength": 3,
+                },
+                {
+                    "name": "big",
+                    "type": "decimal128(38,2)",
+                    "minimum": -1e15,
+                    "maximum": 1e15,
+                },
+                {"name": "wide", "type": "float64", "minimum": -1.7e308},
+                {"name": "label", "type": "large_string", "minLength": 3},
+                {"name": "raw", "type": "binary", "maxLength": 4},
+                {
+                    "name": "colour",
+                    "type": "string",
+                    "enum": ["red", "blue"],
+                    "dictionary": True,
+                },
+                {"name": "rating", "type": "int32", "enum": [1, 2, 3]},
+                {"name": "flag", "type": "bool"},
+                {"name": "day", "type": "date64"},
+                {"name": "created", "type": "timestamp(ms)"},
+                {"name": "at", "type": "time32(s)"},
+                {
+                    "name": "address",
+                    "type": "struct<postcode:string, towns:list<string>>",
+                },
+                {"name": "items", "type": "large_list<struct<sku:string, n:int64>>"},
+                {"name": "year", "type": "int32", "minimum": 2000, "maximum": 2020},
+            ],
+        }
+    )
+
+
+def test_generate_synthetic(meta):
+    batches = list(meta.generate_synthetic(1000, seed=1, batch_size=300))
+    assert [b.num_rows for b in batches] == [300, 300, 300, 100]
+
+    schema = ArrowConverter().generate_from_meta(meta, drop_partitions=False)
+    assert all(b.schema.equals(schema) for b in batches)
+
+    table = pa.Table.from_batches(batches)
+    report = check_conformance(meta, table)
+    assert report.valid, report.violations
+
+    assert table.column("id").null_count == 0
+    assert 0 < table.column("score").null_count < 300
+    assert set(table.column("colour").drop_null().to_pylist()) == {"red", "blue"}
+    assert all(
+        re.fullmatch(r"[A-Z]{2}\d{4}(-[a-c]+)?", v)
+        for v in table.column("code").drop_null().to_pylist()
+    )
+    assert all(len(v) <= 4 for v in table.column("raw").drop_null().to_pylist())
+    assert all(
+        re.fullmatch("[a-z]{2,3}", v)
+        for v in table.column("word").drop_null().to_pylist()
+    )
+
+
+def test_generate_synthetic_seed(meta):
+    first = pa.Table.from_batches(meta.generate_synthetic(100, seed=3))
+    second = pa.Table.from_batches(meta.generate_synthetic(100, seed=3))
+    other = pa.Table.from_batches(meta.generate_synthetic(100, seed=4))
+    assert first.equals(second)
+    assert not first.equals(other)
+
+
+def test_generate_synthetic_options(meta):
+    (batch,) = meta.generate_synthetic(50, null_fraction=0, drop_partitions=True)
+    assert "year" not in batch.schema.names
+    assert all(c.null_count == 0 for c in batch.columns)
+    assert list(meta.generate_synthetic(0)) == []
+
+
+def test_generate_synthetic_unsupported_pattern():
+    meta = Metadata(
+        columns=[{"name": "code", "type": "string", "pattern": "^(?!x)[a-z]+$"}]
+    )
+    with pytest.warns(UserWarning, match="Cannot generate strings matching"):
+        (batch,) = meta.generate_synthetic(10, null_fraction=0)
+    assert batch.num_rows == 10
+
+
+def test_generate_synthetic_errors():
+    meta = Metadata(
+        columns=[{"name": "n", "type": "int64", "minimum": 10, "maximum": 1}]
+    )
+    with pytest.raises(ValueError, match="greater than its maximum"):
+        list(meta.generate_synthetic(10))
+
+
+@pytest.mark.parametrize(
+    "col,match",
+    [
+        (
+            {"type": "string", "pattern": "^[a-z]{1,3}$", "minLength": 5},
+            "Cannot generate strings matching the pattern",
+        ),
+        (
+            {"type": "string", "pattern": "^a+$", "minLength": 3, "maxLength": 2},
+            "greater than its maxLength",
+        ),
+        (
+            {"type": "decimal128(38,2)", "maximum": 1e30},
+            "int64 range",
+        ),
+        (
+            {"type": "decimal128(10,2)", "minimum": 0.001, "maximum": 0.002},
+            "no values with 2 decimal places",
+        ),
+    ],
+)
+def test_generate_synthetic_bound_errors(col, match):
+    meta = Metadata(columns=[{"name": "n", **col}])
+    with pytest.raises(ValueError, match=match):
+        list(meta.generate_synthetic(10))
@@ -0,0 +1,95 @@
+import pyarrow as pa
+import pytest
+
+from mojap_metadata import Metadata
+from mojap_metadata.converters.arrow_converter.validation import (
+    ConformanceValidator,
+    check_conformance,
+)
+
+
+@pytest.fixture
+def meta():
+    return Metadata.from_dict(
+        {
+            "name": "test",
+            "partitions": ["year"],
+            "columns": [
+                {"name": "id", "type": "int64", "nullable": False, "unique": True},
+                {"name": "status", "type": "string", "enum": ["A", "B"]},
+                {"name": "code", "type": "string", "pattern": "^[A-Z]{2}[0-9]$"},
+                {"name": "age", "type": "int32", "minimum": 0, "maximum": 120},
+                {"name": "note", "type": "string", "minLength": 1, "maxLength": 5},
+                {"name": "year", "type": "int64"},
+            ],
+        }
+    )
+
+
+def test_check_conformance_valid(meta):
+    table = pa.table(
+        {
+            "id": pa.array([1, 2, 3], pa.int32()),
+            "status": ["A", "B", None],
+            "code": ["AB1", "CD2", None],
+            "age": pa.array([0, 50, 120], pa.int32()),
+            "note": ["a", "abcde", None],
+        }
+    )
+    report = check_conformance(meta, table)
+    assert report.valid
+    assert report.num_rows == 3
+    assert report.violations == {}
+    assert report.missing_columns == []
+
+
+def test_check_conformance_violations(meta):
+    table = pa.table(
+        {
+            "id": pa.array([1, None, 1, 4], pa.int64()),
+            "status": ["A", "C", "D", None],
+            "code": ["AB1", "ab1", "XAB1", "AB12"],
+            "age": pa.array([-1, 50, 121, None], pa.int32()),
+            "note": ["", "abcdef", "ok", None],
+            "other": [1, 2, 3, 4],
+        }
+    )
+    report = check_conformance(meta, table)
+    assert not report.valid
+    assert report.violations == {
+        "id": {"nullable": 1, "unique": 1},
+        "status": {"enum": 2},
+        "code": {"pattern": 3},
+        "age": {"minimum": 1, "maximum": 1},
+        "note": {"minLength": 1, "maxLength": 1},
+    }
+    assert report.samples["id"] == {"nullable": [1], "unique": [2]}
+    assert report.samples["code"]["pattern"] == [1, 2, 3]
+    assert report.extra_columns == ["other"]
+
+
+def test_conformance_across_batches(meta):
+    schema = pa.schema([("id", pa.int64()), ("age", pa.int64())])
+    batches = [
+        pa.record_batch([pa.array([1, 2]), pa.array([1, 200])], schema=schema),
+        pa.record_batch([pa.array([3, 1]), pa.array([300, 2])], schema=schema),
+        pa.record_batch([pa.array([2, 5]), pa.array([3, 4])], schema=schema),
+    ]
+    validator = ConformanceValidator(meta, max_samples=1)
+    for batch in batches:
+        validator.update(batch)
+    report = validator.report
+
+    assert report.num_rows == 6
+    assert report.violations["id"] == {"unique": 2}
+    assert report.samples["id"]["unique"] == [3]
+    assert report.violations["age"] == {"maximum": 2}
+    assert report.samples["age"]["maximum"] == [1]
+    assert report.missing_columns == ["status", "code", "note"]
+
+
+def test_conformance_type_errors(meta):
+    table = pa.table({"id": ["a", "b", None], "age": pa.array([1, 2, 3], pa.int64())})
+    report = check_conformance(meta, table)
+    assert report.violations == {"id": {"type": 2}}
+    assert "id" in report.type_errors
@@ -369,3 +369,130 @@ def test__glue_table_warning_generate_to_meta(glue_client, monkeypatch):
         assert meta_generated.partitions == meta.partitions
         assert meta_dict.get("glue_table_properties") == expected_properties
         assert meta_dict.get("primary_key") == expected_primary_key
+
+
+def test_glue_table_generate_from_meta_many(glue_client, monkeypatch):
+    queries = []
+    athena_client = object()
+    monkeypatch.setattr(
+        glue_converter,
+        "_start_query_execution_and_wait",
+        lambda db, sql, athena_client=None: queries.append((db, sql, athena_client)),
+    )
+    metas = []
+    for db, name in [("db1", "a"), ("db1", "b"), ("db2", "c")]:
+        meta = get_meta(
+            "csv",
+            {"database_name": db, "table_location": f"s3://bucket/{db}/{name}/"},
+        )
+        meta.name = name
+        metas.append(meta)
+    for db in ["db1", "db2"]:
+        glue_client.create_database(DatabaseInput={"Name": db})
+
+    # an existing table is replaced
+    old_meta = get_meta("parquet", {"database_name": "db1"})
+    old_meta.name = "a"
+    gt = GlueTable()
+    gt.options.ignore_warnings = True
+    gt.generate_from_meta(old_meta, table_location="s3://bucket/old/")
+    queries.clear()
+
+    created = gt.generate_from_meta_many(
+        metas,
+        run_msck_repair=True,
+        max_workers=2,
+        glue_client=glue_client,
+        athena_client=athena_client,
+    )
+
+    assert created == ["db1.a", "db1.b", "db2.c"]
+    # every query shares the one athena client
+    assert all(q[2] is athena_client for q in queries)
+    queries = [q[:2] for q in queries]
+    create_queries = [q for q in queries if q[1].startswith("CREATE DATABASE")]
+    assert sorted(create_queries) == [
+        ("db1", "CREATE DATABASE IF NOT EXISTS db1;"),
+        ("db2", "CREATE DATABASE IF NOT EXISTS db2;"),
+    ]
+    assert sorted(q for q in queries if q not in create_queries) == [
+        ("db1", "msck repair table db1.a"),
+        ("db1", "msck repair table db1.b"),
+        ("db2", "msck repair table db2.c"),
+    ]
+    table = glue_client.get_table(DatabaseName="db1", Name="a")["Table"]
+    assert table["StorageDescriptor"]["Location"] == "s3://bucket/db1/a/"
+    assert table["Parameters"]["classification"] == "csv"
+    assert glue_client.get_table(DatabaseName="db2", Name="c")
+
+
+def test_glue_table_generate_from_meta_many_errors(glue_client, monkeypatch):
+    monkeypatch.setattr(
+        glue_converter, "_start_query_execution_and_wait", lambda *args, **kwargs: None
+    )
+    glue_client.create_database(DatabaseInput={"Name": "db1"})
+    meta = get_meta(
+        "csv", {"database_name": "db1", "table_location": "s3://bucket/db1/t/"}
+    )
+
+    gt = GlueTable()
+    with pytest.raises(ValueError, match="given more than once"):
+        gt.generate_from_meta_many([meta, meta], glue_client=glue_client)
+
+    with pytest.warns(UserWarning, match="run_msck_repair is set to false"):
+        gt.generate_from_meta_many([meta], glue_client=glue_client)
+
+
+def test_glue_table_generate_from_meta_many_reports_failed_tables(
+    glue_client, monkeypatch
+):
+    queries = []
+    monkeypatch.setattr(
+        glue_converter,
+        "_start_query_execution_and_wait",
+        lambda db, sql, athena_client=None: queries.append(sql),
+    )
+    glue_client.create_database(DatabaseInput={"Name": "db1"})
+    metas = []
+    for name in ["a", "b", "c"]:
+        meta = get_meta(
+            "csv", {"database_name": "db1", "table_location": f"s3://bucket/{name}/"}
+        )
+        meta.name = name
+        metas.append(meta)
+
+    gt = GlueTable()
+    gt.options.ignore_warnings = True
+    gt.generate_from_meta_many(metas[:2], glue_client=glue_client)
+    metas[0].table_location = "s3://bucket/new_a/"
+    metas[1].table_location = "s3://bucket/new_b/"
+
+    def failing(name, fun):
+        def call(**kwargs):
+            if kwargs["TableInput"]["Name"] == name:
+                raise RuntimeError(f"{fun.__name__} failed")
+            return fun(**kwargs)
+
+        return call
+
+    update_table = glue_client.update_table
+    monkeypatch.setattr(glue_client, "update_table", failing("a", update_table))
+    monkeypatch.setattr(
+        glue_client, "create_table", failing("c", glue_client.create_table)
+    )
+    with pytest.raises(ValueError) as e:
+        gt.generate_from_meta_many(metas, run_msck_repair=True, glue_client=glue_client)
+    message = str(e.value)
+    assert message.startswith("2 of 3 tables failed")
+    assert "db1.a: RuntimeError('update_table failed')" in message
+    assert "db1.c: RuntimeError('create_table failed')" in message
+    assert "db1.b" not in message
+
+    # a failed update leaves the existing table as it was
+    table = glue_client.get_table(DatabaseName="db1", Name="a")["Table"]
+    assert table["StorageDescriptor"]["Location"] == "s3://bucket/a/"
+    # the other tables are still updated and repaired
+    table = glue_client.get_table(DatabaseName="db1", Name="b")["Table"]
+    assert table["StorageDescriptor"]["Location"] == "s3://bucket/new_b/"
+    assert "msck repair table db1.b" in queries
+    assert "msck repair table db1.a" not in queries
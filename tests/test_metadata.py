@@ -817,3 +817,54 @@ def test_keys_column_names_to_upper_or_lower(
     assert (
         test_out._data.keys() == exp_out._data.keys()
     ), f"unexpected key, inplace={inplace}, calling {func.__name__}"
+
+
+def test_nested_path_index():
+    meta = Metadata(
+        columns=[
+            {"name": "id", "type": "int64"},
+            {"name": "address", "type": "struct<postcode:string, loc:list<int64>>"},
+            {"name": "items", "type": "list<struct<sku:string>>"},
+            {"name": "other", "type_category": "string"},
+        ]
+    )
+    assert meta.nested_path_index == {
+        "id": "int64",
+        "address": "struct<postcode:string, loc:list<int64>>",
+        "address.postcode": "string",
+        "address.loc": "list<int64>",
+        "address.loc.element": "int64",
+        "items": "list<struct<sku:string>>",
+        "items.element": "struct<sku:string>",
+        "items.element.sku": "string",
+    }
+    assert meta.nested_path_index is meta.nested_path_index
+
+    meta.update_column({"name": "address", "type": "struct<street:string>"})
+    assert "address.postcode" not in meta.nested_path_index
+    assert meta.nested_path_index["address.street"] == "string"
+
+    meta.remove_column("items")
+    assert "items.element.sku" not in meta.nested_path_index
+
+    meta.columns = [{"name": "x", "type": "struct<y:bool>"}]
+    assert meta.nested_path_index == {"x": "struct<y:bool>", "x.y": "bool"}
+
+    # in place edits are picked up
+    meta.columns[0]["type"] = "struct<z:int64>"
+    assert meta.nested_path_index == {"x": "struct<z:int64>", "x.z": "int64"}
+
+    # placeholder types from set_col_types_from_type_category
+    meta = Metadata(
+        columns=[
+            {"name": "s", "type_category": "struct"},
+            {"name": "l", "type_category": "list"},
+        ]
+    )
+    with pytest.warns(UserWarning, match="only a basic version"):
+        meta.set_col_types_from_type_category()
+    assert meta.nested_path_index == {
+        "s": "struct<null>",
+        "l": "list<null>",
+        "l.element": "null",
+    }
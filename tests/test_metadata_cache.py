@@ -0,0 +1,135 @@
+import datetime
+import json
+import os
+
+import boto3
+import pytest
+
+from moto import mock_s3
+from mojap_metadata import Metadata
+from mojap_metadata.metadata.cache import (
+    MetadataCache,
+    disable_metadata_cache,
+    enable_metadata_cache,
+    get_metadata_cache,
+)
+
+test_dict = {
+    "name": "test",
+    "columns": [{"name": "a", "type": "int64"}, {"name": "b", "type": "string"}],
+}
+
+
+@pytest.fixture(scope="function")
+def metadata_cache(tmp_path):
+    cache = enable_metadata_cache(cache_dir=str(tmp_path / "cache"))
+    yield cache
+    disable_metadata_cache()
+
+
+def test_enable_disable_metadata_cache(metadata_cache):
+    assert get_metadata_cache() is metadata_cache
+    disable_metadata_cache()
+    assert get_metadata_cache() is None
+
+
+@pytest.mark.parametrize("writer", ["json", "yaml"])
+def test_cache_hits_and_misses(metadata_cache, tmp_path, writer):
+    path = str(tmp_path / f"meta.{writer}")
+    getattr(Metadata.from_dict(test_dict), f"to_{writer}")(path)
+
+    m1 = Metadata.from_infer(path)
+    m2 = Metadata.from_infer(path)
+    assert metadata_cache.misses == 1
+    assert metadata_cache.hits == 1
+    assert m1.to_dict() == m2.to_dict()
+    assert m1.columns is not m2.columns
+
+    # touching the file without changing it is still a hit
+    os.utime(path, ns=(0, 0))
+    Metadata.from_infer(path)
+    assert metadata_cache.hits == 2
+
+    # changing the file is a miss
+    changed = Metadata.from_dict({**test_dict, "name": "changed"})
+    getattr(changed, f"to_{writer}")(path)
+    assert Metadata.from_infer(path).name == "changed"
+    assert metadata_cache.misses == 2
+
+
+def test_yaml_with_dates_is_not_cached(metadata_cache, tmp_path):
+    path = tmp_path / "meta.yaml"
+    path.write_text(
+        "name: test\n"
+        "created: 2021-01-01\n"
+        "columns:\n"
+        "  - name: a\n"
+        "    type: int64\n"
+    )
+
+    m1 = Metadata.from_yaml(str(path))
+    m2 = Metadata.from_yaml(str(path))
+    assert m1.to_dict() == m2.to_dict()
+    assert m1._data["created"] == datetime.date(2021, 1, 1)
+    assert metadata_cache.hits == 0
+
+    # keys json would turn into strings
+    path.write_text("name: test\ncodes:\n  1: one\ncolumns: []\n")
+    Metadata.from_yaml(str(path))
+    assert Metadata.from_yaml(str(path))._data["codes"] == {1: "one"}
+    assert metadata_cache.hits == 0
+
+
+def test_disk_cache_stores_json(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "meta.json")
+    Metadata.from_dict(test_dict).to_json(path)
+    cache_dir = tmp_path / "cache"
+    cache = MetadataCache(cache_dir=str(cache_dir))
+    meta = cache.load(Metadata, path, "utf-8", json.loads, None)
+    cache.close()
+
+    (db_path,) = cache_dir.iterdir()
+    with sqlite3.connect(db_path) as db:
+        (text,) = db.execute("SELECT data FROM metadata_cache").fetchone()
+    assert json.loads(text) == meta.to_dict()
+
+
+def test_disk_cache_shared_between_caches(tmp_path):
+    path = str(tmp_path / "meta.json")
+    Metadata.from_dict(test_dict).to_json(path)
+    cache_dir = str(tmp_path / "cache")
+
+    c1 = MetadataCache(cache_dir=cache_dir)
+    c1.load(Metadata, path, "utf-8", json.loads, None)
+    c2 = MetadataCache(cache_dir=cache_dir)
+    meta = c2.load(Metadata, path, "utf-8", json.loads, None)
+
+    assert c2.hits == 1 and c2.misses == 0
+    assert meta.columns == test_dict["columns"]
+
+
+def test_in_process_cache_is_bounded(tmp_path):
+    cache = MetadataCache(maxsize=2)
+    for i in range(3):
+        path = str(tmp_path / f"meta_{i}.json")
+        Metadata.from_dict(test_dict).to_json(path)
+        cache.load(Metadata, path, "utf-8", json.loads, None)
+    assert len(cache._lru) == 2
+
+
+@mock_s3
+def test_s3_cache_uses_etag(aws_credentials, metadata_cache):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="bucket")
+    s3.put_object(Bucket="bucket", Key="meta.json", Body=json.dumps(test_dict))
+
+    Metadata.from_json("s3://bucket/meta.json")
+    Metadata.from_json("s3://bucket/meta.json")
+    assert metadata_cache.hits == 1
+
+    changed = {**test_dict, "name": "changed"}
+    s3.put_object(Bucket="bucket", Key="meta.json", Body=json.dumps(changed))
+    assert Metadata.from_json("s3://bucket/meta.json").name == "changed"
+    assert metadata_cache.misses == 2
@@ -0,0 +1,170 @@
+import pytest
+
+from mojap_metadata import Metadata, MetadataCatalog
+
+
+def _get_catalog():
+    people = Metadata.from_dict(
+        {
+            "name": "people",
+            "database_name": "db",
+            "sensitive": True,
+            "columns": [
+                {"name": "person_id", "type": "int64", "alias": "nomis_id"},
+                {"name": "full_name", "type": "string", "sensitive": True},
+                {"name": "dob", "type_category": "timestamp", "sensitive": True},
+            ],
+        }
+    )
+    visits = Metadata.from_dict(
+        {
+            "name": "visits",
+            "database_name": "db",
+            "columns": [
+                {"name": "visit_id", "type": "int64"},
+                {
+                    "name": "person_id",
+                    "type": "int64",
+                    "foreign_key": [{"table": "people", "columns": ["person_id"]}],
+                },
+                {"name": "full_name", "type": "string"},
+            ],
+        }
+    )
+    other = Metadata.from_dict(
+        {"name": "other", "columns": [{"name": "full_name", "type": "string"}]}
+    )
+    return MetadataCatalog([people, visits, other])
+
+
+def test_catalog_mapping():
+    catalog = _get_catalog()
+    assert len(catalog) == 3
+    assert list(catalog) == ["db.people", "db.visits", "other"]
+    assert catalog["db.people"].name == "people"
+    assert "other" in catalog
+
+
+@pytest.mark.parametrize(
+    "filters,expected",
+    [
+        (
+            {"name": "full_name"},
+            [
+                ("db.people", "full_name"),
+                ("db.visits", "full_name"),
+                ("other", "full_name"),
+            ],
+        ),
+        ({"name": "full_name", "sensitive": True}, [("db.people", "full_name")]),
+        (
+            {"type_category": "timestamp"},
+            [("db.people", "dob")],
+        ),
+        ({"alias": "nomis_id"}, [("db.people", "person_id")]),
+        ({"foreign_key_table": "people"}, [("db.visits", "person_id")]),
+        ({"name": "not_a_column"}, []),
+    ],
+)
+def test_find_columns(filters, expected):
+    catalog = _get_catalog()
+    found = catalog.find_columns(**filters)
+    assert [(k, c["name"]) for k, c in found] == expected
+
+
+def test_find_columns_no_filters():
+    assert len(_get_catalog().find_columns()) == 7
+
+
+@pytest.mark.parametrize(
+    "filters,expected",
+    [
+        ({}, ["people", "visits", "other"]),
+        ({"database_name": "db"}, ["people", "visits"]),
+        ({"sensitive": True}, ["people"]),
+        ({"name": "visits"}, ["visits"]),
+        ({"column_name": "full_name", "column_sensitive": False}, ["visits", "other"]),
+        ({"database_name": "db", "type_category": "string"}, ["people", "visits"]),
+        ({"name": "visits", "alias": "nomis_id"}, []),
+    ],
+)
+def test_find_tables(filters, expected):
+    catalog = _get_catalog()
+    assert [m.name for m in catalog.find_tables(**filters)] == expected
+
+
+def test_add_replaces_and_remove():
+    catalog = _get_catalog()
+    people = catalog["db.people"]
+    people.remove_column("full_name")
+    catalog.add(people)
+
+    assert catalog.find_columns(name="full_name", sensitive=True) == []
+    assert len(catalog) == 3
+
+    catalog.remove("db.people")
+    assert "db.people" not in catalog
+    assert catalog.find_columns(alias="nomis_id") == []
+    assert catalog.find_tables(sensitive=True) == []
+
+    with pytest.raises(KeyError):
+        catalog.remove("db.people")
+
+
+def test_catalog_memory_report():
+    report = _get_catalog().memory_report()
+    assert report["tables"] == 3
+    assert report["total"] > 0
+
+
+def test_bundle_round_trip(tmp_path):
+    catalog = _get_catalog()
+    path = str(tmp_path / "catalog.bundle")
+    catalog.save_bundle(path)
+
+    bundle = MetadataCatalog.from_bundle(path)
+    assert len(bundle) == 3
+    assert set(bundle) == set(catalog)
+    assert "db.people" in bundle
+    # nothing is decoded until it is accessed
+    assert bundle._tables == {}
+
+    assert bundle["db.visits"].to_dict() == catalog["db.visits"].to_dict()
+    assert list(bundle._tables) == ["db.visits"]
+
+    found = bundle.find_columns(name="full_name", sensitive=True)
+    assert [(k, c["name"]) for k, c in found] == [("db.people", "full_name")]
+    assert bundle._bundle is None
+
+
+def test_bundle_validate_and_remove(tmp_path):
+    path = str(tmp_path / "catalog.bundle")
+    _get_catalog().save_bundle(path)
+
+    bundle = MetadataCatalog.from_bundle(path, validate=True)
+    assert bundle.remove("other").name == "other"
+    assert len(bundle) == 2
+    assert [m.name for m in bundle.find_tables()] == ["people", "visits"]
+
+
+def test_bundle_close(tmp_path):
+    path = str(tmp_path / "catalog.bundle")
+    _get_catalog().save_bundle(path)
+
+    bundle = MetadataCatalog.from_bundle(path)
+    bundle["db.visits"]
+    with pytest.warns(UserWarning, match="2 tables in the bundle"):
+        bundle.close()
+    assert list(bundle) == ["db.visits"]
+
+    bundle = MetadataCatalog.from_bundle(path)
+    bundle.close(load_remaining=True)
+    assert len(bundle) == 3
+    assert bundle._bundle is None
+
+
+def test_bundle_bad_file(tmp_path):
+    path = tmp_path / "not_a.bundle"
+    path.write_bytes(b"not a bundle file")
+    with pytest.raises(ValueError):
+        MetadataCatalog.from_bundle(str(path))
@@ -0,0 +1,81 @@
+import tracemalloc
+
+from mojap_metadata import Metadata
+from mojap_metadata.metadata.profiling import (
+    _deep_sizeof,
+    catalog_memory_report,
+    profile_allocations,
+)
+
+
+def _get_meta(name: str, description: str = "") -> Metadata:
+    return Metadata(
+        name=name,
+        columns=[
+            {"name": "a", "type": "int64", "description": description},
+            {"name": "b", "type": "string"},
+        ],
+    )
+
+
+def test_deep_sizeof_counts_shared_objects_once():
+    shared = ["x" * 1000]
+    seen = set()
+    first = _deep_sizeof({"a": shared}, seen)
+    second = _deep_sizeof({"b": shared}, seen)
+    assert second < first
+
+
+def test_memory_report():
+    meta = _get_meta("test", "a" * 10_000)
+    report = meta.memory_report()
+
+    assert set(report) == {
+        "schema",
+        "columns",
+        "column_types",
+        "column_descriptions",
+        "other",
+        "total",
+    }
+    assert report["total"] == report["schema"] + report["columns"] + report["other"]
+    assert report["column_descriptions"] >= 10_000
+    assert report["columns"] >= report["column_descriptions"]
+    assert report["schema"] > 0
+
+
+def test_catalog_memory_report():
+    metas = [_get_meta(f"table_{i}") for i in range(3)]
+    report = catalog_memory_report(metas)
+
+    assert report["tables"] == 3
+    assert report["schema"] > 0
+    single = catalog_memory_report(metas[:1])
+    assert report["total"] > single["total"]
+
+
+def test_profile_allocations():
+    with profile_allocations(top_n=5) as prof:
+        metas = [_get_meta(f"table_{i}") for i in range(10)]
+
+    assert len(metas) == 10
+    assert prof.peak > 0
+    assert 0 < len(prof.top) <= 5
+
+
+def test_profile_allocations_leaves_existing_session():
+    tracemalloc.start()
+    try:
+        big = [0] * 1_000_000
+        del big
+        _, caller_peak = tracemalloc.get_traced_memory()
+
+        with profile_allocations() as prof:
+            metas = [_get_meta(f"table_{i}") for i in range(10)]
+
+        assert tracemalloc.is_tracing()
+        assert tracemalloc.get_traced_memory()[1] >= caller_peak
+        assert len(metas) == 10
+        assert prof.peak >= 0
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,120 @@
+import datetime
+
+import pytest
+
+from mojap_metadata import Metadata
+
+
+@pytest.fixture
+def validator():
+    meta = Metadata.from_dict(
+        {
+            "name": "test",
+            "columns": [
+                {"name": "id", "type": "int8", "nullable": False, "minimum": 0},
+                {"name": "score", "type": "float64", "maximum": 1},
+                {"name": "code", "type": "string", "pattern": "^[A-Z]{2}$"},
+                {"name": "status", "type_category": "string", "enum": ["A", "B"]},
+                {"name": "tags", "type": "list<string>", "maxLength": 2},
+                {"name": "created", "type": "timestamp(s)"},
+                {"name": "flag", "type": "bool"},
+                {"name": "nothing", "type": "null"},
+            ],
+        }
+    )
+    return meta.compile_record_validator()
+
+
+def test_valid_records(validator):
+    assert validator({"id": 1}) == []
+    record = {
+        "id": 127,
+        "score": 0.5,
+        "code": "AB",
+        "status": "B",
+        "tags": ["a", "b"],
+        "created": datetime.datetime(2021, 1, 1),
+        "flag": False,
+        "extra": "allowed",
+    }
+    assert validator(record) == []
+    assert validator({"id": 0, "score": 1, "created": "2021-01-01"}) == []
+
+
+@pytest.mark.parametrize(
+    "record,expected",
+    [
+        ({}, ["id: is null"]),
+        ({"id": None}, ["id: is null"]),
+        ({"id": True}, ["id: expected int8 not bool"]),
+        ({"id": "1"}, ["id: expected int8 not str"]),
+        ({"id": 128}, ["id: out of range for int8"]),
+        ({"id": -1}, ["id: -1 less than minimum"]),
+        ({"id": 1, "score": 1.5}, ["score: 1.5 greater than maximum"]),
+        ({"id": 1, "code": "ABC"}, ["code: 'ABC' does not match pattern"]),
+        ({"id": 1, "status": "C"}, ["status: 'C' not in enum"]),
+        (
+            {"id": 1, "tags": ["a", "b", "c"]},
+            ["tags: ['a', 'b', 'c'] longer than maxLength"],
+        ),
+        ({"id": 1, "created": 1}, ["created: expected timestamp(s) not int"]),
+        (
+            {"id": 1, "created": "yesterday"},
+            ["created: 'yesterday' is not an iso format timestamp"],
+        ),
+        ({"id": 1, "flag": 1}, ["flag: expected bool not int"]),
+        ({"id": 1, "nothing": 1}, ["nothing: must be null"]),
+        (
+            {"id": 200, "status": "C"},
+            ["id: out of range for int8", "status: 'C' not in enum"],
+        ),
+    ],
+)
+def test_invalid_records(validator, record, expected):
+    assert validator(record) == expected
+
+
+def test_extra_columns():
+    meta = Metadata(columns=[{"name": "a", "type": "int64"}])
+    validator = meta.compile_record_validator(allow_extra_columns=False)
+    assert validator({"a": 1}) == []
+    assert validator({"a": 1, "c": 2, "b": 3}) == [
+        "columns not in metadata: ['b', 'c']"
+    ]
+    assert "def validate_record(record):" in validator.source
+
+
+def test_unhashable_enum_and_iso_strings():
+    meta = Metadata(
+        columns=[
+            {"name": "tags", "type": "list<string>", "enum": [["a"], ["a", "b"]]},
+            {"name": "day", "type": "date32"},
+            {"name": "at", "type": "time32(s)"},
+        ]
+    )
+    validator = meta.compile_record_validator()
+    assert validator({"tags": ["a", "b"], "day": "2021-01-31", "at": "10:30"}) == []
+    assert validator({"tags": ["b"], "day": "2021-02-31", "at": "25:00"}) == [
+        "tags: ['b'] not in enum",
+        "day: '2021-02-31' is not an iso format date",
+        "at: '25:00' is not an iso format time",
+    ]
+
+
+def test_metadata_strings_are_not_in_the_source():
+    name = "a'\"\n) or __import__('os') #"
+    meta = Metadata(
+        name="x'\nimport os",
+        columns=[
+            {"name": name, "type": "string", "enum": ["'", '"'], "pattern": "^.$"},
+            {"name": 'b"\n', "type": "int8", "description": "'''\n"},
+        ],
+    )
+    validate = meta.compile_record_validator()
+    assert "os" not in validate.source
+    assert '"' not in validate.source
+    assert validate({name: "'", 'b"\n': 1}) == []
+    assert validate({name: "x", 'b"\n': 200}) == [
+        f"{name}: 'x' not in enum",
+        'b"\n: out of range for int8',
+    ]
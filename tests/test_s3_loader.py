@@ -0,0 +1,75 @@
+import json
+
+import boto3
+import pytest
+import yaml
+
+from botocore.exceptions import ClientError
+from moto import mock_s3
+from mojap_metadata.metadata.s3_loader import S3MetadataLoader
+
+
+def _meta_dict(name):
+    return {"name": name, "columns": [{"name": "a", "type": "int64"}]}
+
+
+@pytest.fixture(scope="function")
+def s3_client(aws_credentials):
+    with mock_s3():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="bucket")
+        for i in range(5):
+            client.put_object(
+                Bucket="bucket",
+                Key=f"meta/table_{i}.json",
+                Body=json.dumps(_meta_dict(f"table_{i}")),
+            )
+        client.put_object(
+            Bucket="bucket",
+            Key="meta/table_yaml.yaml",
+            Body=yaml.safe_dump(_meta_dict("table_yaml")),
+        )
+        client.put_object(Bucket="bucket", Key="meta/README.md", Body=b"not meta")
+        yield client
+
+
+def test_list_paths(s3_client):
+    loader = S3MetadataLoader(s3_client)
+    paths = loader.list_paths("s3://bucket/meta/")
+    assert len(paths) == 6
+    assert "s3://bucket/meta/README.md" not in paths
+
+
+def test_load_many_from_prefix(s3_client):
+    loader = S3MetadataLoader(s3_client, max_workers=4)
+    metas = loader.load_many("s3://bucket/meta/")
+
+    assert len(metas) == 6
+    assert metas["s3://bucket/meta/table_3.json"].name == "table_3"
+    assert metas["s3://bucket/meta/table_yaml.yaml"].name == "table_yaml"
+    assert loader.downloads == 6
+
+
+def test_load_many_uses_etags(s3_client):
+    loader = S3MetadataLoader(s3_client)
+    paths = [f"s3://bucket/meta/table_{i}.json" for i in range(3)]
+    loader.load_many(paths)
+
+    s3_client.put_object(
+        Bucket="bucket",
+        Key="meta/table_0.json",
+        Body=json.dumps(_meta_dict("changed")),
+    )
+    metas = loader.load_many(paths)
+
+    assert list(metas) == paths
+    assert metas[paths[0]].name == "changed"
+    assert metas[paths[1]].name == "table_1"
+    # only the changed file is downloaded again
+    assert loader.downloads == 4
+
+
+def test_load_missing_file(s3_client):
+    loader = S3MetadataLoader(s3_client)
+    with pytest.raises(ClientError):
+        loader.load("s3://bucket/meta/not_a_file.json")
@@ -0,0 +1,96 @@
+import pytest
+
+from jsonschema.exceptions import ValidationError
+from mojap_metadata import Metadata
+from mojap_metadata.metadata.metadata import _schema_url, _table_schema
+from mojap_metadata.metadata.schema_registry import (
+    SchemaRegistry,
+    get_schema_version_from_url,
+    schema_registry,
+)
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    [
+        (_schema_url, "v1.5.0"),
+        ("https://a.com/metadata_schema/table/v1.4.0.json", "v1.4.0"),
+        ("not_a_url", None),
+        (None, None),
+    ],
+)
+def test_get_schema_version_from_url(url, expected):
+    assert get_schema_version_from_url(url) == expected
+
+
+def test_bundled_schema():
+    assert schema_registry.latest_version == "v1.5.0"
+    assert schema_registry.get_url() == _schema_url
+    assert schema_registry.get_schema() is _table_schema
+    assert schema_registry.get_validator() is schema_registry.get_validator()
+
+
+def test_metadata_shares_schema():
+    m1 = Metadata()
+    m2 = Metadata()
+    assert m1._schema is m2._schema
+
+
+def _get_registry():
+    reg = SchemaRegistry()
+    reg.register("v1.0.0", schema={"type": "object", "required": ["name"]})
+    reg.register(
+        "v2.0.0",
+        schema={"type": "object", "required": ["name", "columns"]},
+        upgrade=lambda d: d.setdefault("columns", []),
+    )
+    return reg
+
+
+def test_registry_validates_by_declared_version():
+    reg = _get_registry()
+    v1_doc = {"$schema": reg.get_url("v1.0.0"), "name": "a"}
+    v2_doc = {"$schema": reg.get_url("v2.0.0"), "name": "a"}
+    unknown_doc = {"$schema": "https://a.com/v0.1.0.json", "name": "a"}
+
+    reg.validate(v1_doc)
+    assert len(list(reg.iter_errors(v2_doc))) == 1
+    with pytest.raises(ValidationError):
+        reg.validate(unknown_doc)
+    assert reg.resolve_version(unknown_doc["$schema"]) == "v2.0.0"
+
+
+def test_registry_upgrade():
+    reg = _get_registry()
+    doc = {"$schema": reg.get_url("v1.0.0"), "name": "a"}
+    out = reg.upgrade(doc)
+
+    assert out is doc
+    assert doc == {"$schema": reg.get_url("v2.0.0"), "name": "a", "columns": []}
+    reg.validate(doc)
+
+    with pytest.raises(ValueError):
+        reg.upgrade(doc, "v1.0.0")
+
+
+def test_registry_errors():
+    reg = SchemaRegistry()
+    with pytest.raises(ValueError):
+        reg.register("v1.0.0")
+    with pytest.raises(ValueError):
+        reg.register("1.0", schema={})
+    reg.register("v1.0.0", schema={})
+    with pytest.raises(ValueError):
+        reg.get_schema("v9.9.9")
+
+
+def test_metadata_upgrade_schema_version():
+    meta = Metadata.from_dict(
+        {
+            "$schema": "https://moj-analytical-services.github.io/metadata_schema/table/v1.4.0.json",  # noqa: E501
+            "name": "test",
+            "columns": [{"name": "a", "type": "int64"}],
+        }
+    )
+    meta.upgrade_schema_version()
+    assert meta.to_dict()["$schema"] == _schema_url
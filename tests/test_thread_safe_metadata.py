@@ -0,0 +1,88 @@
+import copy
+import pickle
+import threading
+
+import pytest
+
+from jsonschema.exceptions import ValidationError
+from mojap_metadata.metadata.thread_safe_metadata import ThreadSafeMetadata
+
+
+def _get_meta():
+    return ThreadSafeMetadata.from_dict(
+        {
+            "name": "test",
+            "columns": [
+                {"name": "a", "type": "int8"},
+                {"name": "b", "type": "string"},
+                {"name": "c", "type": "date32"},
+            ],
+            "partitions": ["c"],
+        }
+    )
+
+
+def test_thread_safe_metadata_behaves_like_metadata():
+    meta = _get_meta()
+    meta.force_partition_order = "start"
+    assert meta.column_names == ["c", "a", "b"]
+
+    meta.update_column({"name": "d", "type": "bool"})
+    meta["a"] = {"name": "a", "type": "int64"}
+    del meta["b"]
+    assert meta.column_names == ["c", "a", "d"]
+    assert meta["a"]["type"] == "int64"
+
+    meta.name = "new_name"
+    assert meta.name == "new_name"
+
+    lower = meta.column_names_to_upper()
+    assert lower.column_names == ["C", "A", "D"]
+    assert meta.column_names == ["c", "a", "d"]
+
+    assert copy.deepcopy(meta).to_dict() == meta.to_dict()
+    assert pickle.loads(pickle.dumps(meta)).to_dict() == meta.to_dict()
+
+
+def test_failed_change_leaves_metadata_unchanged():
+    meta = _get_meta()
+    before = meta.to_dict()
+
+    with pytest.raises(ValidationError):
+        meta.update_column({"name": "d", "type": "error"})
+    with pytest.raises(ValidationError):
+        meta.name = 0
+    with pytest.raises(ValueError):
+        meta.partitions = ["z"]
+
+    assert meta.to_dict() == before
+
+
+def test_readers_never_see_partial_changes():
+    meta = _get_meta()
+    meta.force_partition_order = "start"
+    cols_a = meta.columns
+    cols_b = cols_a + [{"name": "e", "type": "string"}]
+
+    stop = threading.Event()
+    errors = []
+
+    def write():
+        for i in range(100):
+            meta.columns = [dict(c) for c in (cols_a if i % 2 else cols_b)]
+        stop.set()
+
+    def read():
+        while not stop.is_set():
+            cols = meta.columns
+            if cols[0]["name"] != "c":
+                errors.append([c["name"] for c in cols])
+
+    threads = [threading.Thread(target=read) for _ in range(2)]
+    threads.append(threading.Thread(target=write))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+import yaml
+
+from mojap_metadata import Metadata, MetadataCatalog
+from mojap_metadata.metadata.validation import iter_metadata_errors, validate_many
+
+
+def _meta_dict(name):
+    return {
+        "name": name,
+        "columns": [{"name": "a", "type": "int64"}, {"name": "b", "type": "string"}],
+    }
+
+
+def _bad_meta_dict(name):
+    d = _meta_dict(name)
+    d["columns"].append({"name": "a", "type": "not_a_type"})
+    d["partitions"] = ["c"]
+    return d
+
+
+@pytest.fixture
+def metadata_dir(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "good.json").write_text(json.dumps(_meta_dict("good")))
+    (tmp_path / "sub" / "good.yaml").write_text(yaml.safe_dump(_meta_dict("good2")))
+    (tmp_path / "bad.json").write_text(json.dumps(_bad_meta_dict("bad")))
+    (tmp_path / "broken.json").write_text("{not json")
+    (tmp_path / "README.md").write_text("not metadata")
+    return tmp_path
+
+
+def test_iter_metadata_errors_collects_all():
+    errors = list(iter_metadata_errors(_bad_meta_dict("bad")))
+    assert len(errors) == 3
+    assert errors[0].startswith("columns/2:")
+    assert "'partitions' must be in columns: ['c']" in errors[1]
+    assert errors[2] == "All elements of 'column name' must be unique"
+
+    assert list(iter_metadata_errors(_meta_dict("good"))) == []
+    assert list(iter_metadata_errors([])) == ["metadata must be a dictionary not list"]
+
+
+def test_iter_metadata_errors_defaults_omitted(tmp_path):
+    doc = {"columns": [{"name": "a", "type": "int64"}]}
+    path = tmp_path / "minimal.json"
+    path.write_text(json.dumps(doc))
+
+    Metadata.from_json(str(path))
+    assert list(iter_metadata_errors(doc)) == []
+    assert validate_many([str(path)], use_processes=False).valid
+    assert doc == {"columns": [{"name": "a", "type": "int64"}]}
+
+
+@pytest.mark.parametrize("use_processes", [True, False])
+def test_validate_many_directory(metadata_dir, use_processes):
+    report = validate_many(
+        str(metadata_dir), max_workers=2, use_processes=use_processes
+    )
+    assert len(report.results) == 4
+    assert not report.valid
+
+    invalid = {r.name.replace(str(metadata_dir), ""): r for r in report.invalid}
+    assert set(invalid) == {"/bad.json", "/broken.json"}
+    assert len(invalid["/bad.json"].errors) == 3
+    assert invalid["/broken.json"].errors[0].startswith("could not read document")
+
+    d = report.to_dict()
+    assert d["documents"] == 4
+    assert d["invalid_documents"] == 2
+
+
+def test_validate_many_paths(metadata_dir):
+    paths = [str(metadata_dir / "good.json"), str(metadata_dir / "sub/good.yaml")]
+    report = validate_many(paths, use_processes=False)
+    assert report.valid
+    assert [r.name for r in report.results] == paths
+
+
+def test_validate_many_catalog():
+    catalog = MetadataCatalog([Metadata.from_dict(_meta_dict("t1"))])
+    meta = Metadata.from_dict(_meta_dict("t2"))
+    catalog.add(meta)
+    meta._data["columns"][0]["type"] = "not_a_type"
+
+    report = validate_many(catalog, max_workers=2)
+    assert [r.name for r in report.invalid] == ["t2"]
+
+    report = validate_many({"d": _bad_meta_dict("d")}, use_processes=False)
+    assert len(report.results[0].errors) == 3